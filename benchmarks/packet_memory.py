@@ -0,0 +1,74 @@
+"""Measure the memory and time it takes to decode and keep packets
+
+For every packet type a stream of frames is decoded and all packets are kept
+alive, :mod:`tracemalloc` then gives the bytes allocated per packet.
+
+Usage: python benchmarks/packet_memory.py [--count 100000] [--codegen]
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cosmic_reach.protocol import get_packet_registry, packets  # noqa: E402
+from cosmic_reach.types.bin.entities import UniqueID  # noqa: E402
+from cosmic_reach.types.bin.java import Vec3  # noqa: E402
+
+
+def samples() -> list:
+    return [
+        packets.general.EndTickPacket(123456),
+        packets.general.MessagePacket("hello there", "offline_id:1234"),
+        packets.entities.EntityPositionPacket(
+            UniqueID(1700000000000, 42, 7), Vec3(1, 2, 3), Vec3(0, 1, 0), Vec3(0, 0, 0)
+        ),
+        packets.entities.PlayerPositionPacket(
+            "offline_id:1234",
+            Vec3(1, 2, 3),
+            Vec3(0, 1, 0),
+            Vec3(0, 0, 0),
+            0,
+            "base:earth",
+        ),
+    ]
+
+
+def measure(registry, packet, count: int) -> tuple[float, float]:
+    "Bytes kept alive and seconds taken per decoded packet"
+    payload = registry.serialize_packet(packet)[4:]
+    start = time.perf_counter()
+    for _ in range(count):
+        registry.deserialize_frame(payload)
+    took = time.perf_counter() - start
+
+    # timed separately, tracing slows every allocation down
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [registry.deserialize_frame(payload) for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / count, took / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--codegen", action="store_true")
+    args = parser.parse_args()
+    registry = get_packet_registry(codegen=args.codegen)
+
+    print(f"{'packet':<24} {'bytes/packet':>13} {'decode':>10}")
+    for packet in samples():
+        size, took = measure(registry, packet, args.count)
+        print(f"{type(packet).__name__:<24} {size:>13.1f} {took * 1e6:>8.2f}us")
+
+
+if __name__ == "__main__":
+    main()
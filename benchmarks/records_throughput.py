@@ -0,0 +1,115 @@
+"""Measure the throughput of :mod:`cosmic_reach.records` on a synthetic file
+
+A file of chunk-like records (coordinates, a palette, block data and a few
+entities each) is streamed to disk with :class:`RecordWriter`, read back with
+:class:`RecordReader` and then opened as a :class:`RecordArchive` for an index
+scan, a sequential pass and random access. Use sizes of several gigabytes to
+see the file not being held in memory.
+
+Usage: python benchmarks/records_throughput.py [--size 256M] [--dir /tmp] [--keep]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cosmic_reach.records import RecordArchive, RecordReader, RecordWriter  # noqa: E402
+from cosmic_reach.records import encode  # noqa: E402
+
+BLOCKS = ["base:air", "base:stone_basalt", "base:grass", "base:dirt", "base:water"]
+
+
+def make_record(idx: int, rng: random.Random) -> dict:
+    return {
+        "x": idx % 512,
+        "y": idx // 512 % 16,
+        "z": idx // 8192,
+        "palette": rng.sample(BLOCKS, 3),
+        "blockData": rng.randbytes(2048),
+        "lighting": [rng.randrange(16) for _ in range(64)],
+        "entities": [
+            {"type": "base:entity_drone", "x": rng.random(), "y": 1.5, "z": 2.0}
+            for _ in range(rng.randrange(3))
+        ],
+        "lastTick": 1 << 40,
+    }
+
+
+def parse_size(text: str) -> int:
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    if text[-1].upper() in units:
+        return int(float(text[:-1]) * units[text[-1].upper()])
+    return int(text)
+
+
+def report(name: str, size: int, took: float, records: int) -> None:
+    print(
+        f"{name:<22} {size / took / (1 << 20):>9.1f} MiB/s"
+        f" {records / took:>12,.0f} records/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="256M")
+    parser.add_argument("--dir", default=None, help="where to put the file")
+    parser.add_argument("--keep", action="store_true", help="keep the file")
+    parser.add_argument("--random-reads", type=int, default=10000)
+    args = parser.parse_args()
+    target = parse_size(args.size)
+
+    # a pool of pre-encoded records keeps generating them out of the timing
+    rng = random.Random(0)
+    pool = [encode(make_record(idx, rng)) for idx in range(256)]
+
+    fd, path = tempfile.mkstemp(suffix=".records", dir=args.dir)
+    try:
+        written = records = 0
+        start = time.perf_counter()
+        with os.fdopen(fd, "wb") as file:
+            writer = RecordWriter(file)
+            while written < target:
+                document = pool[records % len(pool)]
+                writer.write_raw(document)
+                written += 4 + len(document)
+                records += 1
+        report("write (raw)", written, time.perf_counter() - start, records)
+
+        start = time.perf_counter()
+        with open(path, "rb") as file:
+            count = sum(1 for _ in RecordReader(file))
+        report("stream read + decode", written, time.perf_counter() - start, count)
+
+        with RecordArchive(path) as archive:
+            start = time.perf_counter()
+            count = len(archive)
+            report("archive index", written, time.perf_counter() - start, count)
+
+            start = time.perf_counter()
+            count = sum(1 for _ in archive)
+            report("archive decode", written, time.perf_counter() - start, count)
+
+            picks = [rng.randrange(count) for _ in range(args.random_reads)]
+            start = time.perf_counter()
+            size = 0
+            for idx in picks:
+                size += len(archive.raw(idx)) + 4
+                archive[idx]
+            report(
+                "archive random access", size, time.perf_counter() - start, len(picks)
+            )
+    finally:
+        if args.keep:
+            print(f"kept {path}")
+        else:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
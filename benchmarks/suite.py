@@ -0,0 +1,402 @@
+"""Benchmark encoding and decoding of every packet, wjson and full round trips
+
+Every packet class in :func:`get_packet_registry` is encoded, decoded and sent
+through a complete round trip with a realistic payload, e.g. a column of
+terrain chunks, a skin PNG or a player's JSON. :func:`wjson.loads` is run on
+zone documents of several sizes. Results are written as JSON and compared with
+a baseline, anything slower than the threshold makes the run fail.
+
+Every benchmark reports the median of timed batches from several interleaved
+passes, and their interquartile range as spread. Between two full runs with the
+default three passes on the same machine, no benchmark lost more than 26% (41%
+with one pass), so the default threshold is 30%. A benchmark also has to lose
+more than the spread of either run to count as regressed. Baselines are only
+compared with runs of the same mode, i.e. --quick and --codegen. The stored
+baseline was taken on one machine only, regenerate it with --save-baseline
+before comparing on another.
+
+Usage: python benchmarks/suite.py [--output results.json] [--quick]
+    [--baseline benchmarks/baseline.json] [--save-baseline] [--threshold 0.3]
+    [--filter REGEX] [--codegen] [--runs 3]
+"""
+
+import argparse
+import json
+import platform
+import random
+import re
+import statistics
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cosmic_reach.io import wjson  # noqa: E402
+from cosmic_reach.io.buffer import BufferReader  # noqa: E402
+from cosmic_reach.protocol import GamePacket, get_packet_registry  # noqa: E402
+from cosmic_reach.protocol import packets as P  # noqa: E402
+from cosmic_reach.protocol.enums import SetMusicTagsType  # noqa: E402
+from cosmic_reach.protocol.enums import SlotInteractionType  # noqa: E402
+from cosmic_reach.types.bin.entities import UniqueID  # noqa: E402
+from cosmic_reach.types.bin.java import Vec3  # noqa: E402
+from cosmic_reach.types.json import entities as json_entities  # noqa: E402
+from cosmic_reach.types.json import java as json_java  # noqa: E402
+from cosmic_reach.types.json.accounts import OfflineAccount  # noqa: E402
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+BLOCKS = [
+    "base:air[default]",
+    "base:stone_basalt[default]",
+    "base:dirt[default]",
+    "base:grass[default]",
+    "base:water[default,fluidLevel7]",
+]
+
+
+def skin_png(size: int = 64) -> bytes:
+    "An RGBA PNG the size of a player skin, with noise so it compresses badly"
+    rng = random.Random(64)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    rows = b"".join(b"\0" + rng.randbytes(size * 4) for _ in range(size))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def chunk_blob(rng: random.Random, height: int) -> bytes:
+    """A chunk of layered terrain as palette and bit-packed indices
+
+    The game's chunk layout is not known here, the blob only has to be of a
+    realistic size and make for realistic packet sizes.
+    """
+    palette = BLOCKS if height < 4 else BLOCKS[:1]
+    if len(palette) == 1:
+        state = palette[0].encode()
+        return b"\0" + struct.pack(">i", len(state)) + state
+    out = bytearray(b"\1" + struct.pack(">i", len(palette)))
+    for state in palette:
+        out += struct.pack(">i", len(state)) + state.encode()
+    out.append(3)
+    # 4096 3-bit indices, layers of mostly one block with some noise
+    layers = [rng.choice(range(1, len(palette))) for _ in range(16)]
+    bits = "".join(
+        format(layers[idx // 256] if rng.random() < 0.9 else 0, "03b")
+        for idx in range(4096)
+    )
+    out += int(bits, 2).to_bytes(len(bits) // 8, "big")
+    return bytes(out)
+
+
+def zone_document(size: int, rng: random.Random | None = None) -> str:
+    "A zone's JSON of at least :code:`size` characters"
+    rng = rng or random.Random(size)
+    entities = []
+    zone = {
+        "zoneId": "base:earth",
+        "name": "Earth",
+        "worldTick": 1 << 33,
+        "skyColor": {"r": 0.4, "g": 0.6, "b": 1.0, "a": 1.0},
+        "spawnPoint": {"x": 12.5, "y": 140.0, "z": -7.25},
+        "isLoaded": True,
+        "entities": entities,
+    }
+    length = len(json.dumps(zone))
+    while length < size:
+        entity = {
+            "entityTypeId": rng.choice(["base:entity_drone", "base:entity_item"]),
+            "uniqueId": {"time": 1700000000000 + len(entities), "rand": 7, "number": 1},
+            "position": {"x": rng.uniform(-1e4, 1e4), "y": 70.5, "z": rng.random()},
+            "velocity": {"x": 0.0, "y": -0.08, "z": 0.0},
+            "hitpoints": rng.randrange(1, 20),
+            "tags": ["hostile", "despawnable"],
+            "owner": None,
+        }
+        entities.append(entity)
+        length += len(json.dumps(entity)) + 2
+    return json.dumps(zone)
+
+
+def player_json() -> json_entities.Player:
+    vec = json_java.Vec3
+    return json_entities.Player(
+        json_entities.PlayerGamemode.SURVIVAL,
+        "base:earth",
+        False,
+        json_entities.Entity(
+            json_entities.UniqueID(1700000000000, 42, 7),
+            vec(118.25, 72.0, -31.5),
+            vec(118.0, 72.0, -31.25),
+            vec(0.0, 1.62, 0.0),
+            {"min": {"x": -0.3, "y": 0.0, "z": -0.3}, "max": {"x": 0.3, "y": 1.8}},
+            vec(0.0, -0.08, 0.0),
+            913.5,
+            vec(0.0, 0.0, 1.0),
+            vec(0.1, -0.2, 0.97),
+            0.25,
+            True,
+            False,
+        ),
+        json_entities.SlotContainer("base:slot_container", 36),
+    )
+
+
+def payloads() -> dict[type[GamePacket], GamePacket]:
+    rng = random.Random(1)
+    uid = UniqueID(1700000000000, 42, 7)
+    account = OfflineAccount("offline:steve", "offline_id:5e1c", "Steve")
+    # binary vectors are ints in this protocol version
+    pos, look, vel = Vec3(118, 72, -31), Vec3(0, 0, 1), Vec3(0, 0, 0)
+    message = "Anyone up for mining at the basalt cliffs? " * 2
+    return {
+        packet.__class__: packet
+        for packet in [
+            P.meta.ProtocolSyncPacket.create(get_packet_registry(), "0.4.4"),
+            P.meta.TransactionPacket(1 << 40),
+            P.meta.LoginPacket(account),
+            P.meta.RemovedPlayerPacket("offline_id:5e1c"),
+            P.general.EndTickPacket(1 << 33),
+            P.meta.WorldRecievedGamePacket(),
+            P.meta.SetNetworkSetting("maxChunkColumnsPerTick", 8),
+            P.meta.ChallengeLoginPacket(rng.randbytes(16).hex()),
+            P.meta.ItchSessionTokenPacket(rng.randbytes(32).hex()),
+            P.entities.PlayerSkinPacket("offline_id:5e1c", skin_png()),
+            P.entities.PlayerPacket("offline", account, player_json(), True),
+            P.general.MessagePacket(message, "offline_id:5e1c"),
+            P.entities.PlayerPositionPacket(
+                "offline_id:5e1c", pos, look, vel, 3, "base:earth"
+            ),
+            P.entities.EntityPositionPacket(uid, pos, look, vel),
+            P.entities.NoClipPacket(False),
+            P.general.ZonePacket(True, json.loads(zone_document(16 * 1024))),
+            P.general.ChunkColumnPacket(
+                "base:earth", [chunk_blob(rng, idx) for idx in range(16)], 7, 0, -2
+            ),
+            P.general.CommandPacket(["tp", "offline_id:5e1c", "100", "72", "-40"]),
+            P.meta.DisconnectPacket("Server closed"),
+            P.blocks.PlaceBlockPacket(pos, BLOCKS[1], 0),
+            P.blocks.BreakBlockPacket("base:earth", pos, BLOCKS[2]),
+            P.blocks.InteractBlockPacket(BLOCKS[3], 3, 1, pos),
+            P.blocks.BlockReplacePacket("base:earth", BLOCKS[4], pos),
+            P.sounds.PlaySound2DPacket("base:sounds/ui/click.ogg", 0.5, 1.0, 0.0),
+            P.sounds.PlaySound3DPacket("base:sounds/blocks/break.ogg", pos, 1.0, 0.9),
+            P.items.DropItemPacket(1, 4, 12),
+            P.items.SlotInteractPacket(SlotInteractionType.CURSOR_SWAP, 1, 4),
+            P.items.ContainerSyncPacket(1),
+            P.blockentities.BlockEntityScreenPacket("base:chest", 1, 7, 72, -31),
+            P.blockentities.BlockEntityDataPacket(7, 72, -31),
+            P.blockentities.SignsEntityPacket(
+                7, 72, -31, ["Welcome to", "the basalt", "cliffs", ""], 12.0, -1
+            ),
+            P.items.RequestGiveItemPacket(3, 64),
+            P.items.SlotSyncPacket(1),
+            P.items.SlotMergePacket(1, 4, 5),
+            P.items.SlotSwapPacket(1, 4, 1, 5),
+            P.entities.SpawnEntityPacket("base:entity_drone"),
+            P.entities.DespawnEntityPacket(uid),
+            P.entities.AttackEntityPacket(uid),
+            P.entities.InteractEntityPacket(uid, 0),
+            P.entities.HitEntityPacket(uid, 2.5),
+            P.entities.MaxHPEntityPacket(uid, 20.0),
+            P.entities.RespawnPacket(),
+            P.general.ParticleSystemPacket("base:particles/smoke"),
+            P.sounds.SetMusicTagsPacket(["calm", "day"], SetMusicTagsType.SET),
+            P.sounds.ForceSongChangePacket(),
+        ]
+    }
+
+
+def rates(func: Callable[[], Any], min_time: float, repeat: int) -> list[float]:
+    "Calls per second of :code:`repeat` batches lasting at least :code:`min_time`"
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        took = time.perf_counter() - start
+        if took >= min_time:
+            break
+        number *= 2
+    found = [number / took]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        found.append(number / (time.perf_counter() - start))
+    return found
+
+
+def benchmarks(
+    codegen: bool, quick: bool
+) -> dict[str, tuple[Callable[[], Any], int] | Exception]:
+    "Every benchmark by name, with the number of bytes one call processes"
+    registry = get_packet_registry(codegen=codegen)
+    found: dict[str, tuple[Callable[[], Any], int] | Exception] = {}
+    samples = payloads()
+    for packet_class in registry._packets.values():
+        name = packet_class.__name__
+        packet = samples.get(packet_class)
+        if packet is None:
+            found[f"encode/{name}"] = LookupError("No payload for this packet")
+            continue
+        try:
+            frame = registry.serialize_packet(packet)
+            registry.deserialize_frame(memoryview(frame)[4:])
+        except Exception as e:
+            found[f"encode/{name}"] = e
+            continue
+        payload = bytes(frame[4:])
+        found[f"encode/{name}"] = (
+            lambda packet=packet: registry.serialize_packet(packet),
+            len(frame),
+        )
+        found[f"decode/{name}"] = (
+            lambda payload=payload: registry.deserialize_frame(payload),
+            len(frame),
+        )
+        found[f"roundtrip/{name}"] = (
+            lambda packet=packet: registry.deserialize_packet(
+                BufferReader(registry.serialize_packet(packet))
+            ),
+            len(frame),
+        )
+    for size in (64 * 1024, 256 * 1024) if quick else (64 * 1024, 1 << 20, 4 << 20):
+        doc = zone_document(size)
+        found[f"wjson.loads/{size // 1024}K"] = (
+            lambda doc=doc: wjson.loads(doc),
+            len(doc.encode()),
+        )
+    return found
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    pattern = re.compile(args.filter) if args.filter else None
+    min_time, repeat = (0.01, 5) if args.quick else (0.05, 5)
+    selected = {
+        name: bench
+        for name, bench in benchmarks(args.codegen, args.quick).items()
+        if pattern is None or pattern.search(name)
+    }
+    # the passes are interleaved, so a slow phase of the machine is spread
+    # over all benchmarks instead of hitting a few of them
+    found: dict[str, list[float]] = {name: [] for name in selected}
+    for _ in range(args.runs):
+        for name, bench in selected.items():
+            if not isinstance(bench, Exception):
+                found[name] += rates(bench[0], min_time, repeat)
+    results: dict[str, Any] = {}
+    for name, bench in selected.items():
+        if isinstance(bench, Exception):
+            results[name] = {"error": f"{type(bench).__name__}: {bench}"}
+            continue
+        size = bench[1]
+        ops = statistics.median(found[name])
+        low, _, high = statistics.quantiles(found[name], n=4)
+        results[name] = {
+            "ops_per_sec": ops,
+            "bytes_per_sec": ops * size,
+            "bytes": size,
+            "spread": (high - low) / ops,
+        }
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "codegen": args.codegen,
+            "quick": args.quick,
+            "runs": args.runs,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[str]:
+    """Print the results next to the baseline and return the regressed names
+
+    A benchmark regressed if its median lost more than :code:`threshold` and
+    more than the spread of its batches in either run.
+    """
+    regressed = []
+    print(f"{'benchmark':<42} {'ops/s':>12} {'MiB/s':>9} {'vs baseline':>12}")
+    for name, result in results["results"].items():
+        if "error" in result:
+            print(f"{name:<42} {result['error']}")
+            continue
+        previous = baseline.get("results", {}).get(name, {})
+        old = previous.get("ops_per_sec")
+        if old:
+            change = result["ops_per_sec"] / old - 1
+            note = f"{change:+11.1%}"
+            noise = max(result["spread"], previous.get("spread", 0.0))
+            if change < -max(threshold, noise):
+                regressed.append(name)
+                note += " !"
+        else:
+            note = f"{'new':>11}"
+        print(
+            f"{name:<42} {result['ops_per_sec']:>12.0f} "
+            f"{result['bytes_per_sec'] / (1 << 20):>9.1f} {note}"
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, help="write the results to this file")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store the results as baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.3,
+        help="fraction of ops/s a benchmark may lose before it counts as regressed",
+    )
+    parser.add_argument("--filter", help="only run benchmarks matching this regex")
+    parser.add_argument("--codegen", action="store_true")
+    parser.add_argument("--quick", action="store_true", help="shorter, noisier runs")
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=3,
+        help="passes over all benchmarks, the median of all of them is reported",
+    )
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())
+        meta = baseline.get("meta", {})
+        for option in ("quick", "codegen"):
+            if meta.get(option) != getattr(args, option):
+                raise SystemExit(
+                    f"The baseline was taken with{'' if meta.get(option) else 'out'}"
+                    f" --{option}, run the same mode or pass --save-baseline"
+                )
+    results = run(args)
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    regressed = compare(results, baseline, args.threshold)
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n")
+    elif regressed:
+        raise SystemExit(f"{len(regressed)} benchmarks regressed: {regressed}")
+
+
+if __name__ == "__main__":
+    main()
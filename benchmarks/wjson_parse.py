@@ -0,0 +1,148 @@
+"""Compare :func:`cosmic_reach.io.wjson.loads` with the previous parser
+
+The previous implementation resliced the remaining document for every token
+and is kept here verbatim for comparison. Documents are generated in the
+subset both parsers understand (no whitespace, arrays or quoted keys).
+
+Usage: python benchmarks/wjson_parse.py [--sizes 64K,1M,4M] [--legacy-max 1M]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cosmic_reach.io import wjson  # noqa: E402
+
+
+class MutableString:
+    def __init__(self, content: str):
+        self.content = content
+
+    def has(self) -> bool:
+        return bool(self.content)
+
+    def getfirst(self) -> str:
+        return self.content[0]
+
+    def popfirst(self) -> str:
+        first = self.getfirst()
+        self.content = self.content[1:]
+        return first
+
+    def popuntil(self, *symbols: str) -> str:
+        idx = min(
+            filter(
+                lambda idx: idx != -1,
+                [len(self.content)] + [self.content.find(symbol) for symbol in symbols],
+            )
+        )
+        sub = self.content[:idx]
+        self.content = self.content[idx:]
+        return sub
+
+
+def legacy_collect(data: MutableString, *, ends: tuple[str] = tuple()) -> Any:
+    if data.getfirst() == "{":
+        result = {}
+        while data.getfirst() != "}":
+            data.popfirst()
+            key = data.popuntil(":")
+            data.popfirst()
+            value = legacy_collect(data, ends=(",", "}"))
+            result[key] = value
+        data.popfirst()
+        return result
+    elif (start := data.getfirst()) in ("'", '"'):
+        data.popfirst()
+        read = data.popuntil(start)
+        data.popfirst()
+        return read
+    else:
+        read: str = data.popuntil(*ends)
+        if read == "null":
+            return None
+        elif read == "true":
+            return True
+        elif read == "false":
+            return False
+        elif read.isdigit():
+            return int(read)
+        elif read.isdecimal():
+            return float(read)
+        return read
+
+
+def legacy_loads(json_str: str) -> Any:
+    return legacy_collect(MutableString(json_str))
+
+
+def make_document(size: int) -> str:
+    "Build a zone-like document of at least :code:`size` characters"
+    entries = []
+    length = 2
+    idx = 0
+    while length < size:
+        entry = (
+            f"chunk{idx}:{{x:{idx},y:{idx * 7 % 256},loaded:true,"
+            f'owner:null,name:"block_{idx}",blockId:base:stone}}'
+        )
+        entries.append(entry)
+        length += len(entry) + 1
+        idx += 1
+    return "{" + ",".join(entries) + "}"
+
+
+def parse_size(text: str) -> int:
+    units = {"K": 1024, "M": 1024 * 1024}
+    if text[-1].upper() in units:
+        return int(float(text[:-1]) * units[text[-1].upper()])
+    return int(text)
+
+
+def measure(loads, doc: str, budget: float = 1.0) -> float:
+    "Best time of a few runs, fewer if a single run is slow"
+    best = float("inf")
+    spent = 0.0
+    runs = 0
+    while runs < 5 and (runs == 0 or spent < budget):
+        start = time.perf_counter()
+        loads(doc)
+        took = time.perf_counter() - start
+        best = min(best, took)
+        spent += took
+        runs += 1
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="64K,256K,1M,4M")
+    parser.add_argument(
+        "--legacy-max",
+        default="1M",
+        help="largest document the legacy parser is run on, it is quadratic",
+    )
+    args = parser.parse_args()
+    legacy_max = parse_size(args.legacy_max)
+
+    print(f"{'size':>10} {'wjson':>12} {'legacy':>12} {'speedup':>9}")
+    for size in map(parse_size, args.sizes.split(",")):
+        doc = make_document(size)
+        new = measure(wjson.loads, doc)
+        if size <= legacy_max:
+            if legacy_loads(doc) != wjson.loads(doc):
+                raise SystemExit(f"Parsers disagree on the {size} byte document")
+            old = measure(legacy_loads, doc)
+            print(
+                f"{len(doc):>10} {new * 1e3:>10.2f}ms {old * 1e3:>10.2f}ms {old / new:>8.1f}x"
+            )
+        else:
+            print(f"{len(doc):>10} {new * 1e3:>10.2f}ms {'skipped':>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+"""Recording sessions to capture files and replaying them
+
+A :class:`CaptureWriter` is attached to a client or server connection with
+:code:`enable_capture` and records every frame sent and received, along with
+the packet ids in use. A :class:`CaptureReader` maps such a file to look up,
+decode and replay its frames.
+"""
+
+from .format import RecordKind
+from .reader import CapturedFrame, CaptureReader
+from .writer import CaptureWriter
+
+__all__ = ["CaptureReader", "CaptureWriter", "CapturedFrame", "RecordKind"]
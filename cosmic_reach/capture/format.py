@@ -0,0 +1,29 @@
+import enum
+import struct
+
+from ..protocol import Direction
+
+MAGIC = b"CRCAP"
+VERSION = 1
+INDEX_MAGIC = b"CRIX"
+
+HEADER = struct.Struct(">5sBd")
+"Magic, format version and the wall clock time the capture started at"
+RECORD = struct.Struct(">BBdI")
+"Kind, direction, seconds since the start of the capture and payload length"
+INDEX_ENTRY = struct.Struct(">QdBBH")
+"Offset of the record, its time, kind, direction and packet id"
+FOOTER = struct.Struct(">QI4s")
+"Offset of the index, the number of entries and the index magic"
+
+
+class RecordKind(enum.IntEnum):
+    FRAME = 0
+    "A frame as sent on the wire, without its length"
+    TABLE = 1
+    "The packet ids in use from now on, as the body of a protocol sync packet"
+
+
+DIRECTIONS = (Direction.SERVERBOUND, Direction.CLIENTBOUND)
+"The directions in the order of their codes in a capture"
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
@@ -0,0 +1,293 @@
+import asyncio
+import bisect
+import heapq
+import inspect
+import mmap
+import struct
+import time
+from collections.abc import Sequence
+from os import PathLike
+from typing import Any, Callable, Iterable, Iterator, NamedTuple
+
+from ..io.buffer import BufferReader
+from ..io.serializer import deserialize
+from ..protocol import (
+    Direction,
+    GamePacket,
+    GamePacketRegistry,
+    get_packet_registry,
+    packets,
+    registry_from_sync,
+)
+from .format import (
+    DIRECTIONS,
+    FOOTER,
+    HEADER,
+    INDEX_ENTRY,
+    INDEX_MAGIC,
+    MAGIC,
+    RECORD,
+    VERSION,
+    RecordKind,
+)
+
+_LENGTH = struct.Struct(">I")
+
+
+class CapturedFrame(NamedTuple):
+    index: int
+    "The position of the frame among all frames of the capture"
+    time: float
+    "Seconds since the start of the capture"
+    direction: Direction
+    packet_id: int
+    packet_name: str | None
+    "The :code:`PACKET_NAME` of the packet, if its id is known"
+    payload: memoryview
+    "The packet id and body, a view into the mapped file"
+
+    def frame(self) -> bytes:
+        "The complete frame, as sent on the wire"
+        return _LENGTH.pack(len(self.payload)) + self.payload
+
+
+class CaptureReader(Sequence[CapturedFrame]):
+    """Random access to the frames of a capture file through :mod:`mmap`
+
+    The index at the end of the file is read on opening, or the records are
+    scanned if the capture was not closed properly. Frames are looked up by
+    time with :meth:`seek_time` and by packet type with :meth:`indices_of`,
+    their payloads are views into the file and only decoded on request, with
+    the packet ids that were in use when they were recorded. Payloads have to
+    be released before :meth:`close`.
+
+    :param registry: The packets frames are decoded as, the ids in the capture
+        are mapped onto it
+    """
+
+    path: str | PathLike
+    start_time: float
+    "The wall clock time the capture was started at"
+    complete: bool
+    "Whether the capture was closed properly and has an index"
+
+    def __init__(
+        self, path: str | PathLike, registry: GamePacketRegistry | None = None
+    ):
+        self.path = path
+        self.registry = get_packet_registry() if registry is None else registry
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files cannot be mapped
+            self._map = b""
+        self._view = memoryview(self._map)
+        if len(self._view) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a capture file")
+        magic, version, self.start_time = HEADER.unpack_from(self._view)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a capture file of version {VERSION}")
+
+        self._offsets: list[int] = []
+        self._times: list[float] = []
+        self._directions: list[Direction] = []
+        self._ids: list[int] = []
+        self._tables: list[int | None] = []
+        "The offset of the table each frame's ids are from"
+        self._names: dict[int | None, dict[int, str]] = {
+            None: {
+                packet_id: packet.PACKET_NAME
+                for packet_id, packet in self.registry._packets.items()
+            }
+        }
+        self._registries: dict[int | None, GamePacketRegistry] = {None: self.registry}
+        self._by_name: dict[str | None, list[int]] | None = None
+        self._load(self._read_index() or self._scan())
+
+    def _read_index(self) -> Iterable[tuple] | None:
+        view = self._view
+        if len(view) < HEADER.size + FOOTER.size:
+            return None
+        index_offset, count, magic = FOOTER.unpack_from(view, len(view) - FOOTER.size)
+        if (
+            magic != INDEX_MAGIC
+            or index_offset + count * INDEX_ENTRY.size != len(view) - FOOTER.size
+        ):
+            return None
+        self.complete = True
+        return INDEX_ENTRY.iter_unpack(view[index_offset : len(view) - FOOTER.size])
+
+    def _scan(self) -> Iterator[tuple]:
+        "Index the records one by one, up to where a truncated file ends"
+        self.complete = False
+        view = self._view
+        end = len(view)
+        pos = HEADER.size
+        while pos + RECORD.size <= end:
+            kind, code, at, length = RECORD.unpack_from(view, pos)
+            if pos + RECORD.size + length > end:
+                return
+            start = pos + RECORD.size
+            packet_id = int.from_bytes(view[start : start + 2], "big")
+            yield pos, at, kind, code, packet_id if kind == RecordKind.FRAME else 0
+            pos = start + length
+
+    def _load(self, entries: Iterable[tuple]) -> None:
+        tables: list[int | None] = [None] * len(DIRECTIONS)
+        for offset, at, kind, code, packet_id in entries:
+            if kind == RecordKind.TABLE:
+                tables[code] = offset
+                if offset not in self._names:
+                    self._names[offset] = {
+                        packet_id: packet_name
+                        for packet_name, packet_id in self._sync(offset).packets
+                    }
+                continue
+            self._offsets.append(offset)
+            self._times.append(at)
+            self._directions.append(DIRECTIONS[code])
+            self._ids.append(packet_id)
+            self._tables.append(tables[code])
+
+    def _payload(self, offset: int) -> memoryview:
+        (length,) = _LENGTH.unpack_from(self._view, offset + RECORD.size - 4)
+        return self._view[offset + RECORD.size : offset + RECORD.size + length]
+
+    def _sync(self, offset: int) -> packets.meta.ProtocolSyncPacket:
+        return deserialize(
+            packets.meta.ProtocolSyncPacket, BufferReader(self._payload(offset))
+        )
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, idx: int) -> CapturedFrame:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("Capture frame index out of range")
+        packet_id = self._ids[idx]
+        return CapturedFrame(
+            idx,
+            self._times[idx],
+            self._directions[idx],
+            packet_id,
+            self._names[self._tables[idx]].get(packet_id),
+            self._payload(self._offsets[idx]),
+        )
+
+    @property
+    def duration(self) -> float:
+        "Seconds from the start of the capture to its last frame"
+        return self._times[-1] if self._times else 0.0
+
+    def seek_time(self, at: float) -> int:
+        "The index of the first frame recorded at or after :code:`at` seconds"
+        return bisect.bisect_left(self._times, at)
+
+    def indices_of(self, packet: type[GamePacket] | str) -> list[int]:
+        "The indices of all frames of a packet class or :code:`PACKET_NAME`"
+        if self._by_name is None:
+            by_name: dict[str | None, list[int]] = {}
+            for idx, (table, packet_id) in enumerate(zip(self._tables, self._ids)):
+                name = self._names[table].get(packet_id)
+                by_name.setdefault(name, []).append(idx)
+            self._by_name = by_name
+        if not isinstance(packet, str):
+            packet = packet.PACKET_NAME
+        return self._by_name.get(packet, [])
+
+    def select(
+        self,
+        start: float | None = None,
+        end: float | None = None,
+        types: Iterable[type[GamePacket] | str] | None = None,
+        direction: Direction | None = None,
+    ) -> Iterator[CapturedFrame]:
+        """The frames recorded in a time range, in the order they were recorded
+
+        :param start: Seconds since the start of the capture, inclusive
+        :param end: Seconds since the start of the capture, exclusive
+        :param types: Only frames of these packet classes or names
+        :param direction: Only frames sent in this direction
+        """
+        first = 0 if start is None else self.seek_time(start)
+        stop = len(self) if end is None else self.seek_time(end)
+        if types is None:
+            indices = range(first, stop)
+        else:
+            found = [self.indices_of(typ) for typ in types]
+            indices = heapq.merge(
+                *(idxs[bisect.bisect_left(idxs, first) :] for idxs in found)
+            )
+        for idx in indices:
+            if idx >= stop:
+                return
+            if direction is None or self._directions[idx] is direction:
+                yield self[idx]
+
+    def registry_at(self, idx: int) -> GamePacketRegistry:
+        "The registry with the packet ids in use when a frame was recorded"
+        table = self._tables[idx]
+        registry = self._registries.get(table)
+        if registry is None:
+            registry = self._registries[table] = registry_from_sync(
+                self.registry, self._sync(table)
+            )
+        return registry
+
+    def decode(self, frame: CapturedFrame | int) -> GamePacket:
+        if isinstance(frame, int):
+            frame = self[frame]
+        return self.registry_at(frame.index).deserialize_frame(frame.payload)
+
+    def packets(self, *args, **kwargs) -> Iterator[tuple[CapturedFrame, GamePacket]]:
+        "Decode the frames :meth:`select` would return with their packets"
+        for frame in self.select(*args, **kwargs):
+            yield frame, self.decode(frame)
+
+    async def replay(
+        self,
+        send: Callable[[bytes], Any],
+        speed: float | None = 1.0,
+        *args,
+        **kwargs,
+    ) -> int:
+        """Send the frames :meth:`select` would return to a connection
+
+        :param send: Called with every complete frame, e.g.
+            :meth:`AsyncBaseClientConnection.send_frame`, awaited if it returns
+            an awaitable
+        :param speed: How much faster than recorded to replay, :code:`None` to
+            replay as fast as possible
+        :return: The number of frames sent
+        """
+        sent = 0
+        began = first = None
+        for frame in self.select(*args, **kwargs):
+            if speed is not None:
+                if began is None:
+                    began, first = time.perf_counter(), frame.time
+                delay = (frame.time - first) / speed - (time.perf_counter() - began)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            result = send(frame.frame())
+            if inspect.isawaitable(result):
+                await result
+            sent += 1
+        return sent
+
+    def close(self) -> None:
+        self._view.release()
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "CaptureReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
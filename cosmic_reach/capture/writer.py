@@ -0,0 +1,110 @@
+import threading
+import time
+from os import PathLike
+
+from ..io.serializer import serialize_into
+from ..protocol import Direction, GamePacketRegistry, packets
+from .format import (
+    DIRECTION_CODES,
+    FOOTER,
+    HEADER,
+    INDEX_ENTRY,
+    INDEX_MAGIC,
+    MAGIC,
+    RECORD,
+    VERSION,
+    RecordKind,
+)
+
+
+class CaptureWriter:
+    """Records the frames of a session to a capture file
+
+    Records are appended as they come, each with the time since the capture
+    started and the direction it was sent in. The packet ids in use are
+    recorded as tables whenever they change, so the capture can be decoded
+    without knowing what was negotiated. An index of all records is appended
+    on :meth:`close`; files that were not closed can still be read, they are
+    scanned instead.
+    """
+
+    path: str | PathLike
+    records: int
+    "The number of records written"
+
+    def __init__(self, path: str | PathLike):
+        self.path = path
+        self.records = 0
+        self._file = open(path, "wb")
+        self._start = time.perf_counter()
+        self._offset = HEADER.size
+        self._index = bytearray()
+        self._lock = threading.Lock()
+        self._file.write(HEADER.pack(MAGIC, VERSION, time.time()))
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def _record(
+        self,
+        kind: RecordKind,
+        direction: Direction,
+        payload: bytes | bytearray | memoryview,
+        packet_id: int = 0,
+    ) -> None:
+        code = DIRECTION_CODES[direction]
+        with self._lock:
+            now = time.perf_counter() - self._start
+            self._index += INDEX_ENTRY.pack(self._offset, now, kind, code, packet_id)
+            self._file.write(RECORD.pack(kind, code, now, len(payload)))
+            self._file.write(payload)
+            self._offset += RECORD.size + len(payload)
+            self.records += 1
+
+    def write_payload(
+        self, direction: Direction, payload: bytes | bytearray | memoryview
+    ) -> None:
+        "Record a frame without its length, i.e. the packet id and body"
+        self._record(
+            RecordKind.FRAME, direction, payload, int.from_bytes(payload[:2], "big")
+        )
+
+    def write_frame(self, direction: Direction, frame: bytes | bytearray) -> None:
+        "Record a complete frame as built by :meth:`GamePacketRegistry.serialize_packet`"
+        with memoryview(frame) as view:
+            self.write_payload(direction, view[4:])
+
+    def write_table(self, registry: GamePacketRegistry, *directions: Direction) -> None:
+        """Record the packet ids of a registry
+
+        :param directions: The directions frames are sent with these ids in
+            from now on, both if none are given
+        """
+        table = bytearray()
+        serialize_into(table, packets.meta.ProtocolSyncPacket.create(registry, ""))
+        for direction in directions or Direction:
+            self._record(RecordKind.TABLE, direction, table)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        "Append the index and close the file"
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(self._index)
+            self._file.write(
+                FOOTER.pack(
+                    self._offset, len(self._index) // INDEX_ENTRY.size, INDEX_MAGIC
+                )
+            )
+            self._file.close()
+
+    def __enter__(self) -> "CaptureWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
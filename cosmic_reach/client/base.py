@@ -1,32 +1,42 @@
 import asyncio
-import io
-import socket
+import time
 import traceback
 from collections import defaultdict
+from os import PathLike
 
+from ..capture import CaptureWriter
+from ..common.batching import OutputBatcher
 from ..common.events import FilterableListenableEvent, ListenableEvent
-from ..protocol import GamePacket, GamePacketRegistry, get_packet_registry
-
-
-class SocketReadBuffer:
-    def __init__(self, sock: socket.socket):
-        self.sock = sock
-
-    def read(self, length):
-        read = self.sock.recv(length)
-        while len(read) < length:
-            read += self.sock.recv(length - len(read))
-
-    def write(self, buf: io.BytesIO):
-        return self.sock.send(buf)
+from ..common.metrics import Metrics
+from ..common.sendqueue import OverflowPolicy, SendQueue
+from ..common.transport import StreamTransport
+from ..protocol import (
+    Direction,
+    GamePacket,
+    GamePacketRegistry,
+    PacketDecoder,
+    get_packet_registry,
+    packets,
+)
 
 
 class BaseClient:
     "A barebones client, just being able to send and receive packets, nothing more."
 
-    sock: socket.socket
-    buffer: SocketReadBuffer
-    packet_registry: GamePacketRegistry
+    transport: StreamTransport | None
+    queue: SendQueue | None
+    "The bounded queue packets are sent from, once connected"
+    send_policy: OverflowPolicy = OverflowPolicy.BLOCK
+    "What to do if the server does not keep up with the packets sent to it"
+    send_max_frames: int = 4096
+    send_max_bytes: int = 8 * 1024 * 1024
+    decoder: PacketDecoder
+    batcher: OutputBatcher | None
+    "Coalesces outgoing packets if batching is enabled"
+    capture: CaptureWriter | None
+    "Records the frames sent and received if capturing is enabled"
+    metrics: Metrics | None
+    "Records packet counts, sizes and timings if metrics are enabled"
 
     class Events:
         packet: FilterableListenableEvent
@@ -37,40 +47,105 @@ class BaseClient:
             for key, typ in self.__class__.__annotations__.items():
                 setattr(self, key, typ())
             for base in self.__class__.__bases__:
-                for key, typ in base.__annotations__.items():
+                for key, typ in getattr(base, "__annotations__", {}).items():
                     setattr(self, key, typ())
 
     events: Events
 
     def __init__(self):
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.buffer = SocketReadBuffer(self.sock)
+        self.transport = None
+        self.queue = None
+        self.batcher = None
+        self.capture = None
+        self.metrics = None
         self.rlock = asyncio.Lock()
-        self.wlock = asyncio.Lock()
         self.event_handlers = defaultdict(list)
-        self.packet_registry = get_packet_registry()
+        self.decoder = PacketDecoder(get_packet_registry())
 
         self.events = self.Events()
 
+    @property
+    def packet_registry(self) -> GamePacketRegistry:
+        "The registry packets are encoded and decoded with"
+        return self.decoder.registry
+
+    @packet_registry.setter
+    def packet_registry(self, registry: GamePacketRegistry):
+        self.decoder.registry = registry
+        if self.capture is not None:
+            self.capture.write_table(registry)
+        if self.metrics is not None:
+            registry.enable_metrics(self.metrics, Direction.SERVERBOUND)
+
     async def send_packet(self, packet: GamePacket):
-        "Send a packet to the connected server"
-        await self.wlock.acquire()
-        self.buffer.write(self.packet_registry.serialize_packet(packet))
-        self.wlock.release()
+        """Send a packet to the connected server
+
+        The packet is queued and written in the background. This only waits if
+        the send queue is full and its policy is ``BLOCK``.
+
+        :raises ConnectionError: If the client is not connected or the send queue
+            was closed, e.g. because it overflowed with the ``DISCONNECT`` policy
+        """
+        if self.queue is None or self.queue.closed:
+            raise ConnectionError("Not connected")
+        frame = self.packet_registry.serialize_packet(packet)
+        if self.capture is not None:
+            self.capture.write_frame(Direction.SERVERBOUND, frame)
+        if self.batcher is None:
+            if not await self.queue.put(frame):
+                raise ConnectionError("Connection closed before the packet was queued")
+        else:
+            self.batcher.add(frame, packet)
+            await self.queue.wait_for_room()
+
+    def enable_batching(
+        self, max_bytes: int = 65536, max_delay: float | None = 0.005
+    ) -> OutputBatcher:
+        """Coalesce outgoing packets into fewer writes, see :class:`OutputBatcher`
+
+        :param max_bytes: Flush once this many bytes are buffered
+        :param max_delay: Flush once a packet waited this many seconds
+        """
+        self.batcher = OutputBatcher(
+            lambda frames: self.queue.put_nowait(frames),
+            max_bytes,
+            max_delay,
+            (packets.general.EndTickPacket,),
+        )
+        return self.batcher
+
+    def enable_capture(self, path: str | PathLike) -> CaptureWriter:
+        """Record all frames sent and received to a capture file
+
+        The file is completed when the client is closed, read it with
+        :class:`cosmic_reach.capture.CaptureReader`.
+        """
+        self.capture = CaptureWriter(path)
+        self.capture.write_table(self.packet_registry)
+        return self.capture
+
+    def enable_metrics(self, metrics: Metrics | None = None) -> Metrics:
+        """Record the packets sent, received and handled, see :class:`Metrics`
+
+        :param metrics: Where to record, e.g. to share it between clients
+        """
+        self.metrics = Metrics() if metrics is None else metrics
+        self.packet_registry.enable_metrics(self.metrics, Direction.SERVERBOUND)
+        return self.metrics
 
     async def receive_packet(self) -> GamePacket:
         """Receive on packet from the connected server
 
         If no packet is waiting in the buffer, this function will wait until one package is received.
         """
-        await self.rlock.acquire()
-        try:
-            result = self.packet_registry.deserialize_packet(self.buffer)
-        except ConnectionAbortedError:
-            raise SystemExit
-        finally:
-            self.rlock.release()
-        return result
+        async with self.rlock:
+            while (frame := self.decoder.next_frame()) is None:
+                self.decoder.feed(await self.transport.read_chunk())
+            if self.capture is not None:
+                self.capture.write_payload(
+                    Direction.CLIENTBOUND, frame.view[frame.pos : frame.end]
+                )
+            return self.packet_registry.deserialize_cr_packet(frame)
 
     async def connect(self, host: str = "localhost", port: int = 47137):
         """Connect the client to a remote server
@@ -78,19 +153,53 @@ class BaseClient:
         :param host: The host of the remote server
         :param port: The port of the remote server
         """
-        self.sock.connect((host, port))
+        self.transport = await StreamTransport.open(host, port)
+        self.queue = SendQueue(
+            self.transport,
+            self.send_max_frames,
+            self.send_max_bytes,
+            self.send_policy,
+            self.transport.writer.close,
+        )
+        self.queue.start()
         await self.events.connect.emit()
 
+    async def close(self):
+        "Close the connection to the server"
+        if self.transport is not None:
+            if self.batcher is not None:
+                self.batcher.flush()
+            await self.queue.close()
+            await self.transport.close()
+        if self.capture is not None:
+            self.capture.close()
+
+    @property
+    def connected(self) -> bool:
+        return self.transport is not None and not self.transport.closed
+
     async def receive_packets(self):
         "Infinitely receive and handle packets"
-        while self.sock:
+        while self.connected:
             try:
                 packet = await self.receive_packet()
+            except ConnectionError:
+                break
             except Exception as e:
                 traceback.print_exception(e)
                 print("-----------------")
             else:
+                if (metrics := self.metrics) is not None:
+                    start = time.perf_counter_ns()
                 await self.events.packet.emit(type(packet), packet)
+                if metrics is not None:
+                    metrics.record(
+                        "dispatch",
+                        Direction.CLIENTBOUND,
+                        packet.PACKET_NAME,
+                        0,
+                        time.perf_counter_ns() - start,
+                    )
 
     def start(self):
         "Infinitely receive and handle packets"
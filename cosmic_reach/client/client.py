@@ -1,10 +1,13 @@
 from collections import defaultdict
+from typing import Literal
 
 from ..common.events import FilterableListenableEvent, ListenableEvent
 from ..common.types import RememberedPlayer
 from ..protocol import GamePacketRegistry, packets
 from ..types.json.accounts import Account
 from .base import BaseClient
+from .entities import EntityTracker
+from .world import ChunkDecoder, WorldCache
 
 
 class Client(BaseClient):
@@ -18,6 +21,10 @@ class Client(BaseClient):
     "The account the client is or will be logged in with"
     in_world: bool = False
     "Whether the client has logged in yet"
+    world: WorldCache | None = None
+    "The received chunks, if enabled with :meth:`enable_world_cache`"
+    entities: EntityTracker | None = None
+    "Where entities and players are, if enabled with :meth:`enable_entity_tracker`"
 
     class Events(BaseClient.Events):
         login: ListenableEvent
@@ -50,10 +57,72 @@ class Client(BaseClient):
         )
         self.events.login.add_handler(self._handle_login_finished)
 
+    def enable_world_cache(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        eviction: Literal["lru", "distance"] = "lru",
+        decoder: ChunkDecoder | None = None,
+        air: str | None = None,
+    ) -> WorldCache:
+        """Keep the received chunks in a :class:`WorldCache`
+
+        :param max_bytes: The memory budget for the chunks
+        :param eviction: Evict least recently used chunks or the ones farthest
+            from the player first
+        :param decoder: Decodes chunk blobs for block access, needs numpy
+        :param air: The block state broken blocks are replaced with
+        """
+        self.world = WorldCache(max_bytes, eviction, decoder, air)
+        self.events.packet.add_handler(
+            self.world.handle_chunk_column, packets.general.ChunkColumnPacket
+        )
+        self.events.packet.add_handler(
+            self.world.handle_block_replace, packets.blocks.BlockReplacePacket
+        )
+        self.events.packet.add_handler(
+            self.world.handle_break_block, packets.blocks.BreakBlockPacket
+        )
+        self.events.packet.add_handler(
+            self._focus_world, packets.entities.PlayerPositionPacket
+        )
+        return self.world
+
+    def enable_entity_tracker(
+        self, capacity: int = 1024, cell_size: float = 16.0
+    ) -> EntityTracker:
+        """Track entity and player positions in an :class:`EntityTracker`, needs numpy
+
+        :param capacity: How many entities to preallocate room for
+        :param cell_size: The edge length of the tracker's grid cells
+        """
+        self.entities = EntityTracker(capacity, cell_size)
+        self.events.packet.add_handler(
+            self.entities.handle_entity_position,
+            packets.entities.EntityPositionPacket,
+        )
+        self.events.packet.add_handler(
+            self.entities.handle_player_position,
+            packets.entities.PlayerPositionPacket,
+        )
+        self.events.packet.add_handler(
+            self.entities.handle_despawn, packets.entities.DespawnEntityPacket
+        )
+        return self.entities
+
+    def _focus_world(self, packet: packets.entities.PlayerPositionPacket):
+        if self.account is not None and packet.player_unique_id == (
+            self.account.unique_id
+        ):
+            pos = packet.position
+            self.world.set_focus(packet.zone_id, pos.x, pos.y, pos.z)
+
     async def _handle_login_finished(self):
         self.in_world = True
 
     async def _handle_zone_packet(self, packet: packets.general.ZonePacket):
+        if self.entities is not None:
+            # positions are not scoped by zone, see EntityTracker
+            self.entities.clear()
         await self.send_packet(packets.meta.WorldRecievedGamePacket())
         self.in_world = True
         await self.events.join.emit()
@@ -76,9 +145,16 @@ class Client(BaseClient):
 
     async def _handle_protocol_sync(self, packet: packets.meta.ProtocolSyncPacket):
         if self.VERSION != packet.game_version:
-            raise ValueError(f"[Protocol Sync] Game version mismatch: Client is on {self.VERSION}, server on {packet.game_version}")
+            raise ValueError(
+                f"[Protocol Sync] Game version mismatch: Client is on {self.VERSION}, server on {packet.game_version}"
+            )
 
-        new_packets = GamePacketRegistry()
+        new_packets = GamePacketRegistry(
+            self.packet_registry.codegen,
+            self.packet_registry.zero_copy,
+            self.packet_registry.lazy_json,
+            self.packet_registry.lazy,
+        )
 
         for packet_name, packet_id in packet.packets:
             if packet_name not in self.packet_registry._packet_ids:
@@ -0,0 +1,263 @@
+import math
+import time
+from collections.abc import Hashable
+from typing import TYPE_CHECKING
+
+from ..protocol import packets
+from ..types.bin.chunks import _numpy
+
+if TYPE_CHECKING:
+    import numpy as np
+
+type Cell = tuple[int, int, int]
+
+
+def entity_key(unique_id) -> tuple[int, int, int]:
+    "A hashable key for a binary :class:`UniqueID`"
+    return (unique_id.time, unique_id.rand, unique_id.number)
+
+
+class EntityTracker:
+    """Positions of the entities and players around a client
+
+    Positions and view directions live in preallocated NumPy arrays, one row
+    per tracked entity, and every entity is filed in a uniform grid of
+    :code:`cell_size` cells. Range and nearest neighbour queries therefore
+    only look at the cells around the point. Entities are keyed by
+    :func:`entity_key` of their :class:`UniqueID`, players by their unique id
+    string. Needs numpy.
+
+    Positions are not scoped by zone: :class:`EntityPositionPacket` carries no
+    zone id, so entities and players of all zones share one grid and queries
+    can return ones from another zone at the same coordinates.
+    :class:`Client` clears its tracker whenever it receives a zone.
+    """
+
+    cell_size: float
+    positions: "np.ndarray"
+    "``float64`` rows of x, y, z, only valid for slots in use"
+    view_dirs: "np.ndarray"
+    updated: "np.ndarray"
+    "When each slot was last updated, as :func:`time.monotonic`"
+    is_player: "np.ndarray"
+
+    def __init__(self, capacity: int = 1024, cell_size: float = 16.0):
+        np = _numpy()
+        self._np = np
+        self.cell_size = cell_size
+        self.positions = np.zeros((capacity, 3))
+        self.view_dirs = np.zeros((capacity, 3))
+        self.updated = np.zeros(capacity)
+        self.is_player = np.zeros(capacity, bool)
+        self._slots: dict[Hashable, int] = {}
+        self._keys: list[Hashable | None] = [None] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+        self._cells: list[Cell | None] = [None] * capacity
+        self._grid: dict[Cell, set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slots
+
+    def _grow(self) -> None:
+        np = self._np
+        capacity = len(self._keys)
+        for name in ("positions", "view_dirs", "updated", "is_player"):
+            old = getattr(self, name)
+            new = np.zeros((capacity * 2, *old.shape[1:]), old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+        self._keys += [None] * capacity
+        self._cells += [None] * capacity
+        self._free = list(range(capacity * 2 - 1, capacity - 1, -1))
+
+    def _cell(self, x: float, y: float, z: float) -> Cell:
+        size = self.cell_size
+        return (math.floor(x / size), math.floor(y / size), math.floor(z / size))
+
+    def update(
+        self,
+        key: Hashable,
+        position: tuple[float, float, float],
+        view_dir: tuple[float, float, float] | None = None,
+        player: bool = False,
+    ) -> int:
+        "Track an entity at a new position, returning its slot"
+        slot = self._slots.get(key)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._slots[key] = self._free.pop()
+            self._keys[slot] = key
+            self.is_player[slot] = player
+        self.positions[slot] = position
+        if view_dir is not None:
+            self.view_dirs[slot] = view_dir
+        self.updated[slot] = time.monotonic()
+
+        cell = self._cell(*position)
+        old = self._cells[slot]
+        if cell != old:
+            if old is not None:
+                self._discard_from(old, slot)
+            self._grid.setdefault(cell, set()).add(slot)
+            self._cells[slot] = cell
+        return slot
+
+    def _discard_from(self, cell: Cell, slot: int) -> None:
+        members = self._grid[cell]
+        members.discard(slot)
+        if not members:
+            del self._grid[cell]
+
+    def remove(self, key: Hashable) -> bool:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return False
+        self._discard_from(self._cells[slot], slot)
+        self._cells[slot] = None
+        self._keys[slot] = None
+        self.is_player[slot] = False
+        self._free.append(slot)
+        return True
+
+    def clear(self) -> None:
+        for key in list(self._slots):
+            self.remove(key)
+
+    def prune(self, max_age: float) -> int:
+        "Forget everything not updated for :code:`max_age` seconds"
+        oldest = time.monotonic() - max_age
+        stale = [
+            key for key, slot in self._slots.items() if self.updated[slot] < oldest
+        ]
+        for key in stale:
+            self.remove(key)
+        return len(stale)
+
+    def position(self, key: Hashable) -> "np.ndarray | None":
+        slot = self._slots.get(key)
+        return None if slot is None else self.positions[slot]
+
+    def _candidates(self, center: Cell, radius: int) -> list[int]:
+        "Slots in the cells at most :code:`radius` cells away from the center"
+        cx, cy, cz = center
+        grid = self._grid
+        found = []
+        if (2 * radius + 1) ** 3 > len(grid):
+            for (x, y, z), members in grid.items():
+                if max(abs(x - cx), abs(y - cy), abs(z - cz)) <= radius:
+                    found.extend(members)
+            return found
+        for x in range(cx - radius, cx + radius + 1):
+            for y in range(cy - radius, cy + radius + 1):
+                for z in range(cz - radius, cz + radius + 1):
+                    members = grid.get((x, y, z))
+                    if members:
+                        found.extend(members)
+        return found
+
+    def _ring(self, center: Cell, radius: int) -> list[int]:
+        "Slots in the cells exactly :code:`radius` cells away from the center"
+        if radius == 0:
+            return list(self._grid.get(center, ()))
+        cx, cy, cz = center
+        grid = self._grid
+        found = []
+        for x in range(cx - radius, cx + radius + 1):
+            for y in range(cy - radius, cy + radius + 1):
+                edge = abs(x - cx) == radius or abs(y - cy) == radius
+                step = 1 if edge else 2 * radius
+                for z in range(cz - radius, cz + radius + 1, step):
+                    members = grid.get((x, y, z))
+                    if members:
+                        found.extend(members)
+        return found
+
+    def within(
+        self,
+        point: tuple[float, float, float],
+        radius: float,
+        players_only: bool = False,
+    ) -> list[Hashable]:
+        "The keys of everything within :code:`radius` of a point"
+        np = self._np
+        slots = np.array(
+            self._candidates(self._cell(*point), math.ceil(radius / self.cell_size)),
+            np.intp,
+        )
+        if players_only and len(slots):
+            slots = slots[self.is_player[slots]]
+        if not len(slots):
+            return []
+        offsets = self.positions[slots] - point
+        close = slots[np.einsum("ij,ij->i", offsets, offsets) <= radius * radius]
+        return [self._keys[slot] for slot in close]
+
+    def nearest_player(
+        self,
+        point: tuple[float, float, float],
+        max_distance: float = math.inf,
+        exclude: Hashable | None = None,
+    ) -> tuple[Hashable, float] | None:
+        """The player closest to a point and its distance
+
+        Searches the grid in growing rings of cells around the point and stops
+        once no closer player can be in the next ring.
+        """
+        np = self._np
+        if not self.is_player.any():
+            return None
+        excluded = self._slots.get(exclude, -1)
+        center = self._cell(*point)
+        best_slot, best = -1, max_distance * max_distance
+        radius = 0
+        # anything in a ring is at least (radius - 1) cells away from the point
+        while (radius - 1) * self.cell_size <= math.sqrt(best):
+            if (2 * radius + 1) ** 3 > len(self._grid):
+                # the rings now span more cells than are in use, check all
+                slots = np.flatnonzero(self.is_player)
+                last = True
+            else:
+                slots = np.array(self._ring(center, radius), np.intp)
+                last = False
+            if len(slots):
+                slots = slots[self.is_player[slots] & (slots != excluded)]
+            if len(slots):
+                offsets = self.positions[slots] - point
+                distances = np.einsum("ij,ij->i", offsets, offsets)
+                idx = int(distances.argmin())
+                if distances[idx] <= best:
+                    best_slot, best = int(slots[idx]), float(distances[idx])
+            if last:
+                break
+            radius += 1
+        if best_slot < 0:
+            return None
+        return self._keys[best_slot], math.sqrt(best)
+
+    def handle_entity_position(
+        self, packet: packets.entities.EntityPositionPacket
+    ) -> None:
+        pos, view = packet.position, packet.view_dir
+        self.update(
+            entity_key(packet.entity_unique_id),
+            (pos.x, pos.y, pos.z),
+            (view.x, view.y, view.z),
+        )
+
+    def handle_player_position(
+        self, packet: packets.entities.PlayerPositionPacket
+    ) -> None:
+        pos, view = packet.position, packet.view_dir
+        self.update(
+            packet.player_unique_id,
+            (pos.x, pos.y, pos.z),
+            (view.x, view.y, view.z),
+            player=True,
+        )
+
+    def handle_despawn(self, packet: packets.entities.DespawnEntityPacket) -> None:
+        self.remove(entity_key(packet.unique_entity_id))
@@ -0,0 +1,201 @@
+import sys
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Literal
+
+from ..protocol import packets
+from ..types.bin.chunks import SIZE, Chunk, _numpy
+
+type ChunkKey = tuple[str, int, int, int]
+type ChunkDecoder = Callable[[bytes, int, int, int], Chunk]
+"Decodes a chunk blob of a :class:`ChunkColumnPacket` at chunk coordinates x, y, z"
+
+_CHUNK_OVERHEAD = 256
+"Rough size of a chunk's Python objects besides its block data"
+
+
+class WorldCache:
+    """The chunks a client has received, with their blocks kept up to date
+
+    Chunks are stored by :code:`(zone_id, cx, cy, cz)` as the blobs they were
+    received as and decoded with :code:`decoder` on their first block access,
+    after which looking up a block is one dict access and one array access.
+    Without a decoder, only the blobs are kept. Once the chunks take more than
+    :code:`max_bytes`, the least recently used ones are evicted or, with
+    :code:`eviction="distance"`, the ones farthest from :meth:`set_focus`.
+
+    Blocks can only be changed in decoded chunks, so a change to a chunk that
+    cannot be decoded, or a broken block without an :code:`air` state to
+    replace it with, drops the chunk instead of keeping it out of date.
+    """
+
+    max_bytes: int
+    eviction: Literal["lru", "distance"]
+    decoder: ChunkDecoder | None
+    air: str | None
+    "The block state broken blocks are replaced with"
+    size: int
+    "The approximate number of bytes the cached chunks take"
+    evicted: int
+    focus: tuple[str, float, float, float] | None
+    "Where the player is, chunks far from it are evicted first"
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        eviction: Literal["lru", "distance"] = "lru",
+        decoder: ChunkDecoder | None = None,
+        air: str | None = None,
+    ):
+        if eviction not in ("lru", "distance"):
+            raise ValueError(f"Unknown eviction policy {eviction}")
+        if decoder is not None:
+            _numpy()
+        self.max_bytes = max_bytes
+        self.eviction = eviction
+        self.decoder = decoder
+        self.air = air
+        self.size = 0
+        self.evicted = 0
+        self.focus = None
+        self._chunks: OrderedDict[ChunkKey, Chunk | bytes] = OrderedDict()
+
+    @staticmethod
+    def _chunk_size(chunk: Chunk | bytes) -> int:
+        if isinstance(chunk, bytes):
+            return len(chunk) + _CHUNK_OVERHEAD
+        return chunk.blocks.nbytes + 8 * len(chunk.palette) + _CHUNK_OVERHEAD
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def __contains__(self, key: ChunkKey) -> bool:
+        return key in self._chunks
+
+    def _get(self, key: ChunkKey) -> Chunk | bytes | None:
+        chunk = self._chunks.get(key)
+        if chunk is not None and self.eviction == "lru":
+            self._chunks.move_to_end(key)
+        return chunk
+
+    def _decoded(self, key: ChunkKey) -> Chunk | None:
+        chunk = self._get(key)
+        if not isinstance(chunk, bytes):
+            return chunk
+        if self.decoder is None:
+            raise RuntimeError("Accessing blocks needs a WorldCache with a decoder")
+        decoded = self.decoder(chunk, key[1], key[2], key[3])
+        self._chunks[key] = decoded
+        self.size += self._chunk_size(decoded) - self._chunk_size(chunk)
+        return decoded
+
+    def get_chunk(self, zone_id: str, cx: int, cy: int, cz: int) -> Chunk | None:
+        "A loaded chunk, decoded if it was not yet"
+        return self._decoded((zone_id, cx, cy, cz))
+
+    def get_raw(self, zone_id: str, cx: int, cy: int, cz: int) -> bytes | None:
+        "The blob of a loaded chunk, :code:`None` if not loaded or already decoded"
+        chunk = self._get((zone_id, cx, cy, cz))
+        return chunk if isinstance(chunk, bytes) else None
+
+    def put_chunk(
+        self, zone_id: str, cx: int, cy: int, cz: int, chunk: Chunk | bytes
+    ) -> None:
+        "Store a chunk, decoded or as received"
+        key = (zone_id, cx, cy, cz)
+        old = self._chunks.pop(key, None)
+        if old is not None:
+            self.size -= self._chunk_size(old)
+        self._chunks[key] = chunk
+        self.size += self._chunk_size(chunk)
+        if self.size > self.max_bytes:
+            self._evict()
+
+    def remove_chunk(
+        self, zone_id: str, cx: int, cy: int, cz: int
+    ) -> Chunk | bytes | None:
+        chunk = self._chunks.pop((zone_id, cx, cy, cz), None)
+        if chunk is not None:
+            self.size -= self._chunk_size(chunk)
+        return chunk
+
+    def clear(self) -> None:
+        self._chunks.clear()
+        self.size = 0
+
+    def block_at(self, zone_id: str, x: int, y: int, z: int) -> str | None:
+        """The block state id at a block position, :code:`None` if not loaded
+
+        :raises RuntimeError: If the chunk needs decoding and there is no decoder
+        """
+        chunk = self._decoded((zone_id, x // SIZE, y // SIZE, z // SIZE))
+        if chunk is None:
+            return None
+        return chunk.palette[chunk.blocks[y % SIZE, z % SIZE, x % SIZE]]
+
+    def set_block(
+        self, zone_id: str, x: int, y: int, z: int, state: str | None
+    ) -> bool:
+        """Change a block in a loaded chunk
+
+        Without a decoder or a state, the chunk is dropped instead.
+
+        :return: Whether the block was changed
+        """
+        key = (zone_id, x // SIZE, y // SIZE, z // SIZE)
+        chunk = self._get(key)
+        if chunk is None:
+            return False
+        if state is None or (isinstance(chunk, bytes) and self.decoder is None):
+            self.remove_chunk(*key)
+            return False
+        chunk = self._decoded(key)
+        try:
+            idx = chunk.palette.index(state)
+        except ValueError:
+            idx = len(chunk.palette)
+            chunk.palette.append(sys.intern(state))
+            self.size += 8
+        chunk.blocks[y % SIZE, z % SIZE, x % SIZE] = idx
+        return True
+
+    def set_focus(self, zone_id: str, x: float, y: float, z: float) -> None:
+        "Set the position chunks are kept around with distance eviction"
+        self.focus = (zone_id, x / SIZE, y / SIZE, z / SIZE)
+
+    def _distance(self, key: ChunkKey) -> float:
+        zone_id, fx, fy, fz = self.focus
+        if key[0] != zone_id:
+            return float("inf")
+        return (
+            (key[1] + 0.5 - fx) ** 2
+            + (key[2] + 0.5 - fy) ** 2
+            + (key[3] + 0.5 - fz) ** 2
+        )
+
+    def _evict(self) -> None:
+        # evict down to 90% of the budget, so evictions come in batches
+        target = self.max_bytes * 0.9
+        if self.eviction == "distance" and self.focus is not None:
+            order = sorted(self._chunks, key=self._distance, reverse=True)
+        else:
+            order = list(self._chunks)
+        for key in order:
+            if self.size <= target or len(self._chunks) <= 1:
+                break
+            self.size -= self._chunk_size(self._chunks.pop(key))
+            self.evicted += 1
+
+    def handle_chunk_column(self, packet: packets.general.ChunkColumnPacket) -> None:
+        for idx, data in enumerate(packet.chunk_cols):
+            # copies views, so the cache does not keep whole frames alive
+            data = bytes(data)
+            self.put_chunk(packet.zone_id, packet.x, packet.y + idx, packet.z, data)
+
+    def handle_block_replace(self, packet: packets.blocks.BlockReplacePacket) -> None:
+        pos = packet.block_pos
+        self.set_block(packet.zone_id, pos.x, pos.y, pos.z, packet.block_state_id)
+
+    def handle_break_block(self, packet: packets.blocks.BreakBlockPacket) -> None:
+        pos = packet.block_pos
+        self.set_block(packet.zone_id, pos.x, pos.y, pos.z, self.air)
@@ -0,0 +1,153 @@
+import asyncio
+import socket
+import threading
+from typing import Any, Callable
+
+type Frame = bytes | bytearray | memoryview
+
+
+def _schedule_timer(delay: float, callback: Callable[[], None]) -> threading.Timer:
+    timer = threading.Timer(delay, callback)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def sendmsg_all(sock: socket.socket, frames: list[Frame]) -> None:
+    "Send all frames with as few :code:`sendmsg` calls as possible"
+    if not hasattr(sock, "sendmsg"):
+        sock.sendall(b"".join(frames))
+        return
+    views = [memoryview(frame) for frame in frames]
+    while views:
+        sent = sock.sendmsg(views)
+        while views and sent >= len(views[0]):
+            sent -= len(views.pop(0))
+        if sent:
+            views[0] = views[0][sent:]
+
+
+class OutputBatcher:
+    """Coalesces outgoing frames into fewer, larger writes
+
+    Frames are buffered until a packet in :code:`flush_on` (usually the
+    :class:`EndTickPacket`) is added, :code:`max_bytes` are buffered or the
+    oldest frame has waited :code:`max_delay` seconds. The buffered frames are
+    then handed to :code:`write` as one list, to be written with a single
+    :code:`writelines`/:code:`sendmsg`.
+
+    Once a frame is added from a running event loop, the batcher is bound to
+    it, and :code:`write` is only called on that loop; flushes from other
+    threads are handed over with :code:`call_soon_threadsafe`. Without a loop,
+    deadlines are kept by a timer thread that calls :code:`write` itself.
+    """
+
+    FLUSH_REASONS = ("tick", "size", "deadline", "manual")
+
+    write: Callable[[list[Frame]], Any]
+    max_bytes: int
+    max_delay: float | None
+    flush_on: tuple[type, ...]
+    flushes: dict[str, int]
+    "How often the buffer was flushed, by reason"
+    frames_flushed: int
+    bytes_flushed: int
+    loop: asyncio.AbstractEventLoop | None
+    "The event loop :code:`write` is called on, if bound to one"
+
+    def __init__(
+        self,
+        write: Callable[[list[Frame]], Any],
+        max_bytes: int = 65536,
+        max_delay: float | None = 0.005,
+        flush_on: tuple[type, ...] = (),
+    ):
+        self.write = write
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self.flush_on = flush_on
+        self.flushes = dict.fromkeys(self.FLUSH_REASONS, 0)
+        self.frames_flushed = 0
+        self.bytes_flushed = 0
+        self._frames: list[Frame] = []
+        self._size = 0
+        self.loop = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def _schedule(self, delay: float, callback: Callable[[], None]) -> Any:
+        if self.loop is not None and _running_loop() is self.loop:
+            return self.loop.call_later(delay, callback)
+        return _schedule_timer(delay, callback)
+
+    def pending(self) -> int:
+        "The number of bytes waiting to be flushed"
+        return self._size
+
+    def add(self, frame: Frame, packet: Any = None) -> bool:
+        """Buffer a frame, flushing if that is due
+
+        :param packet: The packet the frame was serialized from, if known
+        :return: Whether the buffer was flushed
+        """
+        if self.loop is None:
+            self.loop = _running_loop()
+        with self._lock:
+            self._frames.append(frame)
+            self._size += len(frame)
+            if packet is not None and isinstance(packet, self.flush_on):
+                self._flush("tick")
+            elif self._size >= self.max_bytes:
+                self._flush("size")
+            else:
+                if self._timer is None and self.max_delay is not None:
+                    self._timer = self._schedule(self.max_delay, self._on_deadline)
+                return False
+        return True
+
+    def flush(self) -> None:
+        "Write out everything buffered right away"
+        with self._lock:
+            if self._frames:
+                self._flush("manual")
+
+    def _on_deadline(self) -> None:
+        with self._lock:
+            self._timer = None
+            if self._frames:
+                self._flush("deadline")
+
+    def _flush(self, reason: str) -> None:
+        on_loop = self.loop is None or _running_loop() is self.loop
+        if self._timer is not None:
+            if on_loop or isinstance(self._timer, threading.Timer):
+                self._timer.cancel()
+            else:
+                self.loop.call_soon_threadsafe(self._timer.cancel)
+            self._timer = None
+        frames = self._frames
+        self.flushes[reason] += 1
+        self.frames_flushed += len(frames)
+        self.bytes_flushed += self._size
+        self._frames = []
+        self._size = 0
+        if on_loop:
+            self.write(frames)
+        else:
+            self.loop.call_soon_threadsafe(self.write, frames)
+
+    def stats(self) -> dict[str, Any]:
+        "The flush counters as a plain dict"
+        return {
+            "flushes": dict(self.flushes),
+            "frames": self.frames_flushed,
+            "bytes": self.bytes_flushed,
+            "pending": self._size,
+        }
@@ -1,14 +1,132 @@
 import asyncio
+import enum
+import inspect
+import traceback
+from collections import deque
+from itertools import count
 from typing import Any, Callable, Coroutine
 
 
+async def _call(handler: Callable[..., Any], *args, **kwargs) -> None:
+    result = handler(*args, **kwargs)
+    if inspect.isawaitable(result):
+        await result
+
+
+class ExecutionMode(enum.Enum):
+    "How an event runs the handlers of an emit"
+
+    SEQUENTIAL = "sequential"
+    "One after another, :code:`emit` returns once all of them finished"
+    CONCURRENT = "concurrent"
+    "Each in its own task, :code:`emit` only waits for a free slot"
+    ORDERED = "ordered"
+    "In order for emits with the same key, in parallel for different keys"
+
+
 class ListenableEvent:
+    """An event handlers can be registered for and waited on
+
+    How handlers are run is configured with :meth:`configure`. In the
+    concurrent modes at most :attr:`max_concurrency` handler calls are queued
+    or running at once, :code:`emit` waits for a free slot beyond that.
+    Exceptions raised by handlers are printed and kept in :attr:`errors`
+    instead of being raised from :code:`emit`.
+    """
+
     _handlers: list[Callable[..., Coroutine[Any, Any, None]]]
     _events: list[asyncio.Event]
+    mode: ExecutionMode
+    max_concurrency: int | None
+    key: Callable[..., Any] | None
+    "Computes the ordering key from the emit arguments in ``ORDERED`` mode"
+    errors: deque[Exception]
+    "The most recent exceptions raised by handlers"
 
-    def __init__(self):
+    def __init__(
+        self,
+        mode: ExecutionMode = ExecutionMode.SEQUENTIAL,
+        max_concurrency: int | None = None,
+        key: Callable[..., Any] | None = None,
+    ):
         self._handlers = []
         self._events = []
+        self.errors = deque(maxlen=100)
+        self._tasks: set[asyncio.Task] = set()
+        self._ordered: dict[Any, deque] = {}
+        self.configure(mode, max_concurrency, key)
+
+    def configure(
+        self,
+        mode: ExecutionMode = ExecutionMode.SEQUENTIAL,
+        max_concurrency: int | None = None,
+        key: Callable[..., Any] | None = None,
+    ) -> None:
+        """Change how handlers are run
+
+        :param max_concurrency: The limit of handler calls in flight, only
+            used by the concurrent modes
+        :param key: Called with the emit arguments in ``ORDERED`` mode, emits
+            with equal keys are handled in order. Without it, all emits are.
+        """
+        self.mode = mode
+        self.max_concurrency = max_concurrency
+        self.key = key
+        self._slots = (
+            None if max_concurrency is None else asyncio.Semaphore(max_concurrency)
+        )
+
+    async def _run(self, handler: Callable[..., Any], args, kwargs) -> None:
+        try:
+            await _call(handler, *args, **kwargs)
+        except Exception as e:
+            self.errors.append(e)
+            print("----- ERROR -----")
+            traceback.print_exception(e)
+            print("-----------------")
+
+    async def _run_in_slot(self, handler: Callable[..., Any], args, kwargs) -> None:
+        try:
+            await self._run(handler, args, kwargs)
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    async def _run_ordered(self, key: Any, pending: deque) -> None:
+        while pending:
+            await self._run_in_slot(*pending.popleft())
+        del self._ordered[key]
+
+    def _spawn(self, coro: Coroutine) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, handlers: list[Callable[..., Any]], args, kwargs):
+        if self.mode is ExecutionMode.SEQUENTIAL:
+            for handler in handlers:
+                await self._run(handler, args, kwargs)
+            return
+        ordered = self.mode is ExecutionMode.ORDERED
+        if ordered and handlers:
+            key = None if self.key is None else self.key(*args, **kwargs)
+        for handler in handlers:
+            if self._slots is not None:
+                await self._slots.acquire()
+            if not ordered:
+                self._spawn(self._run_in_slot(handler, args, kwargs))
+                continue
+            # looked up per call, the worker quits once its queue ran empty
+            pending = self._ordered.get(key)
+            if pending is None:
+                pending = self._ordered[key] = deque()
+                self._spawn(self._run_ordered(key, pending))
+            pending.append((handler, args, kwargs))
+
+    async def drain(self) -> None:
+        "Wait until all handler calls started so far have finished"
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
 
     def add_handler(self, handler: Callable[..., Coroutine[Any, Any, None]]) -> None:
         self._handlers.append(handler)
@@ -20,8 +138,7 @@ class ListenableEvent:
         return handler
 
     async def emit(self, *args, **kwargs) -> None:
-        for handler in self._handlers:
-            await asyncio.get_event_loop().create_task(handler(*args, **kwargs))
+        await self._dispatch(self._handlers, args, kwargs)
         for event in self._events:
             event.set()
 
@@ -33,15 +150,62 @@ class ListenableEvent:
 
 
 class FilterableListenableEvent(ListenableEvent):
-    _handlers: list[tuple[Callable[..., Coroutine[Any, Any, None]], Any]]
-    _events: list[tuple[asyncio.Event, Any]]
+    """An event whose handlers only receive emits matching their filter
+
+    Handlers and waiters are indexed by their filter, so emitting only looks
+    at the handlers registered for that filter and the ones without a filter.
+    With :attr:`match_subclasses`, a class filter also receives emits for
+    its subclasses, e.g. a handler for a packet base class.
+    """
+
+    _handlers: dict[Any, list[tuple[int, Callable[..., Coroutine[Any, Any, None]]]]]
+    "Handlers with their registration order by filter, :code:`None` for all"
+    _events: dict[Any, list[asyncio.Event]]
+    match_subclasses: bool
+
+    def __init__(
+        self,
+        match_subclasses: bool = False,
+        mode: ExecutionMode = ExecutionMode.SEQUENTIAL,
+        max_concurrency: int | None = None,
+        key: Callable[..., Any] | None = None,
+    ):
+        super().__init__(mode, max_concurrency, key)
+        self._handlers = {}
+        self._events = {}
+        self.match_subclasses = match_subclasses
+        self._order = count()
+        self._resolved: dict[Any, list[Callable[..., Any]]] = {}
+
+    def _keys(self, filter_: Any) -> list[Any]:
+        if self.match_subclasses and isinstance(filter_, type):
+            return [*filter_.__mro__, None]
+        return [filter_, None]
 
     def add_handler(
         self,
         handler: Callable[..., Coroutine[Any, Any, None]],
         filter_: Any | None = None,
     ) -> None:
-        self._handlers.append((handler, filter_))
+        self._handlers.setdefault(filter_, []).append((next(self._order), handler))
+        self._resolved.clear()
+
+    def handlers_for(self, filter_: Any) -> list[Callable[..., Any]]:
+        "The handlers an emit with this filter calls, in registration order"
+        try:
+            return self._resolved[filter_]
+        except KeyError:
+            pass
+        if filter_ is None:
+            found = [entry for entries in self._handlers.values() for entry in entries]
+        else:
+            found = [
+                entry
+                for key in self._keys(filter_)
+                for entry in self._handlers.get(key, ())
+            ]
+        resolved = self._resolved[filter_] = [handler for _, handler in sorted(found)]
+        return resolved
 
     def only(self, filter_: Any) -> Callable[
         [Callable[..., Coroutine[Any, Any, None]]],
@@ -60,15 +224,24 @@ class FilterableListenableEvent(ListenableEvent):
         return handler
 
     async def emit(self, filter_, *args, **kwargs) -> None:
-        for handler, filt_ in self._handlers:
-            if filter_ is None or filt_ is None or filt_ == filter_ or filt_ is filter_:
-                await asyncio.get_event_loop().create_task(handler(*args, **kwargs))
-        for event, filt_ in self._events:
-            if filter_ is None or filt_ is None or filt_ == filter_ or filt_ is filter_:
+        await self._dispatch(self.handlers_for(filter_), args, kwargs)
+        if not self._events:
+            return
+        if filter_ is None:
+            keys = list(self._events)
+        else:
+            keys = self._keys(filter_)
+        for key in keys:
+            for event in self._events.get(key, ()):
                 event.set()
 
     async def wait_for(self, _filter=None):
         event = asyncio.Event()
-        self._events.append((event, _filter))
-        await event.wait()
-        self._events.remove((event, _filter))
+        waiters = self._events.setdefault(_filter, [])
+        waiters.append(event)
+        try:
+            await event.wait()
+        finally:
+            waiters.remove(event)
+            if not waiters and self._events.get(_filter) is waiters:
+                del self._events[_filter]
@@ -0,0 +1,248 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from ..protocol import Direction
+
+_SUB_BITS = 4
+"Every power of two is split into 2**_SUB_BITS buckets, ~6% apart"
+_SUB_MASK = (1 << _SUB_BITS) - 1
+_PROMETHEUS_BOUNDS = range(10, 35)
+"Histogram bounds exported to Prometheus as powers of two nanoseconds, 1us to 17s"
+
+
+def _bucket(value: int) -> int:
+    exponent = value.bit_length()
+    if exponent <= _SUB_BITS:
+        return value
+    shift = exponent - _SUB_BITS - 1
+    return ((shift + 1) << _SUB_BITS) + (value >> shift) - (1 << _SUB_BITS)
+
+
+def _bucket_end(idx: int) -> int:
+    "The first value above a bucket"
+    idx += 1
+    if idx < 1 << _SUB_BITS:
+        return idx
+    return ((idx & _SUB_MASK) + (1 << _SUB_BITS)) << ((idx >> _SUB_BITS) - 1)
+
+
+def _label(value: str) -> str:
+    "A Prometheus label value, quoted and escaped"
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+class Histogram:
+    """Counts of nanosecond values in logarithmic buckets
+
+    Like HDR histograms, each power of two is split into linear buckets, so
+    any value is known to about 6% while recording stays a few integer
+    operations and a dict update.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    counts: dict[int, int]
+    count: int
+    total: int
+    min: int
+    max: int
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        idx = _bucket(value)
+        self.counts[idx] = self.counts.get(idx, 0) + 1
+        if not self.count or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def percentile(self, percent: float) -> int:
+        "The value :code:`percent` percent of the recorded values are at most"
+        if not self.count:
+            return 0
+        wanted = max(1, round(self.count * percent / 100))
+        seen = 0
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+            if seen >= wanted:
+                return min(_bucket_end(idx) - 1, self.max)
+        return self.max
+
+    def cumulative(self, bounds: list[int]) -> list[int]:
+        "How many values are below each of the ascending bounds"
+        found = [0] * len(bounds)
+        for idx, count in self.counts.items():
+            end = _bucket_end(idx)
+            for pos, bound in enumerate(bounds):
+                if end <= bound:
+                    found[pos] += count
+        return found
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+        }
+
+
+class PacketStats:
+    __slots__ = ("count", "bytes", "latency")
+
+    count: int
+    bytes: int
+    latency: Histogram
+    "Nanoseconds the operation took"
+
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.latency = Histogram()
+
+
+class Metrics:
+    """Counts, bytes and latencies of packets by operation, direction and type
+
+    Operations are ``serialize``, ``deserialize`` and ``dispatch``, i.e. the
+    time the handlers of a received packet took, which has no bytes.
+    Registries and connections only record into a :class:`Metrics` once it is
+    enabled on them, see :meth:`GamePacketRegistry.enable_metrics`; otherwise
+    they pay for a single attribute check per packet.
+    """
+
+    stats: dict[tuple[str, Direction, str], PacketStats]
+    "Keyed by operation, direction and :code:`PACKET_NAME`"
+
+    def __init__(self):
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        operation: str,
+        direction: Direction,
+        packet_name: str,
+        size: int,
+        nanoseconds: int,
+    ) -> None:
+        key = (operation, direction, packet_name)
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = PacketStats()
+            stats.count += 1
+            stats.bytes += size
+            stats.latency.record(nanoseconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats = {}
+
+    def to_dict(self) -> dict[str, dict[str, dict[str, dict[str, Any]]]]:
+        "A snapshot as ``{operation: {direction: {PACKET_NAME: stats}}}``"
+        snapshot = {}
+        with self._lock:
+            for (operation, direction, name), stats in self.stats.items():
+                snapshot.setdefault(operation, {}).setdefault(direction.value, {})[
+                    name
+                ] = {
+                    "count": stats.count,
+                    "bytes": stats.bytes,
+                    "latency_ns": stats.latency.to_dict(),
+                }
+        return snapshot
+
+    def to_prometheus(self, prefix: str = "cosmic_reach") -> str:
+        "A snapshot in the Prometheus text exposition format"
+        bounds = [1 << exponent for exponent in _PROMETHEUS_BOUNDS]
+        counts = [
+            f"# HELP {prefix}_packets_total Packets processed",
+            f"# TYPE {prefix}_packets_total counter",
+        ]
+        sizes = [
+            f"# HELP {prefix}_packet_bytes_total Bytes of the packets processed",
+            f"# TYPE {prefix}_packet_bytes_total counter",
+        ]
+        latencies = [
+            f"# HELP {prefix}_packet_seconds Time it took to process a packet",
+            f"# TYPE {prefix}_packet_seconds histogram",
+        ]
+        with self._lock:
+            for (operation, direction, name), stats in sorted(
+                self.stats.items(),
+                key=lambda item: (item[0][0], item[0][1].value, item[0][2]),
+            ):
+                labels = (
+                    f"operation={_label(operation)},"
+                    f"direction={_label(direction.value)},packet={_label(name)}"
+                )
+                counts.append(f"{prefix}_packets_total{{{labels}}} {stats.count}")
+                if operation != "dispatch":
+                    sizes.append(
+                        f"{prefix}_packet_bytes_total{{{labels}}} {stats.bytes}"
+                    )
+                latency = stats.latency
+                for bound, below in zip(bounds, latency.cumulative(bounds)):
+                    latencies.append(
+                        f'{prefix}_packet_seconds_bucket{{{labels},le="{bound / 1e9:g}"}}'
+                        f" {below}"
+                    )
+                latencies.append(
+                    f'{prefix}_packet_seconds_bucket{{{labels},le="+Inf"}} {latency.count}'
+                )
+                latencies.append(
+                    f"{prefix}_packet_seconds_sum{{{labels}}} {latency.total / 1e9:g}"
+                )
+                latencies.append(
+                    f"{prefix}_packet_seconds_count{{{labels}}} {latency.count}"
+                )
+        return "\n".join(counts + sizes + latencies) + "\n"
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9464) -> ThreadingHTTPServer:
+        """Serve snapshots over HTTP from a background thread
+
+        ``/metrics`` is in the Prometheus format, ``/metrics.json`` is
+        :meth:`to_dict`. Stop it with :code:`.shutdown()` on the returned
+        server.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = metrics.to_prometheus().encode()
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(metrics.to_dict()).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -0,0 +1,178 @@
+import asyncio
+import enum
+from collections import deque
+from typing import Any, Callable
+
+from .transport import StreamTransport
+
+type Frame = bytes | bytearray | memoryview
+type QueueItem = Frame | list[Frame]
+
+
+class OverflowPolicy(enum.Enum):
+    "What a :class:`SendQueue` does when it is full"
+
+    BLOCK = "block"
+    "Wait for room, or stop reading from the peer if the sender cannot wait"
+    DROP_OLDEST = "drop_oldest"
+    "Drop the oldest queued frames to make room"
+    DISCONNECT = "disconnect"
+    "Give up on the peer, see :code:`on_overflow`"
+
+
+class SendQueue:
+    """A bounded queue of outgoing frames, written by one task per connection
+
+    The queue is full once it holds :code:`max_frames` items or
+    :code:`max_bytes` bytes, what happens then is decided by the
+    :class:`OverflowPolicy`. Items are single frames or lists of frames, the
+    latter are written with one :code:`writelines`.
+    """
+
+    transport: StreamTransport
+    max_frames: int
+    max_bytes: int
+    policy: OverflowPolicy
+    on_overflow: Callable[[], Any] | None
+    "Called once the queue overflows with the ``DISCONNECT`` policy"
+    bytes_queued: int
+    "The number of bytes waiting in the queue"
+    dropped: int
+    "The number of items dropped with the ``DROP_OLDEST`` policy"
+    overflowed: bool
+
+    def __init__(
+        self,
+        transport: StreamTransport,
+        max_frames: int = 4096,
+        max_bytes: int = 8 * 1024 * 1024,
+        policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        on_overflow: Callable[[], Any] | None = None,
+    ):
+        self.transport = transport
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.on_overflow = on_overflow
+        self.bytes_queued = 0
+        self.dropped = 0
+        self.overflowed = False
+        self._items: deque[tuple[QueueItem, int]] = deque()
+        self._wakeup = asyncio.Event()
+        self._room = asyncio.Event()
+        self._room.set()
+        self._closed = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def depth(self) -> int:
+        "The number of items waiting in the queue"
+        return len(self._items)
+
+    @property
+    def bytes_in_flight(self) -> int:
+        "Bytes queued here and not yet sent from the transport's write buffer"
+        transport = self.transport.writer.transport
+        return self.bytes_queued + transport.get_write_buffer_size()
+
+    @property
+    def closed(self) -> bool:
+        "Whether items are no longer accepted"
+        return self._closed or self.overflowed
+
+    def full(self) -> bool:
+        return (
+            len(self._items) >= self.max_frames or self.bytes_queued >= self.max_bytes
+        )
+
+    def put_nowait(self, item: QueueItem) -> bool:
+        """Queue an item without waiting
+
+        With the ``BLOCK`` policy, the item is queued even if the queue is full;
+        the connection should then await :meth:`wait_for_room` before producing
+        more, e.g. before reading the next packet.
+
+        :return: Whether the item was queued, :code:`False` once the queue was
+            closed or the peer is gone
+        """
+        if self._closed or self.overflowed:
+            return False
+        if self.full():
+            if self.policy is OverflowPolicy.DROP_OLDEST:
+                while self._items and self.full():
+                    self.bytes_queued -= self._items.popleft()[1]
+                    self.dropped += 1
+            elif self.policy is OverflowPolicy.DISCONNECT:
+                self.overflowed = True
+                self._items.clear()
+                self.bytes_queued = 0
+                if self.on_overflow is not None:
+                    self.on_overflow()
+                return False
+        size = sum(map(len, item)) if item.__class__ is list else len(item)
+        self._items.append((item, size))
+        self.bytes_queued += size
+        self._wakeup.set()
+        return True
+
+    async def put(self, item: QueueItem) -> bool:
+        "Queue an item, waiting for room with the ``BLOCK`` policy"
+        await self.wait_for_room()
+        return self.put_nowait(item)
+
+    async def wait_for_room(self) -> None:
+        "Wait until the queue is no longer full, if the policy is ``BLOCK``"
+        while self.policy is OverflowPolicy.BLOCK and self.full() and not self._closed:
+            self._room.clear()
+            await self._room.wait()
+
+    async def _write_loop(self) -> None:
+        items = self._items
+        try:
+            while True:
+                while not items:
+                    if self._closed:
+                        return
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                while items:
+                    item, size = items.popleft()
+                    self.bytes_queued -= size
+                    if item.__class__ is list:
+                        self.transport.writelines(item)
+                    else:
+                        self.transport.write(item)
+                self._room.set()
+                try:
+                    await self.transport.drain()
+                except ConnectionError:
+                    return
+        finally:
+            # nothing is written anymore, so release producers waiting for room
+            self._closed = True
+            items.clear()
+            self.bytes_queued = 0
+            self._room.set()
+            self._wakeup.set()
+
+    def start(self) -> None:
+        "Start the writer task"
+        if self._task is None:
+            self._task = asyncio.create_task(self._write_loop())
+
+    async def close(self) -> None:
+        "Stop accepting items and wait until the queued ones were written"
+        self._closed = True
+        self._wakeup.set()
+        self._room.set()
+        if self._task is not None:
+            await self._task
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "bytes_queued": self.bytes_queued,
+            "bytes_in_flight": self.bytes_in_flight,
+            "dropped": self.dropped,
+            "overflowed": self.overflowed,
+        }
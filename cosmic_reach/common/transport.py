@@ -0,0 +1,57 @@
+import asyncio
+
+
+class StreamTransport:
+    """A non-blocking connection on top of asyncio streams
+
+    Whole frames are written as produced by
+    :meth:`GamePacketRegistry.serialize_packet`, reads return raw chunks to be
+    fed into a :class:`PacketDecoder`.
+    """
+
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int, **kwargs) -> "StreamTransport":
+        "Connect to a remote host, see :func:`asyncio.open_connection`"
+        reader, writer = await asyncio.open_connection(host, port, **kwargs)
+        return cls(reader, writer)
+
+    @property
+    def closed(self) -> bool:
+        return self.writer.is_closing()
+
+    async def read_chunk(self, size: int = 65536) -> bytes:
+        """Read whatever is available, up to :code:`size` bytes
+
+        :raises ConnectionError: If the connection was closed by the remote
+        """
+        chunk = await self.reader.read(size)
+        if not chunk:
+            self.writer.close()
+            raise ConnectionResetError("Connection closed by remote")
+        return chunk
+
+    def write(self, frame: bytes | bytearray) -> None:
+        "Queue a complete frame for sending, without waiting for it to be sent"
+        self.writer.write(frame)
+
+    def writelines(self, frames: list[bytes | bytearray | memoryview]) -> None:
+        "Queue several frames at once, sent with a single syscall where possible"
+        self.writer.writelines(frames)
+
+    async def drain(self) -> None:
+        "Wait until the write buffer has been flushed far enough"
+        await self.writer.drain()
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
@@ -0,0 +1,107 @@
+import struct
+
+_unpack_length = struct.Struct(">i").unpack_from
+
+
+def _check_length(length: int, available: int) -> None:
+    "Refuse a negative length prefix or one claiming more than is available"
+    if length < 0:
+        raise ValueError(f"Negative length {length}")
+    if length > available:
+        raise EOFError(f"Expected {length} bytes, only {available} are left")
+
+
+class BufferReader:
+    """A read cursor over a bytes-like object
+
+    Drop-in replacement for :class:`io.BytesIO` when deserializing. The buffer is
+    never copied as a whole; :meth:`subreader` splits off frames without copying
+    and with :code:`zero_copy` the ``bytes`` deserializer returns
+    :class:`memoryview` slices into the buffer. Call :code:`.tobytes()` on those
+    if they should outlive it.
+    """
+
+    __slots__ = ("data", "view", "pos", "end", "zero_copy", "lazy_json")
+
+    data: bytes | memoryview
+    "The underlying buffer, sliced for copying reads"
+    view: memoryview
+    "A view of the underlying buffer, ending where this reader ends"
+    pos: int
+    end: int
+    zero_copy: bool
+    lazy_json: bool
+    "Whether ``dict`` fields are decoded as :class:`LazyJson` instead"
+
+    def __init__(
+        self,
+        data: bytes | bytearray | memoryview,
+        zero_copy: bool = False,
+        start: int = 0,
+        end: int | None = None,
+    ):
+        view = memoryview(data)
+        if view.format != "B" or not view.c_contiguous:
+            view = view.cast("B")
+        self.data = data if isinstance(data, bytes) else view
+        self.end = len(view) if end is None else end
+        self.view = view if self.end == len(view) else view[: self.end]
+        self.pos = start
+        self.zero_copy = zero_copy
+        self.lazy_json = False
+
+    def remaining(self) -> int:
+        return self.end - self.pos
+
+    def _advance(self, size: int) -> int:
+        start = self.pos
+        self.pos = self.end if size < 0 or start + size > self.end else start + size
+        return start
+
+    def read(self, size: int = -1) -> bytes:
+        start = self._advance(size)
+        if self.data.__class__ is bytes:
+            return self.data[start : self.pos]
+        return self.data[start : self.pos].tobytes()
+
+    def read_view(self, size: int = -1) -> memoryview:
+        "Read up to :code:`size` bytes (all if negative) without copying them"
+        start = self._advance(size)
+        return self.view[start : self.pos]
+
+    def read_bytes(self, size: int) -> bytes | memoryview:
+        "Read a ``bytes`` value, as a view into the buffer if :code:`zero_copy` is set"
+        if self.zero_copy:
+            return self.read_view(size)
+        return self.read(size)
+
+    def _prefixed(self) -> tuple[int, int]:
+        (length,) = _unpack_length(self.view, self.pos)
+        start = self.pos + 4
+        _check_length(length, self.end - start)
+        self.pos = start + length
+        return start, self.pos
+
+    def read_prefixed_view(self) -> memoryview:
+        "Read a value prefixed by its length without copying it"
+        start, end = self._prefixed()
+        return self.view[start:end]
+
+    def read_prefixed(self) -> bytes | memoryview:
+        "Read a ``bytes`` value prefixed by its length"
+        start, end = self._prefixed()
+        if self.zero_copy:
+            return self.view[start:end]
+        if self.data.__class__ is bytes:
+            return self.data[start:end]
+        return self.data[start:end].tobytes()
+
+    def unpack(self, struct_: struct.Struct) -> tuple:
+        values = struct_.unpack_from(self.view, self.pos)
+        self.pos += struct_.size
+        return values
+
+    def subreader(self, size: int) -> "BufferReader":
+        "Split off the next :code:`size` bytes into their own reader"
+        start = self._advance(size)
+        return BufferReader(self.data, self.zero_copy, start, self.pos)
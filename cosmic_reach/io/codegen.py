@@ -0,0 +1,189 @@
+"""Generate straight-line encoders and decoders for :class:`Complex` classes
+
+The generic path walks a :class:`ComplexLayout` step by step. The code generated
+here unrolls the same layout into one function per direction, inlining
+fixed-width runs, strings and bytes and calling the resolved codec directly for
+everything else. Set ``COSMIC_REACH_CODEGEN=1`` to enable it by default and
+``COSMIC_REACH_CODEGEN_DEBUG=1`` to dump the generated source to stderr.
+"""
+
+import linecache
+import os
+import struct
+import sys
+from typing import Any, Callable, NamedTuple
+
+from .buffer import BufferReader, _check_length
+from .types import (
+    Complex,
+    ComplexLayout,
+    LayoutNode,
+    _CodecField,
+    _FixedRun,
+    _plain_from_dict,
+    deserialize_bytes,
+    deserialize_str,
+    get_layout,
+    write_bytes,
+    write_str,
+)
+
+ENABLED = os.environ.get("COSMIC_REACH_CODEGEN", "") not in ("", "0")
+"Whether registries compile their packets unless told otherwise"
+DEBUG = os.environ.get("COSMIC_REACH_CODEGEN_DEBUG", "") not in ("", "0")
+"Whether generated source is dumped to stderr"
+
+_LENGTH = struct.Struct(">i")
+
+
+class CompiledCodec(NamedTuple):
+    write: Callable[[Complex, bytearray], None]
+    from_buffer: Callable[[BufferReader], Complex]
+    source: str
+
+
+_compiled: dict[type, tuple[ComplexLayout, CompiledCodec | None]] = {}
+
+
+class _Generator:
+    def __init__(self, layout: ComplexLayout):
+        self.layout = layout
+        self.namespace: dict[str, Any] = {
+            "_pack_len": _LENGTH.pack,
+            "_unpack_len_from": _LENGTH.unpack_from,
+            "_check_length": _check_length,
+        }
+        self.names: dict[int, str] = {}
+
+    def const(self, prefix: str, value: Any) -> str:
+        try:
+            return self.names[id(value)]
+        except KeyError:
+            name = self.names[id(value)] = f"_{prefix}{len(self.names)}"
+            self.namespace[name] = value
+            return name
+
+    def generate(self) -> str:
+        encode_note = f"CONTEXT>> While serializing object of type {self.layout.cls}"
+        note = f"CONTEXT>> While deserializing object of type {self.layout.cls}"
+        encode = ["def write(obj, out):", "    start = len(out)", "    try:"]
+        decode = [
+            "def from_buffer(buf):",
+            "    view = buf.view",
+            "    pos = buf.pos",
+            "    try:",
+        ]
+        leaf = 0
+
+        for step in self.layout.steps:
+            if isinstance(step, _FixedRun):
+                struct_ = self.const("s", step.struct)
+                args = ", ".join(f"obj.{path}" for path in step.paths)
+                encode.append(f"        out += {struct_}.pack({args})")
+                targets = [f"v{leaf + idx}" for idx in range(len(step.paths))]
+                decode.append(
+                    f"        ({", ".join(targets)},) = {struct_}.unpack_from(view, pos)"
+                )
+                decode.append(f"        pos += {step.struct.size}")
+                leaf += len(step.paths)
+                continue
+
+            assert isinstance(step, _CodecField)
+            if step.writer is None or step.deserializer is None:
+                raise TypeError(f"No codec for {step.typ} ({step.path})")
+
+            codecs = (step.writer, step.deserializer)
+            if codecs in (
+                (write_str, deserialize_str),
+                (write_bytes, deserialize_bytes),
+            ):
+                is_str = codecs == (write_str, deserialize_str)
+                value = f"obj.{step.path}" + ('.encode("utf-8")' if is_str else "")
+                encode.append(f"        e{leaf} = {value}")
+                encode.append(f"        out += _pack_len(len(e{leaf}))")
+                encode.append(f"        out += e{leaf}")
+                decode.append("        (length,) = _unpack_len_from(view, pos)")
+                decode.append("        pos += 4")
+                decode.append("        _check_length(length, len(view) - pos)")
+                decode.append(f"        v{leaf} = view[pos : pos + length]")
+                decode.append("        pos += length")
+                if is_str:
+                    decode.append(f'        v{leaf} = str(v{leaf}, "utf-8")')
+                else:
+                    decode.append("        if not buf.zero_copy:")
+                    decode.append(f"            v{leaf} = v{leaf}.tobytes()")
+            else:
+                typ = self.const("t", step.typ)
+                writer = self.const("w", step.writer)
+                deserializer = self.const("de", step.deserializer)
+                encode.append(f"        {writer}({typ}, obj.{step.path}, out)")
+                decode.append("        buf.pos = pos")
+                decode.append(f"        v{leaf} = {deserializer}({typ}, buf)")
+                decode.append("        pos = buf.pos")
+            leaf += 1
+
+        if not self.layout.steps:
+            encode.append("        pass")
+            decode.append("        pass")
+        encode.append("    except Exception as e:")
+        encode.append("        del out[start:]")
+        encode.append(f"        e.add_note({self.const("n", encode_note)})")
+        encode.append("        raise e")
+        decode.append("    except Exception as e:")
+        decode.append(f"        e.add_note({self.const("n", note)})")
+        decode.append("        raise e")
+        decode.append("    buf.pos = pos")
+        decode.append(f"    return {self.build(self.layout.tree)}")
+        return "\n".join(encode) + "\n\n\n" + "\n".join(decode) + "\n"
+
+    def build(self, tree: LayoutNode) -> str:
+        cls, fields = tree
+        values = [
+            (attr, f"v{field}" if isinstance(field, int) else self.build(field))
+            for attr, field in fields
+        ]
+        if _plain_from_dict(cls):
+            # from_dict would only pass the fields to the constructor as keywords
+            items = ", ".join(f"{attr}={value}" for attr, value in values)
+            return f"{self.const("c", cls)}({items})"
+        items = ", ".join(f"{attr!r}: {value}" for attr, value in values)
+        return f"{self.const("c", cls)}.from_dict({{{items}}})"
+
+
+def compile_codec(cls: type[Complex]) -> CompiledCodec | None:
+    """Compile a specialized encoder and decoder for a :class:`Complex` subclass
+
+    Returns :code:`None` if the class cannot be compiled, in which case the
+    generic path should be used.
+    """
+    layout = get_layout(cls)
+    cached = _compiled.get(cls)
+    if cached is not None and cached[0] is layout:
+        return cached[1]
+
+    codec = None
+    try:
+        generator = _Generator(layout)
+        source = generator.generate()
+        filename = f"<cosmic_reach codegen {cls.__module__}.{cls.__qualname__}>"
+        exec(compile(source, filename, "exec"), generator.namespace)
+    except Exception as e:
+        if DEBUG:
+            print(f"# codegen for {cls.__qualname__} failed: {e!r}", file=sys.stderr)
+    else:
+        linecache.cache[filename] = (
+            len(source),
+            None,
+            source.splitlines(True),
+            filename,
+        )
+        if DEBUG:
+            print(f"# {filename}\n{source}", file=sys.stderr)
+        codec = CompiledCodec(
+            generator.namespace["write"],
+            generator.namespace["from_buffer"],
+            source,
+        )
+
+    _compiled[cls] = (layout, codec)
+    return codec
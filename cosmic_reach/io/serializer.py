@@ -1,27 +1,111 @@
 import io
+import types
 import typing
+from collections.abc import Iterator, MutableMapping
 from typing import Any, Callable
 
 from .htypes import KeyedUnion
 
+_UNION_TYPES = (typing.Union, types.UnionType)
+
+
+type Writer = Callable[[type, Any, bytearray], None]
+type Serializer = Callable[[type, Any], bytes]
+
+
+def as_writer(func: Serializer) -> Writer:
+    "Adapt a function returning the serialized form into a writer"
+
+    def write(typ: type, obj: Any, out: bytearray) -> None:
+        out += func(typ, obj)
+
+    write.__wrapped__ = func
+    return write
+
+
+def as_serializer(writer: Writer) -> Serializer:
+    "Adapt a writer into a function returning the serialized form"
+    func = getattr(writer, "__wrapped__", None)
+    if func is not None:
+        return func
+
+    def serialize(typ: type, obj: Any) -> bytes:
+        out = bytearray()
+        writer(typ, obj, out)
+        return bytes(out)
+
+    return serialize
+
+
+class _Serializers(MutableMapping):
+    "The registered writers as functions returning the serialized form"
+
+    def __init__(self, store: "Store"):
+        self._store = store
+
+    def __getitem__(self, cls: type) -> Serializer:
+        return as_serializer(self._store.writers[cls])
+
+    def __setitem__(self, cls: type, func: Serializer) -> None:
+        self._store.writers[cls] = as_writer(func)
+        self._store.invalidate()
+
+    def __delitem__(self, cls: type) -> None:
+        del self._store.writers[cls]
+        self._store.invalidate()
+
+    def __iter__(self) -> Iterator[type]:
+        return iter(self._store.writers)
+
+    def __len__(self) -> int:
+        return len(self._store.writers)
+
 
 class Store:
-    serializers: dict[type, Callable[[type, Any], bytes]]
+    writers: dict[type, Writer]
     deserializers: dict[type, Callable[[type, io.BytesIO], Any]]
+    writer_cache: dict[Any, Writer]
+    deserializer_cache: dict[Any, Callable[[type, io.BytesIO], Any]]
+    layout_cache: dict[type, Any]
 
     def __init__(self):
-        self.serializers = {}
+        self.writers = {}
         self.deserializers = {}
+        self.writer_cache = {}
+        self.deserializer_cache = {}
+        self.layout_cache = {}
+
+    @property
+    def serializers(self) -> MutableMapping[type, Serializer]:
+        "The :attr:`writers` as functions returning bytes, as codecs used to be"
+        return _Serializers(self)
+
+    def invalidate(self):
+        "Drop every resolved codec, e.g. after a new one was registered"
+        self.writer_cache.clear()
+        self.deserializer_cache.clear()
+        self.layout_cache.clear()
 
 
 store = Store()
 
 
-def serializer_for(
-    cls,
-) -> Callable[[Callable[[type, Any], bytes]], Callable[[type, Any], bytes]]:
-    def decorator(func: Callable[[type, Any], bytes]):
-        store.serializers[cls] = func
+def writer_for(cls) -> Callable[[Writer], Writer]:
+    "Register a function appending the serialized form of :code:`cls` to a buffer"
+
+    def decorator(func: Writer):
+        store.writers[cls] = func
+        store.invalidate()
+        return func
+
+    return decorator
+
+
+def serializer_for(cls) -> Callable[[Serializer], Serializer]:
+    "Register a function returning the serialized form of :code:`cls`"
+
+    def decorator(func: Serializer):
+        writer_for(cls)(as_writer(func))
         return func
 
     return decorator
@@ -32,46 +116,81 @@ def deserializer_for(
 ) -> Callable[[Callable[[type, io.BytesIO], Any]], Callable[[type, io.BytesIO], Any]]:
     def decorator(func: Callable[[type, io.BytesIO], Any]):
         store.deserializers[cls] = func
+        store.invalidate()
         return func
 
     return decorator
 
 
-def serialize(obj: Any, typ: type | None = None) -> bytes:
+def _lookup[F](typ: Any, registered: dict[type, F]) -> F | None:
+    if typ in (typing.Union, KeyedUnion):
+        return registered.get(typ)
+    if isinstance(typ, KeyedUnion):
+        return registered.get(KeyedUnion)
+    if typing.get_origin(typ) in _UNION_TYPES:
+        return registered.get(typing.Union)
+
+    comp = isinstance if not isinstance(typ, type) else issubclass
+    for made_for, codec in registered.items():
+        if made_for in (typing.Union, KeyedUnion):
+            continue
+        if comp(typ, made_for):
+            return codec
+    return None
+
+
+def _resolve[F](typ: Any, registered: dict[type, F], cache: dict[Any, F]) -> F | None:
+    try:
+        return cache[typ]
+    except KeyError:
+        codec = cache[typ] = _lookup(typ, registered)
+        return codec
+    except TypeError:
+        # unhashable annotation, resolve it every time
+        return _lookup(typ, registered)
+
+
+def resolve_writer(typ: Any) -> Writer:
+    "Get the writer responsible for :code:`typ`, resolving it only once"
+    writer = _resolve(typ, store.writers, store.writer_cache)
+    if writer is None:
+        raise TypeError(f"Objects of type {typ} cannot be serialized")
+    return writer
+
+
+def resolve_serializer(typ: Any) -> Serializer:
+    "Get the writer responsible for :code:`typ` as a function returning bytes"
+    return as_serializer(resolve_writer(typ))
+
+
+def resolve_deserializer(typ: Any) -> Callable[[type, io.BytesIO], Any]:
+    "Get the deserializer responsible for :code:`typ`, resolving it only once"
+    deserializer = _resolve(typ, store.deserializers, store.deserializer_cache)
+    if deserializer is None:
+        raise TypeError(f"Objects of type {typ} cannot be deserialized")
+    return deserializer
+
+
+def serialize_into(out: bytearray, obj: Any, typ: type | None = None) -> None:
+    "Append the serialized form of :code:`obj` to :code:`out`"
     if typ is None:
         typ = type(obj)
-    if typ == (typing.Union, KeyedUnion):
-        serializer = store.serializers[typ]
-    if isinstance(typ, KeyedUnion):
-        serializer = store.serializers[KeyedUnion]
-    else:
-        comp = isinstance if not isinstance(typ, type) else issubclass
-        for made_for, serializer in store.serializers.items():
-            if made_for in (typing.Union, KeyedUnion):
-                continue
-            if comp(typ, made_for):
-                break
-        else:
-            raise TypeError(f"Objects of type {typ} cannot be serialized")
+    writer = resolve_writer(typ)
     try:
-        return serializer(typ, obj)
+        writer(typ, obj, out)
     except Exception as e:
         e.add_note(f"CONTEXT>> While serializing object of type {typ}")
         raise e
 
 
+def serialize(obj: Any, typ: type | None = None) -> bytes:
+    out = bytearray()
+    serialize_into(out, obj, typ)
+    return bytes(out)
+
+
 def deserialize[T: Any](typ: type[T], buf: io.BytesIO) -> T:
-    if typ in (typing.Union, KeyedUnion):
-        deserializer = store.deserializers[typ]
-    else:
-        comp = isinstance if not isinstance(typ, type) else issubclass
-        for made_for, deserializer in store.deserializers.items():
-            if made_for in (typing.Union, KeyedUnion):
-                continue
-            if comp(typ, made_for):
-                break
-        else:
-            raise TypeError(f"Objects of type {typ} cannot be deserialized")
+    deserializer = resolve_deserializer(typ)
     try:
         return deserializer(typ, buf)
     except Exception as e:
@@ -1,20 +1,42 @@
 import io
 import json
+import operator
 import struct
 from enum import Enum
-from typing import Any, Union
+from typing import Any, Callable, Union
 
 from dataclasses_json import DataClassJsonMixin
 
 from . import wjson
+from .buffer import BufferReader, _check_length
 from .htypes import KeyedUnion
-from .serializer import deserialize, deserializer_for, serialize, serializer_for
+from .serializer import (
+    as_serializer,
+    deserialize,
+    deserializer_for,
+    resolve_deserializer,
+    resolve_writer,
+    serialize,
+    serialize_into,
+    serializer_for,
+    store,
+    writer_for,
+)
+
+_LENGTH = struct.Struct(">i")
 
 
 def consuming_unpack(format_: str, buf: io.BytesIO) -> tuple:
     return struct.unpack(format_, buf.read(struct.calcsize(format_)))
 
 
+def _read_exact(buf: io.BytesIO, length: int) -> bytes:
+    "Read a length-prefixed value, refusing bad or truncated lengths"
+    data = buf.read(max(length, 0))
+    _check_length(length, len(data))
+    return data
+
+
 class Byte(int):
     pass
 
@@ -35,9 +57,134 @@ class Double(int):
     pass
 
 
-class Complex:
+_UNSET: Any = type("_Unset", (), {"__repr__": lambda self: "<unset>"})()
+
+
+def _namespace_annotations(namespace: dict[str, Any]) -> dict[str, Any]:
+    if "__annotations__" in namespace:
+        return namespace["__annotations__"]
+    if "__annotate__" not in namespace:
+        return {}
+    # annotations are evaluated lazily from Python 3.14 on
+    import annotationlib
+
+    return annotationlib.call_annotate_function(
+        namespace["__annotate__"], annotationlib.Format.FORWARDREF
+    )
+
+
+def _generate(cls: type, name: str, source: str, namespace: dict[str, Any]) -> None:
+    exec(source, namespace)
+    func = namespace[name]
+    func.__qualname__ = f"{cls.__qualname__}.{name}"
+    func._generated = True
+    setattr(cls, name, func)
+
+
+def _inherits_custom(cls: type, name: str, default: type = object) -> bool:
+    "Whether a method is defined by hand on the class or one of its bases"
+    method = getattr(cls, name)
+    return method is not getattr(default, name) and not getattr(
+        method, "_generated", False
+    )
+
+
+class _ComplexMeta(type):
+    """Generates the boilerplate of :class:`Complex` subclasses
+
+    Each class gets ``__slots__`` for its fields without a default, unless it
+    declares its own. Instances only get a ``__dict__`` once something else is
+    set on them, like an extra attribute or a field overriding its default.
+    Unless defined by hand, a positional ``__init__``, ``__eq__``, ``__hash__``
+    and ``__repr__`` are generated for the fields.
+    """
+
+    def __new__(mcs, name: str, bases: tuple[type, ...], namespace: dict, **kwargs):
+        if "__slots__" not in namespace:
+            inherited = {
+                slot
+                for base in bases
+                for klass in base.__mro__
+                for slot in getattr(klass, "__slots__", ())
+            }
+            # fields with a default keep it as a class attribute
+            namespace["__slots__"] = tuple(
+                field
+                for field in _namespace_annotations(namespace)
+                if field not in inherited and field not in namespace
+            )
+        cls = super().__new__(mcs, name, bases, namespace, **kwargs)
+        if bases:
+            mcs._generate_methods(cls)
+        return cls
+
+    @staticmethod
+    def _generate_methods(cls: type) -> None:
+        fields = tuple(complex_annotations(cls))
+        cls._fields = fields
+        namespace = {"_UNSET": _UNSET, "_fields": fields}
+
+        if "__init__" not in cls.__dict__ and not _inherits_custom(
+            cls, "__init__", Complex
+        ):
+            params = "".join(f", {field}=_UNSET" for field in fields)
+            body = "".join(
+                f"\n    if {field} is not _UNSET:\n        self.{field} = {field}"
+                for field in fields
+            )
+            _generate(
+                cls,
+                "__init__",
+                f"def __init__(self{params}):{body or "\n    pass"}",
+                namespace,
+            )
+
+        if "__eq__" not in cls.__dict__ and not _inherits_custom(cls, "__eq__"):
+            own = "".join(f"self.{field}, " for field in fields)
+            other = "".join(f"other.{field}, " for field in fields)
+            _generate(
+                cls,
+                "__eq__",
+                "def __eq__(self, other):\n"
+                "    if other.__class__ is not self.__class__:\n"
+                "        return NotImplemented\n"
+                "    try:\n"
+                f"        return ({own}) == ({other})\n"
+                "    except AttributeError:\n"
+                "        return all(getattr(self, field, _UNSET) == "
+                "getattr(other, field, _UNSET) for field in _fields)",
+                namespace,
+            )
+            if "__hash__" not in cls.__dict__ and not _inherits_custom(cls, "__hash__"):
+                _generate(
+                    cls,
+                    "__hash__",
+                    "def __hash__(self):\n"
+                    "    try:\n"
+                    f"        return hash(({own}))\n"
+                    "    except AttributeError:\n"
+                    "        return hash(tuple(getattr(self, field, _UNSET) "
+                    "for field in _fields))",
+                    namespace,
+                )
+
+        if "__repr__" not in cls.__dict__ and not _inherits_custom(cls, "__repr__"):
+            _generate(
+                cls,
+                "__repr__",
+                "def __repr__(self):\n"
+                "    fields = ', '.join(f'{field}={getattr(self, field)!r}' "
+                "for field in _fields if hasattr(self, field))\n"
+                f"    return f'{cls.__qualname__}({{fields}})'",
+                namespace,
+            )
+
+
+class Complex(metaclass=_ComplexMeta):
+    __slots__ = ("__dict__",)
+
     def __init__(self, *args, **kwargs):
-        for key, val in zip(type(self).__annotations__.keys(), args):
+        for key, val in zip(complex_annotations(type(self)), args):
             setattr(self, key, val)
 
         for key, val in kwargs.items():
@@ -78,10 +225,10 @@ class _TupleMeta(type):
 class Tuple(tuple, metaclass=_TupleMeta): ...
 
 
-@serializer_for(Byte)
-@serializer_for(bool)
-def serialize_byte[T: Byte | bool](typ: type[T], num: T) -> bytes:
-    return num.to_bytes(1, "big", signed=True)
+@writer_for(Byte)
+@writer_for(bool)
+def write_byte[T: Byte | bool](typ: type[T], num: T, out: bytearray) -> None:
+    out += num.to_bytes(1, "big", signed=True)
 
 
 @deserializer_for(Byte)
@@ -90,9 +237,9 @@ def deserialize_byte[T: Byte | bool](typ: type[T], buf: io.BytesIO) -> T:
     return Short.from_bytes(buf.read(1), "big", signed=True)
 
 
-@serializer_for(UByte)
-def serialize_ubyte[T: UByte](typ: type[T], num: T) -> bytes:
-    return num.to_bytes(1, "big", signed=False)
+@writer_for(UByte)
+def write_ubyte[T: UByte](typ: type[T], num: T, out: bytearray) -> None:
+    out += num.to_bytes(1, "big", signed=False)
 
 
 @deserializer_for(UByte)
@@ -100,9 +247,9 @@ def deserialize_ubyte[T: UByte](typ: type[T], buf: io.BytesIO) -> T:
     return Short.from_bytes(buf.read(1), "big", signed=False)
 
 
-@serializer_for(Short)
-def serialize_short[T: Short](typ: type[T], num: T) -> bytes:
-    return num.to_bytes(2, "big", signed=True)
+@writer_for(Short)
+def write_short[T: Short](typ: type[T], num: T, out: bytearray) -> None:
+    out += num.to_bytes(2, "big", signed=True)
 
 
 @deserializer_for(Short)
@@ -110,9 +257,9 @@ def deserialize_short[T: Short](typ: type[T], buf: io.BytesIO) -> T:
     return Short.from_bytes(buf.read(2), "big", signed=True)
 
 
-@serializer_for(Long)
-def serialize_long[T: Long](typ: type[T], num: T) -> bytes:
-    return num.to_bytes(8, "big", signed=True)
+@writer_for(Long)
+def write_long[T: Long](typ: type[T], num: T, out: bytearray) -> None:
+    out += num.to_bytes(8, "big", signed=True)
 
 
 @deserializer_for(Long)
@@ -120,19 +267,19 @@ def deserialize_long[T: Long](typ: type[T], buf: io.BytesIO) -> T:
     return Long.from_bytes(buf.read(8), "big", signed=True)
 
 
-@serializer_for(int)
-def serialize_int[T: int](typ: type[T], num: T) -> bytes:
-    return num.to_bytes(4, "big", signed=True)
+@writer_for(int)
+def write_int[T: int](typ: type[T], num: T, out: bytearray) -> None:
+    out += num.to_bytes(4, "big", signed=True)
 
 
 @deserializer_for(int)
 def deserialize_int[T: int](typ: type[T], buf: io.BytesIO) -> T:
-    return int.from_bytes(buf.read(4), "big", signed=True)
+    return consuming_unpack(">i", buf)[0]
 
 
-@serializer_for(Double)
-def serialize_double[T: Double](typ: type[T], num: T) -> bytes:
-    return struct.pack(">d", num)
+@writer_for(Double)
+def write_double[T: Double](typ: type[T], num: T, out: bytearray) -> None:
+    out += struct.pack(">d", num)
 
 
 @deserializer_for(Double)
@@ -140,9 +287,9 @@ def deserialize_double[T: Double](typ: type[T], buf: io.BytesIO) -> T:
     return Double(consuming_unpack(">d", buf)[0])
 
 
-@serializer_for(float)
-def serialize_float[T: float](typ: type[T], num: T) -> bytes:
-    return struct.pack(">f", num)
+@writer_for(float)
+def write_float[T: float](typ: type[T], num: T, out: bytearray) -> None:
+    out += struct.pack(">f", num)
 
 
 @deserializer_for(float)
@@ -150,43 +297,55 @@ def deserialize_float[T: float](typ: type[T], buf: io.BytesIO) -> T:
     return consuming_unpack(">f", buf)[0]
 
 
-@serializer_for(bytes)
-def serialize_bytes[T: bytes](typ: type[T], byt: T) -> bytes:
-    return serialize_int(int, len(byt)) + byt
+@writer_for(bytes)
+def write_bytes[T: bytes](typ: type[T], byt: T, out: bytearray) -> None:
+    out += _LENGTH.pack(len(byt))
+    out += byt
 
 
 @deserializer_for(bytes)
 def deserialize_bytes[T: bytes](typ: type[T], buf: io.BytesIO) -> T:
-    length = deserialize_int(int, buf)
-    return buf.read(length)
+    if isinstance(buf, BufferReader):
+        return buf.read_prefixed()
+    return _read_exact(buf, deserialize_int(int, buf))
 
 
-@serializer_for(str)
-def serialize_str[T: str](typ: type[T], string: T) -> bytes:
-    return serialize_bytes(bytes, string.encode("utf-8"))
+@writer_for(str)
+def write_str[T: str](typ: type[T], string: T, out: bytearray) -> None:
+    write_bytes(bytes, string.encode("utf-8"), out)
 
 
 @deserializer_for(str)
 def deserialize_str[T: str](typ: type[T], buf: io.BytesIO) -> T:
+    if isinstance(buf, BufferReader):
+        return str(buf.read_prefixed_view(), "utf-8")
     return deserialize_bytes(bytes, buf).decode("utf-8")
 
 
-@serializer_for(_Repeat)
-def serialize_arr[T: Repeat](typ: type[T], vals: T) -> bytes:
-    return serialize_int(int, len(vals)) + b"".join(
-        serialize(val, typ._t) for val in vals
-    )
+@writer_for(_Repeat)
+def write_arr[T: Repeat](typ: type[T], vals: T, out: bytearray) -> None:
+    subtyp = typ._t
+    writer = resolve_writer(subtyp)
+    out += _LENGTH.pack(len(vals))
+    for val in vals:
+        writer(subtyp, val, out)
 
 
 @deserializer_for(_Repeat)
 def deserialize_arr[T: Repeat](typ: type[T], buf: io.BytesIO) -> T:
     length = deserialize_int(int, buf)
-    return [deserialize(typ._t, buf) for _ in range(length)]
+    subtyp = typ._t
+    deserializer = resolve_deserializer(subtyp)
+    if deserializer is deserialize_bytes and isinstance(buf, BufferReader):
+        read_prefixed = buf.read_prefixed
+        return [read_prefixed() for _ in range(length)]
+    return [deserializer(subtyp, buf) for _ in range(length)]
 
 
-@serializer_for(_Tuple)
-def serialize_tup[T: Tuple](typ: type[T], vals: T) -> bytes:
-    return b"".join(serialize(val, subtyp) for val, subtyp in zip(vals, typ._t))
+@writer_for(_Tuple)
+def write_tup[T: Tuple](typ: type[T], vals: T, out: bytearray) -> None:
+    for val, subtyp in zip(vals, typ._t):
+        serialize_into(out, val, subtyp)
 
 
 @deserializer_for(_Tuple)
@@ -194,19 +353,34 @@ def deserialize_tup[T: Tuple](typ: type[T], buf: io.BytesIO) -> T:
     return [deserialize(subtyp, buf) for subtyp in typ._t]
 
 
-@serializer_for(dict)
-def serialize_json[T: dict](typ: type[T], json_: T) -> bytes:
-    return serialize_str(str, json.dumps(json_))
+@writer_for(dict)
+@writer_for(wjson.LazyJson)
+def write_json[T: dict | wjson.LazyJson](
+    typ: type[T], json_: T, out: bytearray
+) -> None:
+    if isinstance(json_, wjson.LazyJson):
+        write_str(str, json_.raw, out)
+    else:
+        write_str(str, json.dumps(json_), out)
 
 
 @deserializer_for(dict)
 def deserialize_json[T: dict](typ: type[T], buf: io.BytesIO) -> T:
+    if isinstance(buf, BufferReader) and buf.lazy_json:
+        return wjson.LazyJson(deserialize_str(str, buf))
     return wjson.loads(deserialize_str(str, buf))
 
 
-@serializer_for(DataClassJsonMixin)
-def serialize_dataclass[T: DataClassJsonMixin](typ: type[T], dataclass: T) -> bytes:
-    return serialize_json(dict, dataclass.to_dict())
+@deserializer_for(wjson.LazyJson)
+def deserialize_lazy_json[T: wjson.LazyJson](typ: type[T], buf: io.BytesIO) -> T:
+    return wjson.LazyJson(deserialize_str(str, buf))
+
+
+@writer_for(DataClassJsonMixin)
+def write_dataclass[T: DataClassJsonMixin](
+    typ: type[T], dataclass: T, out: bytearray
+) -> None:
+    write_json(dict, dataclass.to_dict(encode_json=True), out)
 
 
 @deserializer_for(DataClassJsonMixin)
@@ -214,45 +388,263 @@ def deserialize_dataclass[T: DataClassJsonMixin](typ: type[T], buf: io.BytesIO)
     return typ.from_dict(deserialize_json(dict, buf))
 
 
-@serializer_for(Complex)
-def serialize_complex[T: Complex](typ: type[T], complex: T) -> bytes:
-    all_annotations = complex.__annotations__
-    for base in typ.__bases__:
-        all_annotations.update(base.__annotations__)
+_FIXED_WIDTH: dict[type, tuple[str, Any, Any]] = {
+    bool: ("b", write_byte, deserialize_byte),
+    Byte: ("b", write_byte, deserialize_byte),
+    UByte: ("B", write_ubyte, deserialize_ubyte),
+    Short: ("h", write_short, deserialize_short),
+    Long: ("q", write_long, deserialize_long),
+    int: ("i", write_int, deserialize_int),
+    float: ("f", write_float, deserialize_float),
+}
+
+
+def _try_resolve(resolve, typ: Any):
+    try:
+        return resolve(typ)
+    except TypeError:
+        return None
+
+
+def _fixed_format(typ: Any) -> str | None:
+    try:
+        fmt, writer, deserializer = _FIXED_WIDTH[typ]
+    except (KeyError, TypeError):
+        return None
+    if (
+        _try_resolve(resolve_writer, typ) is not writer
+        or _try_resolve(resolve_deserializer, typ) is not deserializer
+    ):
+        return None
+    return fmt
+
+
+def _is_inlinable(typ: Any) -> bool:
+    return (
+        isinstance(typ, type)
+        and issubclass(typ, Complex)
+        and _try_resolve(resolve_writer, typ) is write_complex
+        and _try_resolve(resolve_deserializer, typ) is deserialize_complex
+    )
 
-    result = b""
 
-    for attr, subtyp in all_annotations.items():
-        if not hasattr(complex, attr):
-            raise ValueError(f"Missing attribute {attr} in {complex}")
+def complex_annotations(cls: type[Complex]) -> dict[str, Any]:
+    "The fields of a :class:`Complex`, including the ones of its direct bases"
+    annotations = dict(cls.__annotations__)
+    for base in cls.__bases__:
+        annotations.update(getattr(base, "__annotations__", {}))
+    return annotations
+
+
+def _plain_from_dict(cls: type[Complex]) -> bool:
+    "Whether :meth:`Complex.from_dict` only passes the fields to the constructor"
+    return cls.from_dict.__func__ is Complex.from_dict.__func__
+
+
+class _FixedRun:
+    "Neighbouring fixed-width fields, packed and unpacked by one precompiled struct"
+
+    def __init__(self, paths: list[str], formats: list[str]):
+        self.paths = tuple(paths)
+        self.struct = struct.Struct(">" + "".join(formats))
+        self.getter = operator.attrgetter(*paths)
+        self.single = len(paths) == 1
+
+    def write(self, obj: Any, out: bytearray) -> None:
+        try:
+            values = self.getter(obj)
+        except AttributeError:
+            missing = next(p for p in self.paths if not _has_path(obj, p))
+            raise ValueError(f"Missing attribute {missing} in {obj}") from None
+        try:
+            out += (
+                self.struct.pack(values) if self.single else self.struct.pack(*values)
+            )
+        except Exception as e:
+            e.add_note(f"CONTEXT>> While serializing fields {", ".join(self.paths)}")
+            raise e
+
+    def decode(self, buf: io.BytesIO, values: list) -> None:
+        try:
+            if isinstance(buf, BufferReader):
+                values.extend(buf.unpack(self.struct))
+            else:
+                values.extend(self.struct.unpack(buf.read(self.struct.size)))
+        except Exception as e:
+            e.add_note(f"CONTEXT>> While deserializing fields {", ".join(self.paths)}")
+            raise e
+
+
+class _CodecField:
+    "A field handled by the codec registered for its annotation"
+
+    def __init__(self, path: str, typ: Any):
+        self.path = path
+        self.typ = typ
+        self.getter = operator.attrgetter(path)
+        self.writer = _try_resolve(resolve_writer, typ)
+        self.deserializer = _try_resolve(resolve_deserializer, typ)
+
+    def write(self, obj: Any, out: bytearray) -> None:
+        try:
+            value = self.getter(obj)
+        except AttributeError:
+            raise ValueError(f"Missing attribute {self.path} in {obj}") from None
+        if self.writer is None:
+            serialize_into(out, value, self.typ)
+            return
+        try:
+            self.writer(self.typ, value, out)
+        except Exception as e:
+            e.add_note(f"CONTEXT>> While serializing object of type {self.typ}")
+            raise e
+
+    def decode(self, buf: io.BytesIO, values: list) -> None:
+        if self.deserializer is None:
+            values.append(deserialize(self.typ, buf))
+            return
+        try:
+            values.append(self.deserializer(self.typ, buf))
+        except Exception as e:
+            e.add_note(f"CONTEXT>> While deserializing object of type {self.typ}")
+            raise e
+
+
+type LayoutNode = tuple[type[Complex], list[tuple[str, "int | LayoutNode"]]]
+
+
+def _has_path(obj: Any, path: str) -> bool:
+    try:
+        operator.attrgetter(path)(obj)
+    except AttributeError:
+        return False
+    return True
+
+
+class ComplexLayout:
+    """The precompiled field plan of a :class:`Complex` subclass
+
+    Nested complex fields are flattened into their parent and neighbouring
+    fixed-width fields are fused into a single :class:`struct.Struct`, so e.g.
+    an ``EntityPositionPacket`` is packed with one call.
+    """
+
+    def __init__(self, cls: type[Complex]):
+        self.cls = cls
+        self.annotations = complex_annotations(cls)
+        self.leaves: list[tuple[str, Any]] = []
+        self.tree = self._flatten(cls, self.annotations, "", (cls,))
+        self.build = self._builder(self.tree)
+        self.steps = self._fuse(self.leaves)
+
+    def _flatten(
+        self,
+        cls: type[Complex],
+        annotations: dict[str, Any],
+        prefix: str,
+        stack: tuple[type, ...],
+    ) -> "LayoutNode":
+        fields = []
+        for attr, subtyp in annotations.items():
+            if _is_inlinable(subtyp) and subtyp not in stack:
+                subtree = self._flatten(
+                    subtyp,
+                    complex_annotations(subtyp),
+                    f"{prefix}{attr}.",
+                    stack + (subtyp,),
+                )
+                fields.append((attr, subtree))
+            else:
+                fields.append((attr, len(self.leaves)))
+                self.leaves.append((prefix + attr, subtyp))
+        return cls, fields
 
-        result += serialize(getattr(complex, attr), subtyp)
-    return result
+    @classmethod
+    def _builder(cls, tree: "LayoutNode") -> Callable[[list], Complex]:
+        complex_cls, fields = tree
+        getters = [
+            (
+                attr,
+                (
+                    operator.itemgetter(field)
+                    if isinstance(field, int)
+                    else cls._builder(field)
+                ),
+            )
+            for attr, field in fields
+        ]
+
+        if _plain_from_dict(complex_cls):
+
+            def build(values: list) -> Complex:
+                return complex_cls(**{attr: getter(values) for attr, getter in getters})
+
+        else:
+
+            def build(values: list) -> Complex:
+                return complex_cls.from_dict(
+                    {attr: getter(values) for attr, getter in getters}
+                )
+
+        return build
+
+    @staticmethod
+    def _fuse(leaves: list[tuple[str, Any]]) -> list[_FixedRun | _CodecField]:
+        steps = []
+        paths, formats = [], []
+        for path, typ in leaves:
+            if (fmt := _fixed_format(typ)) is not None:
+                paths.append(path)
+                formats.append(fmt)
+                continue
+            if paths:
+                steps.append(_FixedRun(paths, formats))
+                paths, formats = [], []
+            steps.append(_CodecField(path, typ))
+        if paths:
+            steps.append(_FixedRun(paths, formats))
+        return steps
+
+    def write(self, obj: Complex, out: bytearray) -> None:
+        for step in self.steps:
+            step.write(obj, out)
+
+    def decode(self, buf: io.BytesIO) -> Complex:
+        values = []
+        for step in self.steps:
+            step.decode(buf, values)
+        return self.build(values)
+
+
+def get_layout(cls: type[Complex]) -> ComplexLayout:
+    "Get the layout of a :class:`Complex` subclass, compiling it on first use"
+    try:
+        return store.layout_cache[cls]
+    except KeyError:
+        layout = store.layout_cache[cls] = ComplexLayout(cls)
+        return layout
+
+
+@writer_for(Complex)
+def write_complex[T: Complex](typ: type[T], complex: T, out: bytearray) -> None:
+    get_layout(typ).write(complex, out)
 
 
 @deserializer_for(Complex)
 def deserialize_complex[T: Complex](typ: type[T], buf: io.BytesIO) -> T:
-    all_annotations = typ.__annotations__
-    for base in typ.__bases__:
-        all_annotations.update(base.__annotations__)
-
-    result = {}
-
-    for attr, subtyp in all_annotations.items():
-        result[attr] = deserialize(subtyp, buf)
+    return get_layout(typ).decode(buf)
 
-    return typ.from_dict(result)
 
-
-@serializer_for(Union)
-def serialize_union[T: Union](typ: type[T], uni: T) -> bytes:
+@writer_for(Union)
+def write_union[T: Union](typ: type[T], uni: T, out: bytearray) -> None:
     for idx, subtyp in enumerate(typ.__args__):
         if isinstance(uni, subtyp):
             break
     else:
         raise ValueError(f"Invalid type {type(uni)} for {typ}")
 
-    return serialize_byte(Byte, idx) + serialize(uni, subtyp)
+    write_byte(Byte, idx, out)
+    serialize_into(out, uni, subtyp)
 
 
 @deserializer_for(Union)
@@ -261,9 +653,9 @@ def deserialize_union[T: Union](typ: type[T], buf: io.BytesIO) -> T:
     return deserialize(typ.__args__[idx], buf)
 
 
-@serializer_for(Enum)
-def serialize_enum[T: Enum](typ: type[T], enm: T) -> bytes:
-    return serialize_byte(UByte, enm.value)
+@writer_for(Enum)
+def write_enum[T: Enum](typ: type[T], enm: T, out: bytearray) -> None:
+    write_byte(UByte, enm.value, out)
 
 
 @deserializer_for(Enum)
@@ -272,19 +664,39 @@ def deserialize_enum[T: Enum](typ: type[T], buf: io.BytesIO) -> T:
     return typ(idx)
 
 
-@serializer_for(KeyedUnion)
-def serialize_keyed_union[T: Any](typ: KeyedUnion, uni: T) -> bytes:
+@writer_for(KeyedUnion)
+def write_keyed_union[T: Any](typ: KeyedUnion, uni: T, out: bytearray) -> None:
     for key, subtyp in typ._e.items():
-        print(subtyp, uni)
         if isinstance(uni, subtyp):
             break
     else:
         raise ValueError(f"Invalid type {type(uni)} for {typ}")
 
-    return serialize_str(str, key) + serialize(uni, subtyp)
+    write_str(str, key, out)
+    serialize_into(out, uni, subtyp)
 
 
 @deserializer_for(KeyedUnion)
 def deserialize_keyed_union[T: Any](typ: KeyedUnion, buf: io.BytesIO) -> T:
     key = deserialize_str(str, buf)
     return deserialize(typ._e[key], buf)
+
+
+# the codecs under their names from before they wrote into a shared buffer
+serialize_byte = as_serializer(write_byte)
+serialize_ubyte = as_serializer(write_ubyte)
+serialize_short = as_serializer(write_short)
+serialize_long = as_serializer(write_long)
+serialize_int = as_serializer(write_int)
+serialize_double = as_serializer(write_double)
+serialize_float = as_serializer(write_float)
+serialize_bytes = as_serializer(write_bytes)
+serialize_str = as_serializer(write_str)
+serialize_arr = as_serializer(write_arr)
+serialize_tup = as_serializer(write_tup)
+serialize_json = as_serializer(write_json)
+serialize_dataclass = as_serializer(write_dataclass)
+serialize_complex = as_serializer(write_complex)
+serialize_union = as_serializer(write_union)
+serialize_enum = as_serializer(write_enum)
+serialize_keyed_union = as_serializer(write_keyed_union)
@@ -1,67 +1,319 @@
+"""A parser for the lenient JSON written by the game
+
+Keys and values may be unquoted, strings may use either quote style and
+unquoted values are converted to ``null``/``true``/``false`` or numbers where
+they look like one. The document is scanned once, left to right, by index.
+
+Besides :func:`loads`, documents can be consumed without building the whole
+tree: :func:`events` streams parse events, :func:`select` picks single paths,
+:func:`iter_items` yields the top-level entries one by one and
+:class:`LazyJson` parses a top-level entry only once it is accessed.
+"""
+
+import re
+from collections.abc import Iterator, Mapping
+from json import JSONDecodeError
 from typing import Any
 
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+_SEPARATORS = re.compile(r"[ \t\r\n,]*")
+_QUOTED = {
+    '"': re.compile(r'"((?:[^"\\]|\\.)*)"', re.DOTALL),
+    "'": re.compile(r"'((?:[^'\\]|\\.)*)'", re.DOTALL),
+}
+_BARE_KEY = re.compile(r"([^:\r\n]*):[ \t\r\n]*")
+_COLON = re.compile(r"[ \t\r\n]*:[ \t\r\n]*")
+_BARE_VALUE = re.compile(r"[^,}\]\r\n]*")
+_INTEGER = re.compile(r"-?\d+")
+_FLOAT = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+_ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{4}|.)", re.DOTALL)
+_ESCAPES = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_CONSTANTS = {"null": None, "true": True, "false": False}
+
+
+def _unescape(match: re.Match) -> str:
+    escaped = match.group(1)
+    if len(escaped) == 5:
+        return chr(int(escaped[1:], 16))
+    return _ESCAPES.get(escaped, escaped)
+
+
+def _convert(token: str) -> Any:
+    if token in _CONSTANTS:
+        return _CONSTANTS[token]
+    if token and token[0] in "-.0123456789":
+        if _INTEGER.fullmatch(token):
+            return int(token)
+        if _FLOAT.fullmatch(token):
+            return float(token)
+    return token
+
+
+def _quoted(doc: str, pos: int) -> tuple[str, int]:
+    match = _QUOTED[doc[pos]].match(doc, pos)
+    if match is None:
+        raise JSONDecodeError("Unterminated string", doc, pos)
+    value = match.group(1)
+    if "\\" in value:
+        value = _ESCAPE.sub(_unescape, value)
+    return value, match.end()
+
+
+def _value(doc: str, pos: int) -> tuple[Any, int]:
+    first = doc[pos : pos + 1]
+    if first == "{":
+        return _object(doc, pos + 1)
+    if first == "[":
+        return _array(doc, pos + 1)
+    if first == '"' or first == "'":
+        return _quoted(doc, pos)
+    match = _BARE_VALUE.match(doc, pos)
+    return _convert(match.group().rstrip()), match.end()
+
 
-class MutableString:
-    def __init__(self, content: str):
-        self.content = content
-
-    def has(self) -> bool:
-        return bool(self.content)
-
-    def getfirst(self) -> str:
-        return self.content[0]
-
-    def popfirst(self) -> str:
-        first = self.getfirst()
-        self.content = self.content[1:]
-        return first
-
-    def popuntil(self, *symbols: str) -> str:
-        idx = min(
-            filter(
-                lambda idx: idx != -1,
-                [len(self.content)] + [self.content.find(symbol) for symbol in symbols],
-            )
-        )
-        sub = self.content[:idx]
-        self.content = self.content[idx:]
-        return sub
-
-
-def collect(data: MutableString, *, ends: tuple[str] = tuple()) -> Any:
-    if data.getfirst() == "{":
-        result = {}
-        while data.getfirst() != "}":
-            data.popfirst()
-            key = data.popuntil(":")
-            data.popfirst()
-            value = collect(data, ends=(",", "}"))
-            result[key] = value
-        data.popfirst()
-        return result
-    elif (start := data.getfirst()) in ("'", '"'):
-        data.popfirst()
-        read = data.popuntil(start)
-        data.popfirst()
-        return read
+def _object(doc: str, pos: int) -> tuple[dict, int]:
+    result = {}
+    separators = _SEPARATORS.match
+    pos = separators(doc, pos).end()
+    while doc[pos : pos + 1] != "}":
+        if pos >= len(doc):
+            raise JSONDecodeError("Unterminated object", doc, pos)
+        key, pos = _key(doc, pos)
+        result[key], pos = _value(doc, pos)
+        pos = separators(doc, pos).end()
+    return result, pos + 1
+
+
+def _array(doc: str, pos: int) -> tuple[list, int]:
+    result = []
+    separators = _SEPARATORS.match
+    pos = separators(doc, pos).end()
+    while doc[pos : pos + 1] != "]":
+        if pos >= len(doc):
+            raise JSONDecodeError("Unterminated array", doc, pos)
+        value, end = _value(doc, pos)
+        if end == pos:
+            raise JSONDecodeError("Expected a value", doc, pos)
+        result.append(value)
+        pos = separators(doc, end).end()
+    return result, pos + 1
+
+
+def _key(doc: str, pos: int) -> tuple[str, int]:
+    "Read a key and its colon, returning the key and the start of the value"
+    if doc[pos] == '"' or doc[pos] == "'":
+        key, pos = _quoted(doc, pos)
+        match = _COLON.match(doc, pos)
     else:
-        read: str = data.popuntil(*ends)
-        if read == "null":
-            return None
-        elif read == "true":
-            return True
-        elif read == "false":
-            return False
-        elif read.isdigit():
-            return int(read)
-        elif read.isdecimal():
-            return float(read)
-        return read
+        match = _BARE_KEY.match(doc, pos)
+        key = match.group(1).rstrip() if match is not None else None
+    if match is None:
+        raise JSONDecodeError("Expected ':'", doc, pos)
+    return key, match.end()
+
+
+def _skip(doc: str, pos: int) -> int:
+    "Find the end of the value at :code:`pos` without building it"
+    first = doc[pos : pos + 1]
+    if first == "{" or first == "[":
+        close = "}" if first == "{" else "]"
+        separators = _SEPARATORS.match
+        pos = separators(doc, pos + 1).end()
+        while doc[pos : pos + 1] != close:
+            if pos >= len(doc):
+                raise JSONDecodeError("Unterminated " + first, doc, pos)
+            if first == "{":
+                pos = _key(doc, pos)[1]
+            end = _skip(doc, pos)
+            if end == pos and first == "[":
+                raise JSONDecodeError("Expected a value", doc, pos)
+            pos = separators(doc, end).end()
+        return pos + 1
+    if first == '"' or first == "'":
+        match = _QUOTED[first].match(doc, pos)
+        if match is None:
+            raise JSONDecodeError("Unterminated string", doc, pos)
+        return match.end()
+    return _BARE_VALUE.match(doc, pos).end()
+
+
+def _entries(doc: str, pos: int) -> Iterator[tuple[str, int, int]]:
+    "Yield the key and the span of every entry of the object starting at pos"
+    if doc[pos : pos + 1] != "{":
+        raise JSONDecodeError("Expected an object", doc, pos)
+    separators = _SEPARATORS.match
+    pos = separators(doc, pos + 1).end()
+    while doc[pos : pos + 1] != "}":
+        if pos >= len(doc):
+            raise JSONDecodeError("Unterminated object", doc, pos)
+        key, start = _key(doc, pos)
+        end = _skip(doc, start)
+        yield key, start, end
+        pos = separators(doc, end).end()
+
+
+def iter_items(json_str: str) -> Iterator[tuple[str, Any]]:
+    "Parse the entries of a top-level object one at a time"
+    pos = _WHITESPACE.match(json_str).end()
+    if json_str[pos : pos + 1] != "{":
+        raise JSONDecodeError("Expected an object", json_str, pos)
+    separators = _SEPARATORS.match
+    pos = separators(json_str, pos + 1).end()
+    while json_str[pos : pos + 1] != "}":
+        if pos >= len(json_str):
+            raise JSONDecodeError("Unterminated object", json_str, pos)
+        key, pos = _key(json_str, pos)
+        value, pos = _value(json_str, pos)
+        yield key, value
+        pos = separators(json_str, pos).end()
+
+
+def select(json_str: str, *paths: str | tuple[str, ...]) -> dict[Any, Any]:
+    """Parse only the values at the given paths
+
+    A path is a top-level key or a tuple of keys into nested objects, e.g.
+    :code:`select(doc, "zoneId", ("spawnPoint", "x"))`. Everything else is
+    skipped without being built. As with :func:`loads`, the last of duplicate
+    keys wins.
+
+    :return: The found values by path, missing paths are left out
+    """
+    requested = [((path,) if isinstance(path, str) else tuple(path)) for path in paths]
+    wanted: dict[str, Any] = {}
+    for keys in sorted(requested, key=len, reverse=True):
+        node = wanted
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = None
+
+    found: dict[tuple[str, ...], Any] = {}
+    pos = _WHITESPACE.match(json_str).end()
+    _select(json_str, pos, wanted, (), found)
+
+    result = {}
+    for path, keys in zip(paths, requested):
+        for depth in range(len(keys), 0, -1):
+            if keys[:depth] in found:
+                value = found[keys[:depth]]
+                for key in keys[depth:]:
+                    if not isinstance(value, dict) or key not in value:
+                        break
+                    value = value[key]
+                else:
+                    result[path] = value
+                break
+    return result
+
+
+def _select(doc: str, pos: int, wanted: dict, path: tuple, found: dict) -> None:
+    starts = {key: start for key, start, _ in _entries(doc, pos) if key in wanted}
+    for key, start in starts.items():
+        below = wanted[key]
+        if below is None:
+            found[(*path, key)] = _value(doc, start)[0]
+        elif doc[start : start + 1] == "{":
+            _select(doc, start, below, (*path, key), found)
+
+
+def events(json_str: str) -> Iterator[tuple[str, Any]]:
+    """Stream the document as parse events
+
+    Events are :code:`("start_map", None)`, :code:`("key", key)`,
+    :code:`("end_map", None)`, :code:`("start_array", None)`,
+    :code:`("end_array", None)` and :code:`("value", value)`.
+    """
+    pos = _WHITESPACE.match(json_str).end()
+    if json_str[pos : pos + 1] not in ("{", "[", '"', "'"):
+        yield "value", _convert(json_str[pos:].rstrip())
+        return
+    yield from _events(json_str, pos, [])
+
+
+def _events(doc: str, pos: int, end: list[int]) -> Iterator[tuple[str, Any]]:
+    first = doc[pos : pos + 1]
+    if first != "{" and first != "[":
+        value, pos = _value(doc, pos)
+        yield "value", value
+        end[:] = [pos]
+        return
+    separators = _SEPARATORS.match
+    close = "}" if first == "{" else "]"
+    yield ("start_map" if first == "{" else "start_array"), None
+    pos = separators(doc, pos + 1).end()
+    while doc[pos : pos + 1] != close:
+        if pos >= len(doc):
+            raise JSONDecodeError("Unterminated " + first, doc, pos)
+        if first == "{":
+            key, pos = _key(doc, pos)
+            yield "key", key
+        yield from _events(doc, pos, end)
+        if end[0] == pos and first == "[":
+            raise JSONDecodeError("Expected a value", doc, pos)
+        pos = separators(doc, end[0]).end()
+    yield ("end_map" if first == "{" else "end_array"), None
+    end[:] = [pos + 1]
+
+
+class LazyJson(Mapping[str, Any]):
+    """A top-level JSON object, parsed entry by entry as it is accessed
+
+    The first lookup finds where every entry starts without parsing any of
+    them, values are parsed and cached when looked up. As with :func:`loads`,
+    the last of duplicate keys wins. Serializing it again writes :attr:`raw`
+    unchanged.
+    """
+
+    __slots__ = ("raw", "_starts", "_values")
+
+    raw: str
+    "The document as it was received"
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        self._starts: dict[str, int] | None = None
+        self._values: dict[str, Any] = {}
+
+    def _scan(self) -> dict[str, int]:
+        if self._starts is None:
+            pos = _WHITESPACE.match(self.raw).end()
+            self._starts = {key: start for key, start, _ in _entries(self.raw, pos)}
+        return self._starts
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        value = self._values[key] = _value(self.raw, self._scan()[key])[0]
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._scan())
+
+    def __len__(self) -> int:
+        return len(self._scan())
+
+    def select(self, *paths: str | tuple[str, ...]) -> dict[Any, Any]:
+        "See :func:`select`"
+        return select(self.raw, *paths)
+
+    def loads(self) -> dict[str, Any]:
+        "Parse the whole document"
+        return loads(self.raw)
+
+    def __repr__(self) -> str:
+        raw = self.raw if len(self.raw) <= 60 else self.raw[:60] + "..."
+        return f"LazyJson({raw!r})"
 
 
 def loads(json_str: str) -> Any:
-    d = collect(MutableString(json_str))
-    return d
+    pos = _WHITESPACE.match(json_str).end()
+    if json_str[pos : pos + 1] in ("{", "[", '"', "'"):
+        value, pos = _value(json_str, pos)
+        if json_str[_WHITESPACE.match(json_str, pos).end() :]:
+            raise JSONDecodeError("Extra data", json_str, pos)
+        return value
+    return _convert(json_str[pos:].rstrip())
 
 
 def dumps(obj: Any) -> str:
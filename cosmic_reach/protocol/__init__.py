@@ -1,9 +1,25 @@
 from . import packets
-from .generic import GamePacket, GamePacketRegistry
+from .generic import Direction, GamePacket, GamePacketRegistry, PacketDecoder
 
 
-def get_packet_registry():
-    new_registry = GamePacketRegistry()
+def get_packet_registry(
+    codegen: bool | None = None,
+    zero_copy: bool = False,
+    lazy_json: bool = False,
+    lazy: bool = False,
+):
+    """Create a registry with all known packets
+
+    :param codegen: Whether to compile specialized encoders and decoders for the
+        packets, defaults to the ``COSMIC_REACH_CODEGEN`` environment variable
+    :param zero_copy: Whether ``bytes`` fields are decoded as :class:`memoryview`
+        slices into the receive buffer instead of copies
+    :param lazy_json: Whether ``dict`` fields are decoded as read-only
+        :class:`LazyJson` mappings, parsed only as far as they are accessed
+    :param lazy: Whether packet bodies are kept undecoded until a field of the
+        packet is accessed
+    """
+    new_registry = GamePacketRegistry(codegen, zero_copy, lazy_json, lazy)
     new_registry.register(packets.meta.ProtocolSyncPacket, 1)
     new_registry.register(packets.meta.TransactionPacket)
     new_registry.register(packets.meta.LoginPacket)
@@ -52,4 +68,27 @@ def get_packet_registry():
     return new_registry
 
 
-__all__ = ["GamePacket", "GamePacketRegistry", "get_packet_registry", "packets"]
+def registry_from_sync(
+    base: GamePacketRegistry, packet: packets.meta.ProtocolSyncPacket
+) -> GamePacketRegistry:
+    "Build a registry with the packet ids announced in a protocol sync"
+    registry = GamePacketRegistry(
+        base.codegen, base.zero_copy, base.lazy_json, base.lazy
+    )
+    for packet_name, packet_id in packet.packets:
+        if packet_name in base._packet_ids:
+            registry.register(
+                base.get_packet_by_id(base._packet_ids[packet_name]), packet_id
+            )
+    return registry
+
+
+__all__ = [
+    "Direction",
+    "GamePacket",
+    "GamePacketRegistry",
+    "PacketDecoder",
+    "get_packet_registry",
+    "packets",
+    "registry_from_sync",
+]
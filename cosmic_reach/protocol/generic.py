@@ -1,14 +1,80 @@
+import enum
 import io
-from typing import Any, Optional
+import struct
+import time
+from types import MemberDescriptorType
+from typing import TYPE_CHECKING, Any, Iterator, Optional
 
-from ..io.serializer import deserialize, serialize
+from ..io.buffer import BufferReader
+from ..io.codegen import ENABLED as CODEGEN_ENABLED
+from ..io.codegen import CompiledCodec, compile_codec
+from ..io.serializer import deserialize, serialize_into
 
 from ..io.types import Complex
 
+if TYPE_CHECKING:
+    from ..common.metrics import Metrics
+
+_HEADER = struct.Struct(">IH")
+_unpack_length = struct.Struct(">I").unpack_from
+
+
+class Direction(enum.Enum):
+    SERVERBOUND = "serverbound"
+    "From the game client to the server"
+    CLIENTBOUND = "clientbound"
+    "From the server to the game client"
+
+    @property
+    def opposite(self) -> "Direction":
+        if self is Direction.SERVERBOUND:
+            return Direction.CLIENTBOUND
+        return Direction.SERVERBOUND
+
 
 class GamePacketRegistry:
-    _packets: dict[int, type] = {}
-    _packet_ids: dict[str, int] = {}
+    _packets: dict[int, type]
+    _packet_ids: dict[str, int]
+    codegen: bool
+    "Whether packets get a generated encoder and decoder when registered"
+    zero_copy: bool
+    "Whether ``bytes`` fields are decoded as views into the receive buffer"
+    lazy_json: bool
+    "Whether ``dict`` fields are decoded as read-only :class:`LazyJson` mappings"
+    lazy: bool
+    "Whether packet bodies are only decoded once a field is accessed"
+    metrics: "Metrics | None"
+    "Where packets are recorded when serialized and deserialized, if anywhere"
+    sends: Direction | None
+    "The direction serialized packets are sent in, for :attr:`metrics`"
+
+    def __init__(
+        self,
+        codegen: bool | None = None,
+        zero_copy: bool = False,
+        lazy_json: bool = False,
+        lazy: bool = False,
+    ):
+        self._packets = {}
+        self._packet_ids = {}
+        self._compiled: dict[type, CompiledCodec] = {}
+        self.codegen = CODEGEN_ENABLED if codegen is None else codegen
+        self.zero_copy = zero_copy
+        self.lazy_json = lazy_json
+        self.lazy = lazy
+        self.metrics = None
+        self.sends = None
+
+    def enable_metrics(self, metrics: "Metrics", sends: Direction) -> None:
+        """Record every packet serialized or deserialized in :code:`metrics`
+
+        Deserialized packets are recorded as received from the opposite
+        direction. Lazily decoded packets are only recorded as split off, not
+        when their fields are decoded. Set :attr:`metrics` to :code:`None` to
+        stop recording.
+        """
+        self.metrics = metrics
+        self.sends = sends
 
     def register(
         self,
@@ -18,6 +84,8 @@ class GamePacketRegistry:
         packet_id = packet_id or (len(self._packets) + 1)
         self._packets[packet_id] = packet
         self._packet_ids[packet.PACKET_NAME] = packet_id
+        if self.codegen and (compiled := compile_codec(packet)) is not None:
+            self._compiled[packet] = compiled
 
     def get_packet_by_id(self, packet_id: int) -> "GamePacket":
         return self._packets[packet_id]
@@ -25,29 +93,175 @@ class GamePacketRegistry:
     def get_id_by_packet(self, packet: "GamePacket") -> int:
         return self._packet_ids[packet.PACKET_NAME]
 
+    def _write_body(self, packet: "GamePacket", out: bytearray) -> None:
+        body = packet.lazy_body()
+        if body is not None:
+            out += body
+            return
+        compiled = self._compiled.get(type(packet))
+        if compiled is None:
+            serialize_into(out, packet)
+        else:
+            compiled.write(packet, out)
+
     def serialize_cr_packet(self, packet: "GamePacket") -> bytes:
-        return self.get_id_by_packet(packet).to_bytes(2, "big") + serialize(packet)
+        out = bytearray(self.get_id_by_packet(packet).to_bytes(2, "big"))
+        self._write_body(packet, out)
+        return bytes(out)
 
-    def deserialize_cr_packet(self, buf: io.BytesIO) -> bytes:
+    def deserialize_cr_packet(self, buf: BufferReader | io.BytesIO) -> "GamePacket":
+        if (metrics := self.metrics) is not None:
+            start = time.perf_counter_ns()
+        if not isinstance(buf, BufferReader):
+            buf = BufferReader(buf.read(), self.zero_copy)
+        size = buf.remaining() + 4
         packet_id = int.from_bytes(buf.read(2), "big")
         packet_class = self.get_packet_by_id(packet_id)
-        pack = deserialize(packet_class, buf)
-        if leftovers := buf.read():
-            raise ValueError(f"Packet {packet_class.PACKET_NAME} was not fully consumed.") #, leftovers)
+        if self.lazy:
+            packet = packet_class.__new__(packet_class)
+            packet._lazy = (self, buf.read())
+        else:
+            packet = self._decode_body(packet_class, buf)
+        if metrics is not None:
+            metrics.record(
+                "deserialize",
+                self.sends.opposite,
+                packet_class.PACKET_NAME,
+                size,
+                time.perf_counter_ns() - start,
+            )
+        return packet
+
+    def _decode_body(
+        self, packet_class: type["GamePacket"], buf: BufferReader
+    ) -> "GamePacket":
+        buf.lazy_json = self.lazy_json
+        compiled = self._compiled.get(packet_class)
+        if compiled is None:
+            pack = deserialize(packet_class, buf)
+        else:
+            pack = compiled.from_buffer(buf)
+        if buf.remaining():
+            raise ValueError(
+                f"Packet {packet_class.PACKET_NAME} was not fully consumed."
+            )  # , leftovers)
         return pack
 
     def serialize_packet(self, packet: "GamePacket") -> bytes:
-        packet_bytes = self.serialize_cr_packet(packet)
-        return len(packet_bytes).to_bytes(4, "big") + packet_bytes
+        """Serialize a packet into a complete frame
 
-    def deserialize_packet(self, buf: io.BytesIO) -> bytes:
+        The length and id header is reserved up front and patched in once the
+        body has been written, so the frame is built in a single buffer and
+        copied out once.
+        """
+        if (metrics := self.metrics) is not None:
+            start = time.perf_counter_ns()
+        packet_id = self.get_id_by_packet(packet)
+        out = bytearray(_HEADER.size)
+        self._write_body(packet, out)
+        _HEADER.pack_into(out, 0, len(out) - 4, packet_id)
+        if metrics is not None:
+            metrics.record(
+                "serialize",
+                self.sends,
+                packet.PACKET_NAME,
+                len(out),
+                time.perf_counter_ns() - start,
+            )
+        return bytes(out)
+
+    def deserialize_packet(self, buf: BufferReader | io.BytesIO) -> "GamePacket":
         length = int.from_bytes(buf.read(4), "big")
-        buffer = io.BytesIO(buf.read(length))
-        packet = self.deserialize_cr_packet(buffer)
+        if isinstance(buf, BufferReader):
+            frame = buf.subreader(length)
+            frame.zero_copy = self.zero_copy
+        else:
+            frame = BufferReader(buf.read(length), self.zero_copy)
+        packet = self.deserialize_cr_packet(frame)
         return packet
 
+    def deserialize_frame(
+        self, payload: bytes | bytearray | memoryview
+    ) -> "GamePacket":
+        "Deserialize the payload of a frame, i.e. everything after the length"
+        return self.deserialize_cr_packet(BufferReader(payload, self.zero_copy))
+
+
+class PacketDecoder:
+    """Incrementally decode packets from chunks of a byte stream
+
+    Chunks of any size can be passed to :meth:`feed`, frames split across them
+    are reassembled. Everything is kept in one receive buffer, frames are
+    decoded in place and only copied if the registry decodes with
+    :code:`zero_copy`, as those views have to outlive the buffer.
+    """
+
+    registry: GamePacketRegistry
+    "The registry used to decode frames, may be replaced at any time"
+
+    def __init__(self, registry: GamePacketRegistry):
+        self.registry = registry
+        self.buffer = bytearray()
+        self.pos = 0
+
+    def pending(self) -> int:
+        "The number of buffered bytes not yet decoded"
+        return len(self.buffer) - self.pos
+
+    def feed(self, data: bytes | bytearray | memoryview) -> None:
+        "Append a chunk of the stream to the receive buffer"
+        try:
+            self.buffer += data
+        except BufferError:
+            # a view of the buffer is still alive, move on to a new one
+            self.buffer = self.buffer[self.pos :] + data
+            self.pos = 0
+
+    def _compact(self) -> None:
+        if not self.pos:
+            return
+        try:
+            del self.buffer[: self.pos]
+        except BufferError:
+            self.buffer = self.buffer[self.pos :]
+        self.pos = 0
+
+    def next_frame(self) -> BufferReader | None:
+        "Split off the payload of the next complete frame, if there is one"
+        buffer = self.buffer
+        start = self.pos + 4
+        if start > len(buffer):
+            self._compact()
+            return None
+        (length,) = _unpack_length(buffer, self.pos)
+        end = start + length
+        if end > len(buffer):
+            self._compact()
+            return None
+        self.pos = end
+        if self.registry.zero_copy:
+            return BufferReader(bytes(buffer[start:end]), True)
+        return BufferReader(buffer, False, start, end)
+
+    def next_packet(self) -> "GamePacket | None":
+        """Decode the next complete packet, if there is one
+
+        A frame failing to decode is dropped before the error is raised, so
+        decoding can carry on with the next one.
+        """
+        frame = self.next_frame()
+        if frame is None:
+            return None
+        return self.registry.deserialize_cr_packet(frame)
+
+    def __iter__(self) -> Iterator["GamePacket"]:
+        "Decode all complete packets buffered so far"
+        while (packet := self.next_packet()) is not None:
+            yield packet
+
 
 class GamePacket(Complex):
+    __slots__ = ("_lazy",)
     PACKET_NAME = "UnnamedPacket"
     #     PACKET_NAME: str
 
@@ -60,6 +274,59 @@ class GamePacket(Complex):
     #     for arg, (var, typ) in zip(args, self._get_annos().items()):
     #         setattr(self, var, typ(arg) if not isinstance(arg, typ) else arg)
 
+    def __getattr__(self, name: str) -> Any:
+        # only reached for missing attributes, i.e. fields of a lazily
+        # decoded packet whose body was not decoded yet
+        lazy = None if name.startswith("__") else _lazy_of(self)
+        if lazy is None:
+            raise AttributeError(
+                f"{type(self).__name__!r} object has no attribute {name!r}"
+            )
+        registry, body = lazy
+        decoded = registry._decode_body(
+            type(self), BufferReader(body, registry.zero_copy)
+        )
+        del self._lazy
+        # fields set before the body was decoded win over the decoded ones
+        for field in type(self)._fields:
+            if not self._is_set(field) and decoded._is_set(field):
+                setattr(self, field, getattr(decoded, field))
+        return getattr(self, name)
+
+    def _is_set(self, field: str) -> bool:
+        "Whether a field has a value of its own, without decoding a lazy body"
+        slot = getattr(type(self), field, None)
+        if slot.__class__ is MemberDescriptorType:
+            try:
+                slot.__get__(self)
+            except AttributeError:
+                return False
+            return True
+        return field in self.__dict__
+
+    def __getstate__(self) -> Any:
+        # the default probes every slot, which would decode a lazy packet
+        lazy = _lazy_of(self)
+        if lazy is None:
+            return super().__getstate__()
+        slots = {"_lazy": lazy}
+        for field in type(self)._fields:
+            if self._is_set(field):
+                slots[field] = getattr(self, field)
+        return self.__dict__ or None, slots
+
+    def lazy_body(self) -> bytes | None:
+        """The undecoded body of a lazily decoded packet
+
+        It is kept until a field is accessed and written out again unchanged
+        when the packet is re-sent. Once a field is decoded or set, the packet
+        might be modified, so it is encoded from its fields instead.
+        """
+        lazy = _lazy_of(self)
+        if lazy is None or any(map(self._is_set, type(self)._fields)):
+            return None
+        return lazy[1]
+
     def _get_annos(self) -> dict[str, Any]:
         try:
             return self.__annotations__
@@ -92,3 +359,14 @@ class GamePacket(Complex):
 
     def __repr__(self) -> str:
         return f"<{self.PACKET_NAME} {" ".join(key + "=" + repr(getattr(self, key)) for key in self._get_annos())}>"
+
+
+_LAZY = GamePacket.__dict__["_lazy"]
+
+
+def _lazy_of(packet: GamePacket) -> tuple[GamePacketRegistry, bytes] | None:
+    "The registry and body of a packet not decoded yet, bypassing ``__getattr__``"
+    try:
+        return _LAZY.__get__(packet)
+    except AttributeError:
+        return None
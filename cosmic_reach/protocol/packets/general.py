@@ -20,6 +20,7 @@ class ZonePacket(GamePacket):
 
     set_default: bool
     zone: dict
+    "The zone's JSON, a :class:`LazyJson` if decoded with ``lazy_json``"
 
 
 class ChunkColumnPacket(GamePacket):
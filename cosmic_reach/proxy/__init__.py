@@ -0,0 +1,3 @@
+from .proxy import DROP, Direction, Proxy, ProxyConnection
+
+__all__ = ["DROP", "Direction", "Proxy", "ProxyConnection"]
@@ -0,0 +1,276 @@
+import asyncio
+import inspect
+import struct
+import traceback
+from typing import Any, Callable
+
+from ..common.sendqueue import SendQueue
+from ..common.transport import StreamTransport
+from ..protocol import (
+    Direction,
+    GamePacket,
+    GamePacketRegistry,
+    packets,
+    registry_from_sync,
+)
+from ..server.aio import AsyncBaseClientConnection, AsyncServer
+
+_HEADER = struct.Struct(">IH")
+_ID = struct.Struct(">H")
+_PROTOCOL_SYNC_ID = 1
+
+
+DROP = object()
+"Returned by a proxy packet handler to not forward the packet"
+
+
+class ProxyConnection(AsyncBaseClientConnection):
+    """A game client relayed to the proxy's upstream server
+
+    Frames are forwarded as they are, only those of packet types a handler
+    was registered for are decoded. Handlers are called with the connection,
+    the packet and its :class:`Direction` and may return :data:`DROP` to
+    swallow the packet or a packet to forward instead of the original one.
+    Packet ids are rewritten if the two sides announced different ids in
+    their protocol syncs.
+
+    Nothing is decoded through :attr:`decoder`, the inherited
+    :meth:`send_packet` and broadcasts go to the game client encoded with the
+    ids it uses, see :attr:`packet_registry`.
+    """
+
+    server: "Proxy"
+    decoder: None
+    upstream: StreamTransport | None
+    upstream_queue: SendQueue | None
+    registries: dict[Direction, GamePacketRegistry]
+    "The ids the sender in each direction uses"
+
+    def __init__(self, server: "Proxy", transport: StreamTransport):
+        super().__init__(server, transport)
+        # frames are relayed by _forward, not decoded from the client stream
+        self.decoder = None
+        self.upstream = None
+        self.upstream_queue = None
+        self.registries = dict.fromkeys(Direction, server.packet_registry)
+        self.packet_handlers = list(server.packet_handlers)
+        self._rewrite: dict[Direction, dict[int, int]] = {
+            direction: {} for direction in Direction
+        }
+        self._intercept: dict[Direction, set[int] | None] = {}
+        self._update_intercepts()
+
+    def on_packet(
+        self,
+        packet_class: type[GamePacket] | None,
+        handler: Callable | None = None,
+        direction: Direction | None = None,
+    ):
+        if handler is None:
+            return lambda handler: self.on_packet(packet_class, handler, direction)
+
+        self.packet_handlers.append((packet_class, handler, direction))
+        self._update_intercepts()
+
+    def _update_intercepts(self):
+        for direction, registry in self.registries.items():
+            intercept = {_PROTOCOL_SYNC_ID}
+            for packet_class, _, handler_direction in self.packet_handlers:
+                if handler_direction not in (None, direction):
+                    continue
+                if packet_class is None:
+                    intercept = None
+                    break
+                for packet_id, registered in registry._packets.items():
+                    if issubclass(registered, packet_class):
+                        intercept.add(packet_id)
+            self._intercept[direction] = intercept
+
+    @property
+    def packet_registry(self) -> GamePacketRegistry:
+        "The ids the game client uses, which packets sent to it are encoded with"
+        return self.registries[Direction.SERVERBOUND]
+
+    def _sink(self, direction: Direction) -> SendQueue:
+        return self.upstream_queue if direction is Direction.SERVERBOUND else self.queue
+
+    def _target_registry(self, direction: Direction) -> GamePacketRegistry:
+        other = (
+            Direction.CLIENTBOUND
+            if direction is Direction.SERVERBOUND
+            else Direction.SERVERBOUND
+        )
+        return self.registries[other]
+
+    def send_to_client(self, packet: GamePacket):
+        "Inject a packet into the stream to the game client, see :meth:`send_packet`"
+        self.send_packet(packet)
+
+    def send_to_server(self, packet: GamePacket):
+        "Inject a packet into the stream to the upstream server"
+        registry = self._target_registry(Direction.SERVERBOUND)
+        self.upstream_queue.put_nowait(registry.serialize_packet(packet))
+
+    def _protocol_sync(
+        self, direction: Direction, packet: packets.meta.ProtocolSyncPacket
+    ):
+        registry = registry_from_sync(self.server.packet_registry, packet)
+        self.registries[direction] = registry
+        if direction is Direction.CLIENTBOUND:
+            # the game client adopts the server's ids, until it says otherwise
+            self.registries[Direction.SERVERBOUND] = registry
+
+        clientbound = self.registries[Direction.CLIENTBOUND]._packet_ids
+        serverbound = self.registries[Direction.SERVERBOUND]._packet_ids
+        self._rewrite[Direction.CLIENTBOUND] = {
+            clientbound[name]: serverbound[name]
+            for name in clientbound.keys() & serverbound.keys()
+            if clientbound[name] != serverbound[name]
+        }
+        self._rewrite[Direction.SERVERBOUND] = {
+            new: old for old, new in self._rewrite[Direction.CLIENTBOUND].items()
+        }
+        self._update_intercepts()
+
+    async def _handle_frame(
+        self, direction: Direction, frame: bytearray, packet_id: int
+    ) -> None:
+        sink = self._sink(direction)
+        intercept = self._intercept[direction]
+        if intercept is None or packet_id in intercept:
+            packet = self.registries[direction].deserialize_frame(memoryview(frame)[4:])
+            if packet_id == _PROTOCOL_SYNC_ID and isinstance(
+                packet, packets.meta.ProtocolSyncPacket
+            ):
+                self._protocol_sync(direction, packet)
+            for packet_class, handler, handler_direction in self.packet_handlers:
+                if handler_direction not in (None, direction):
+                    continue
+                if packet_class is not None and not isinstance(packet, packet_class):
+                    continue
+                result = handler(self, packet, direction)
+                if inspect.isawaitable(result):
+                    result = await result
+                if result is DROP:
+                    return
+                if isinstance(result, GamePacket):
+                    registry = self._target_registry(direction)
+                    sink.put_nowait(registry.serialize_packet(result))
+                    return
+        rewritten = self._rewrite[direction].get(packet_id)
+        if rewritten is not None:
+            _ID.pack_into(frame, 4, rewritten)
+        sink.put_nowait(frame)
+
+    async def _forward(self, direction: Direction, buffer: bytearray) -> int:
+        "Forward all complete frames in the buffer, returning where they end"
+        sink = self._sink(direction)
+        end = len(buffer)
+        pos = run = 0
+        while pos + _HEADER.size <= end:
+            length, packet_id = _HEADER.unpack_from(buffer, pos)
+            frame_end = pos + 4 + length
+            if frame_end > end:
+                break
+            intercept = self._intercept[direction]
+            if (
+                intercept is None
+                or packet_id in intercept
+                or packet_id in self._rewrite[direction]
+            ):
+                if run < pos:
+                    sink.put_nowait(buffer[run:pos])
+                try:
+                    await self._handle_frame(
+                        direction, buffer[pos:frame_end], packet_id
+                    )
+                except Exception as e:
+                    print("----- ERROR -----")
+                    traceback.print_exception(e)
+                    print("-----------------")
+                run = frame_end
+            pos = frame_end
+        if run < pos:
+            sink.put_nowait(buffer[run:pos])
+        return pos
+
+    async def _relay(self, direction: Direction) -> None:
+        source = self.transport if direction is Direction.SERVERBOUND else self.upstream
+        sink = self._sink(direction)
+        buffer = bytearray()
+        try:
+            while True:
+                buffer += await source.read_chunk()
+                del buffer[: await self._forward(direction, buffer)]
+                await sink.wait_for_room()
+        except ConnectionError:
+            pass
+        finally:
+            self.close()
+
+    async def handle(self):
+        host, port = self.server.upstream
+        try:
+            self.upstream = await StreamTransport.open(host, port)
+        except OSError as e:
+            print(f"[Proxy] Could not connect to upstream {host}:{port}: {e}")
+            return
+        self.upstream_queue = SendQueue(
+            self.upstream,
+            self.send_max_frames,
+            self.send_max_bytes,
+            self.send_policy,
+            self.close,
+        )
+        self.upstream_queue.start()
+        try:
+            await asyncio.gather(
+                self._relay(Direction.SERVERBOUND), self._relay(Direction.CLIENTBOUND)
+            )
+        finally:
+            await self.upstream_queue.close()
+            await self.upstream.close()
+
+    def close(self):
+        super().close()
+        if self.upstream is not None:
+            self.upstream.writer.close()
+
+
+class Proxy(AsyncServer):
+    """A transparent proxy between game clients and one upstream server
+
+    Handlers registered with :meth:`on_packet` apply to every connection, see
+    :class:`ProxyConnection`.
+    """
+
+    upstream: tuple[str, int]
+    packet_handlers: list[tuple[type[GamePacket] | None, Callable, Any]]
+
+    def __init__(
+        self,
+        upstream_host: str,
+        upstream_port: int = 47137,
+        handler: type[ProxyConnection] = ProxyConnection,
+    ):
+        super().__init__(handler)
+        self.upstream = (upstream_host, upstream_port)
+        self.packet_handlers = []
+
+    def on_packet(
+        self,
+        packet_class: type[GamePacket] | None,
+        handler: Callable | None = None,
+        direction: Direction | None = None,
+    ):
+        """Decode packets of a type and pass them to a handler
+
+        :param packet_class: The packets to handle, :code:`None` for all
+        :param direction: Only handle packets sent this way
+        """
+        if handler is None:
+            return lambda handler: self.on_packet(packet_class, handler, direction)
+
+        self.packet_handlers.append((packet_class, handler, direction))
+        for connection in self.connections:
+            connection.on_packet(packet_class, handler, direction)
@@ -0,0 +1,23 @@
+"""A compact, schema-based binary format for files of records
+
+This is a format of this library, it is not CRBin and cannot read the game's
+save or region files. Objects are dicts of ints, floats, bools, strings,
+bytes, nested dicts and lists of those. :func:`encode`/:func:`decode` handle
+single documents, :class:`RecordReader`/:class:`RecordWriter` stream files of
+records and :class:`RecordArchive` maps such a file for random access.
+"""
+
+from .archive import RecordArchive
+from .schema import Decoder, Encoder, SchemaType, decode, encode
+from .stream import RecordReader, RecordWriter
+
+__all__ = [
+    "Decoder",
+    "Encoder",
+    "RecordArchive",
+    "RecordReader",
+    "RecordWriter",
+    "SchemaType",
+    "decode",
+    "encode",
+]
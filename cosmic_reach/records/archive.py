@@ -0,0 +1,95 @@
+import mmap
+import struct
+from collections.abc import Sequence
+from os import PathLike
+from typing import Any, Iterator
+
+from .schema import decode
+
+_LENGTH = struct.Struct(">i")
+
+
+class RecordArchive(Sequence[dict[str, Any]]):
+    """Random access to the records of a record file through :mod:`mmap`
+
+    Nothing is read up front: record offsets are found by hopping from length
+    to length only as far as a record is asked for, and records are decoded
+    on access only. With :code:`zero_copy`, byte arrays in decoded records
+    are views into the mapped file and have to be released before
+    :meth:`close`.
+    """
+
+    path: str | PathLike
+    zero_copy: bool
+
+    def __init__(self, path: str | PathLike, zero_copy: bool = False):
+        self.path = path
+        self.zero_copy = zero_copy
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files cannot be mapped
+            self._map = b""
+        self._view = memoryview(self._map)
+        self._offsets: list[int] = []
+        self._scanned = 0
+        "Where the first record not in :attr:`_offsets` starts"
+
+    def _scan(self, until: int | None = None) -> None:
+        view = self._view
+        end = len(view)
+        offsets = self._offsets
+        pos = self._scanned
+        while pos < end and (until is None or len(offsets) <= until):
+            if pos + 4 > end:
+                raise EOFError("Truncated record length")
+            (length,) = _LENGTH.unpack_from(view, pos)
+            if length < 0:
+                raise ValueError(f"Negative record length {length}")
+            if pos + 4 + length > end:
+                raise EOFError("Truncated record")
+            offsets.append(pos)
+            pos += 4 + length
+        self._scanned = pos
+
+    def raw(self, idx: int) -> memoryview:
+        "The encoded document of a record, without copying it"
+        if idx < 0:
+            idx += len(self)
+        if idx >= len(self._offsets):
+            self._scan(idx)
+        if not 0 <= idx < len(self._offsets):
+            raise IndexError("Record index out of range")
+        start = self._offsets[idx] + 4
+        (length,) = _LENGTH.unpack_from(self._view, start - 4)
+        return self._view[start : start + length]
+
+    def __getitem__(self, idx: int) -> dict[str, Any]:
+        return decode(self.raw(idx), self.zero_copy)
+
+    def __len__(self) -> int:
+        self._scan()
+        return len(self._offsets)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        idx = 0
+        while True:
+            if idx >= len(self._offsets):
+                self._scan(idx)
+                if idx >= len(self._offsets):
+                    return
+            yield self[idx]
+            idx += 1
+
+    def close(self) -> None:
+        self._view.release()
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "RecordArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,274 @@
+import enum
+import struct
+from functools import lru_cache
+from typing import Any
+
+from ..io.types import Byte, Long, Short
+
+_INT = struct.Struct(">i")
+_LENGTH_AND_TYPE = struct.Struct(">ib")
+
+
+class SchemaType(enum.IntEnum):
+    "The type of a field in a record schema, arrays are the item type + 16"
+
+    BYTE = 1
+    SHORT = 2
+    INT = 3
+    LONG = 4
+    FLOAT = 5
+    DOUBLE = 6
+    BOOLEAN = 7
+    STRING = 8
+    OBJ = 9
+    BYTE_ARRAY = 17
+    SHORT_ARRAY = 18
+    INT_ARRAY = 19
+    LONG_ARRAY = 20
+    FLOAT_ARRAY = 21
+    DOUBLE_ARRAY = 22
+    BOOLEAN_ARRAY = 23
+    STRING_ARRAY = 24
+    OBJ_ARRAY = 25
+
+
+_ARRAY = 16
+_FORMATS = {
+    SchemaType.BYTE: "b",
+    SchemaType.SHORT: "h",
+    SchemaType.INT: "i",
+    SchemaType.LONG: "q",
+    SchemaType.FLOAT: "f",
+    SchemaType.DOUBLE: "d",
+    SchemaType.BOOLEAN: "?",
+}
+"struct formats of the fixed width types"
+_TYPES = {int(typ): typ for typ in SchemaType}
+
+
+def _int_type(value: int) -> SchemaType:
+    if isinstance(value, Byte):
+        return SchemaType.BYTE
+    if isinstance(value, Short):
+        return SchemaType.SHORT
+    if isinstance(value, Long) or not -(1 << 31) <= value < 1 << 31:
+        return SchemaType.LONG
+    return SchemaType.INT
+
+
+def type_of(value: Any) -> SchemaType:
+    "The schema type a value is written as"
+    if isinstance(value, bool):
+        return SchemaType.BOOLEAN
+    if isinstance(value, int):
+        return _int_type(value)
+    if isinstance(value, float):
+        return SchemaType.DOUBLE
+    if isinstance(value, str):
+        return SchemaType.STRING
+    if value is None or isinstance(value, dict):
+        return SchemaType.OBJ
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return SchemaType.BYTE_ARRAY
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return SchemaType.OBJ_ARRAY
+        item_types = set(map(type_of, value))
+        if item_types <= {SchemaType.BYTE, SchemaType.SHORT, SchemaType.INT}:
+            item_types = {max(item_types)}
+        elif item_types <= {
+            SchemaType.BYTE,
+            SchemaType.SHORT,
+            SchemaType.INT,
+            SchemaType.LONG,
+        }:
+            item_types = {SchemaType.LONG}
+        if len(item_types) != 1 or SchemaType.BYTE_ARRAY <= min(item_types):
+            raise TypeError("Arrays hold items of one non-array type")
+        return SchemaType(item_types.pop() + _ARRAY)
+    raise TypeError(f"Unsupported type {type(value)}")
+
+
+class Encoder:
+    """Encodes one document
+
+    A document is the table of strings, the table of schemas and the root
+    object. Objects are written as the index of their schema followed by
+    their fields in schema order, strings as their index in the table.
+    """
+
+    def __init__(self):
+        self.strings: dict[str, int] = {}
+        self.schemas: dict[tuple[tuple[str, SchemaType], ...], int] = {}
+        self.body = bytearray()
+
+    def _string(self, string: str | None) -> int:
+        if string is None:
+            return -1
+        idx = self.strings.get(string)
+        if idx is None:
+            idx = self.strings[string] = len(self.strings)
+        return idx
+
+    def _value(self, typ: SchemaType, value: Any) -> None:
+        body = self.body
+        if typ in _FORMATS:
+            body += struct.pack(">" + _FORMATS[typ], value)
+        elif typ is SchemaType.STRING:
+            body += _INT.pack(self._string(value))
+        elif typ is SchemaType.OBJ:
+            self.object(value)
+        elif typ is SchemaType.BYTE_ARRAY:
+            body += _INT.pack(len(value))
+            body += value
+        else:
+            item = SchemaType(typ - _ARRAY)
+            body += _INT.pack(len(value))
+            if item in _FORMATS:
+                body += struct.pack(f">{len(value)}{_FORMATS[item]}", *value)
+            elif item is SchemaType.STRING:
+                strings = [self._string(string) for string in value]
+                body += struct.pack(f">{len(strings)}i", *strings)
+            else:
+                for obj in value:
+                    self.object(obj)
+
+    def object(self, obj: dict[str, Any] | None) -> None:
+        if obj is None:
+            self.body += _INT.pack(-1)
+            return
+        schema = tuple((key, type_of(value)) for key, value in obj.items())
+        idx = self.schemas.get(schema)
+        if idx is None:
+            idx = self.schemas[schema] = len(self.schemas)
+            for key, _ in schema:
+                self._string(key)
+        self.body += _INT.pack(idx)
+        for (_, typ), value in zip(schema, obj.values()):
+            self._value(typ, value)
+
+    def finish(self) -> bytearray:
+        "The complete document, after the root object was written"
+        out = bytearray(_INT.pack(len(self.strings)))
+        for string in self.strings:
+            encoded = string.encode("utf-8")
+            out += _INT.pack(len(encoded))
+            out += encoded
+        out += _INT.pack(len(self.schemas))
+        for schema in self.schemas:
+            out += _INT.pack(len(schema))
+            for key, typ in schema:
+                out += _LENGTH_AND_TYPE.pack(self.strings[key], typ)
+        out += self.body
+        return out
+
+
+def encode(obj: dict[str, Any]) -> bytearray:
+    "Encode an object as a document"
+    encoder = Encoder()
+    encoder.object(obj)
+    return encoder.finish()
+
+
+@lru_cache(maxsize=1024)
+def _compile(fields: tuple[tuple[str, int], ...]) -> list[tuple[Any, ...]]:
+    "Fuse consecutive fixed width fields of a schema into one struct read each"
+    steps = []
+    run: list[tuple[str, SchemaType]] = []
+    for name, typ in fields + ((None, None),):
+        typ = _TYPES.get(typ)
+        if typ in _FORMATS:
+            run.append((name, typ))
+            continue
+        if run:
+            fmt = ">" + "".join(_FORMATS[field_typ] for _, field_typ in run)
+            steps.append((tuple(name for name, _ in run), struct.Struct(fmt)))
+            run = []
+        if name is not None:
+            if typ is None:
+                raise ValueError(f"Unknown record schema type of field {name}")
+            steps.append((name, typ))
+    return steps
+
+
+class Decoder:
+    """Decodes one document from a buffer
+
+    Runs of fixed width fields in a schema are read with one fused
+    :class:`struct.Struct` each. With :code:`zero_copy`, byte arrays are
+    returned as :class:`memoryview` slices of the buffer.
+    """
+
+    def __init__(self, data: bytes | memoryview, zero_copy: bool = False):
+        self.view = memoryview(data)
+        self.zero_copy = zero_copy
+        self.pos = 0
+        self.strings: list[str] = []
+        self.schemas: list[list[tuple[Any, ...]]] = []
+
+    def _int(self) -> int:
+        (value,) = _INT.unpack_from(self.view, self.pos)
+        self.pos += 4
+        return value
+
+    def read_tables(self) -> None:
+        view = self.view
+        strings = self.strings
+        for _ in range(self._int()):
+            length = self._int()
+            strings.append(str(view[self.pos : self.pos + length], "utf-8"))
+            self.pos += length
+        for _ in range(self._int()):
+            count = self._int()
+            fields = struct.unpack_from(">" + "ib" * count, view, self.pos)
+            self.pos += 5 * count
+            names = map(strings.__getitem__, fields[::2])
+            self.schemas.append(_compile(tuple(zip(names, fields[1::2]))))
+
+    def _value(self, typ: SchemaType) -> Any:
+        if typ is SchemaType.STRING:
+            idx = self._int()
+            return None if idx < 0 else self.strings[idx]
+        if typ is SchemaType.OBJ:
+            return self.object()
+        length = self._int()
+        start = self.pos
+        if typ is SchemaType.BYTE_ARRAY:
+            self.pos += length
+            if self.zero_copy:
+                return self.view[start : self.pos]
+            return self.view[start : self.pos].tobytes()
+        item = _TYPES[typ - _ARRAY]
+        if item in _FORMATS:
+            fmt = struct.Struct(f">{length}{_FORMATS[item]}")
+            self.pos += fmt.size
+            return list(fmt.unpack_from(self.view, start))
+        if item is SchemaType.STRING:
+            self.pos += 4 * length
+            strings = self.strings
+            return [
+                None if idx < 0 else strings[idx]
+                for idx in struct.unpack_from(f">{length}i", self.view, start)
+            ]
+        return [self.object() for _ in range(length)]
+
+    def object(self) -> dict[str, Any] | None:
+        idx = self._int()
+        if idx < 0:
+            return None
+        obj = {}
+        for names, step in self.schemas[idx]:
+            if step.__class__ is struct.Struct:
+                values = step.unpack_from(self.view, self.pos)
+                self.pos += step.size
+                obj.update(zip(names, values))
+            else:
+                obj[names] = self._value(step)
+        return obj
+
+
+def decode(data: bytes | memoryview, zero_copy: bool = False) -> dict[str, Any]:
+    "Decode a document"
+    decoder = Decoder(data, zero_copy)
+    decoder.read_tables()
+    return decoder.object()
@@ -0,0 +1,87 @@
+import struct
+from typing import Any, BinaryIO, Iterator
+
+from .schema import decode, encode
+
+_LENGTH = struct.Struct(">i")
+
+
+class RecordWriter:
+    """Appends records to a binary file object
+
+    A record file is a sequence of records, each a document prefixed by
+    its length as an int.
+    """
+
+    file: BinaryIO
+    records: int
+    "The number of records written"
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.records = 0
+
+    def write_raw(self, document: bytes | bytearray | memoryview) -> None:
+        "Append an already encoded document"
+        self.file.write(_LENGTH.pack(len(document)))
+        self.file.write(document)
+        self.records += 1
+
+    def write(self, obj: dict[str, Any]) -> None:
+        self.write_raw(encode(obj))
+
+    def write_all(self, objs) -> None:
+        for obj in objs:
+            self.write(obj)
+
+
+class RecordReader:
+    """Reads records off a binary file object one at a time
+
+    Only one record is held in memory at a time, so files of any size can be
+    streamed. Use :class:`RecordArchive` to access records out of order.
+    """
+
+    file: BinaryIO
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+
+    def read_raw(self) -> bytes | None:
+        "Read the next encoded document, :code:`None` at the end of the file"
+        header = self.file.read(4)
+        if not header:
+            return None
+        if len(header) < 4:
+            raise EOFError("Truncated record length")
+        (length,) = _LENGTH.unpack(header)
+        if length < 0:
+            raise ValueError(f"Negative record length {length}")
+        document = self.file.read(length)
+        if len(document) < length:
+            raise EOFError("Truncated record")
+        return document
+
+    def skip(self) -> bool:
+        "Skip the next record without reading it, if the file is seekable"
+        header = self.file.read(4)
+        if len(header) < 4:
+            return False
+        (length,) = _LENGTH.unpack(header)
+        if length < 0:
+            raise ValueError(f"Negative record length {length}")
+        self.file.seek(length, 1)
+        return True
+
+    def read(self) -> dict[str, Any] | None:
+        "Read and decode the next record, :code:`None` at the end of the file"
+        document = self.read_raw()
+        return None if document is None else decode(document)
+
+    def raw_records(self) -> Iterator[bytes]:
+        while (document := self.read_raw()) is not None:
+            yield document
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for document in self.raw_records():
+            yield decode(document)
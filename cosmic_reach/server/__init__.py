@@ -1,4 +1,5 @@
+from .aio import AsyncBaseClientConnection, AsyncServer
 from .base import BaseClientConnection
 from .general import Server
 
-__all__ = ["BaseClientConnection", "Server"]
+__all__ = ["AsyncBaseClientConnection", "AsyncServer", "BaseClientConnection", "Server"]
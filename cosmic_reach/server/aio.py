@@ -0,0 +1,272 @@
+import asyncio
+import inspect
+import time
+import traceback
+from os import PathLike
+from typing import Callable
+
+from ..capture import CaptureWriter
+from ..common.batching import OutputBatcher
+from ..common.metrics import Metrics
+from ..common.sendqueue import OverflowPolicy, SendQueue
+from ..common.transport import StreamTransport
+from ..protocol import Direction, PacketDecoder, get_packet_registry, packets
+from ..protocol.generic import GamePacket, GamePacketRegistry
+from .general import BroadcastMixin
+
+
+class AsyncBaseClientConnection:
+    """A client connection served on an asyncio event loop
+
+    Mirrors :class:`BaseClientConnection`: handlers are registered with
+    :meth:`on_packet` and may be plain functions or coroutine functions. Every
+    connection runs one task reading packets and one writing the queued ones,
+    the send queue is bounded as configured by the ``send_*`` attributes.
+    """
+
+    send_policy: OverflowPolicy = OverflowPolicy.BLOCK
+    "What to do if the client does not keep up with the packets sent to it"
+    send_max_frames: int = 4096
+    send_max_bytes: int = 8 * 1024 * 1024
+
+    server: "AsyncServer"
+    transport: StreamTransport
+    decoder: PacketDecoder
+    batcher: OutputBatcher | None
+    "Coalesces outgoing packets if batching is enabled"
+    capture: CaptureWriter | None
+    "Records the frames sent and received if capturing is enabled"
+    queue: SendQueue
+
+    def __init__(self, server: "AsyncServer", transport: StreamTransport):
+        self.server = server
+        self.transport = transport
+        self.decoder = PacketDecoder(server.packet_registry)
+        self.packet_handlers = []
+        self.batcher = None
+        self.capture = None
+        self.queue = SendQueue(
+            transport,
+            self.send_max_frames,
+            self.send_max_bytes,
+            self.send_policy,
+            self._on_send_overflow,
+        )
+
+    def on_packet(
+        self, packet_class: type[GamePacket] | None, handler: Callable | None = None
+    ):
+        if handler is None:
+            return lambda handler: self.on_packet(packet_class, handler)
+
+        self.packet_handlers.append((packet_class, handler))
+
+    def setup(self):
+        "Called before the connection is handled"
+
+    def finish(self):
+        "Called after the connection has been closed"
+
+    @property
+    def packet_registry(self) -> GamePacketRegistry:
+        "The registry packets of this connection are encoded and decoded with"
+        return self.decoder.registry
+
+    @packet_registry.setter
+    def packet_registry(self, registry: GamePacketRegistry):
+        self.decoder.registry = registry
+        if self.capture is not None:
+            self.capture.write_table(registry)
+        if self.server.metrics is not None:
+            registry.enable_metrics(self.server.metrics, Direction.CLIENTBOUND)
+
+    async def receive_packet(self) -> GamePacket:
+        while (frame := self.decoder.next_frame()) is None:
+            self.decoder.feed(await self.transport.read_chunk())
+        if self.capture is not None:
+            self.capture.write_payload(
+                Direction.SERVERBOUND, frame.view[frame.pos : frame.end]
+            )
+        return self.packet_registry.deserialize_cr_packet(frame)
+
+    async def handle(self):
+        while True:
+            try:
+                await self.queue.wait_for_room()
+                packet = await self.receive_packet()
+            except ConnectionError:
+                return
+            except Exception as e:
+                print("----- ERROR -----")
+                traceback.print_exception(e)
+                print("-----------------")
+            else:
+                if (metrics := self.server.metrics) is not None:
+                    start = time.perf_counter_ns()
+                for packet_class, handler in self.packet_handlers:
+                    if packet_class is None or isinstance(packet, packet_class):
+                        result = handler(self, packet)
+                        if inspect.isawaitable(result):
+                            await result
+                if metrics is not None:
+                    metrics.record(
+                        "dispatch",
+                        Direction.SERVERBOUND,
+                        packet.PACKET_NAME,
+                        0,
+                        time.perf_counter_ns() - start,
+                    )
+
+    def send_packet(self, packet: GamePacket):
+        """Queue a packet to be sent by the writer task
+
+        Use :meth:`send_packet_wait` to wait for room in the send queue.
+        """
+        self.send_frame(self.packet_registry.serialize_packet(packet), packet)
+
+    def send_frame(self, frame: bytes | bytearray, packet: GamePacket | None = None):
+        """Queue an already serialized frame to be sent by the writer task
+
+        :param packet: The packet the frame was serialized from, if batching
+            should be able to flush on it
+        """
+        if self.capture is not None:
+            self.capture.write_frame(Direction.CLIENTBOUND, frame)
+        if self.batcher is None:
+            self.queue.put_nowait(frame)
+        else:
+            self.batcher.add(frame, packet)
+
+    async def send_packet_wait(self, packet: GamePacket):
+        "Send a packet, waiting for room in the send queue first"
+        await self.queue.wait_for_room()
+        self.send_packet(packet)
+
+    def _on_send_overflow(self):
+        reason = "Too slow to receive packets"
+        frame = self.packet_registry.serialize_packet(
+            packets.meta.DisconnectPacket(reason)
+        )
+        self.transport.write(frame)
+        self.close()
+
+    def enable_batching(
+        self, max_bytes: int = 65536, max_delay: float | None = 0.005
+    ) -> OutputBatcher:
+        """Coalesce outgoing packets into fewer writes, see :class:`OutputBatcher`
+
+        :param max_bytes: Flush once this many bytes are buffered
+        :param max_delay: Flush once a packet waited this many seconds
+        """
+        self.batcher = OutputBatcher(
+            self.queue.put_nowait,
+            max_bytes,
+            max_delay,
+            (packets.general.EndTickPacket,),
+        )
+        return self.batcher
+
+    def enable_capture(self, path: str | PathLike) -> CaptureWriter:
+        """Record all frames sent and received to a capture file
+
+        The file is completed when the connection is closed, read it with
+        :class:`cosmic_reach.capture.CaptureReader`.
+        """
+        self.capture = CaptureWriter(path)
+        self.capture.write_table(self.packet_registry)
+        return self.capture
+
+    async def run(self):
+        "Handle the connection until it is closed by either side"
+        self.setup()
+        self.queue.start()
+        try:
+            await self.handle()
+        finally:
+            self.finish()
+            if self.batcher is not None:
+                self.batcher.flush()
+            await self.queue.close()
+            await self.transport.close()
+            if self.capture is not None:
+                self.capture.close()
+
+    def close(self):
+        "Close the connection, the reading and writing tasks will stop"
+        self.transport.writer.close()
+
+
+class AsyncServer(BroadcastMixin):
+    "A server handling all of its connections on one asyncio event loop"
+
+    connections: set[AsyncBaseClientConnection]
+    metrics: Metrics | None
+    "Records packet counts, sizes and timings of all connections if enabled"
+
+    def __init__(self, handler: type[AsyncBaseClientConnection]):
+        self.packet_registry = get_packet_registry()
+        self.metrics = None
+        self.handler = handler
+        self.connections = set()
+        self._server: asyncio.Server | None = None
+        self._closed = asyncio.Event()
+        self._tasks: set[asyncio.Task] = set()
+
+    def enable_metrics(self, metrics: Metrics | None = None) -> Metrics:
+        """Record the packets of all connections, see :class:`Metrics`
+
+        :param metrics: Where to record, e.g. to share it between servers
+        """
+        self.metrics = Metrics() if metrics is None else metrics
+        self.packet_registry.enable_metrics(self.metrics, Direction.CLIENTBOUND)
+        return self.metrics
+
+    async def _accept(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        connection = self.handler(self, StreamTransport(reader, writer))
+        task = asyncio.current_task()
+        self.connections.add(connection)
+        self._tasks.add(task)
+        try:
+            await connection.run()
+        finally:
+            self.connections.discard(connection)
+            self._tasks.discard(task)
+
+    async def start(
+        self, host: str = "localhost", port: int = 47137, backlog: int = 1024
+    ):
+        """Start accepting connections in the background
+
+        :param backlog: How many connections may wait to be accepted, asyncio
+            defaults to only 100 which stalls bursts of clients connecting
+        """
+        self._closed.clear()
+        self._server = await asyncio.start_server(
+            self._accept, host, port, backlog=backlog
+        )
+
+    async def serve(
+        self, host: str = "localhost", port: int = 47137, backlog: int = 1024
+    ):
+        "Accept and handle connections until the server is closed"
+        await self.start(host, port, backlog)
+        try:
+            # not serve_forever, if cancelled it waits for the connections
+            # to close before they were told to
+            await self._closed.wait()
+        finally:
+            await self.close()
+
+    async def close(self):
+        "Stop accepting connections and close all open ones"
+        server, self._server = self._server, None
+        if server is None:
+            return
+        self._closed.set()
+        server.close()
+        for connection in list(self.connections):
+            connection.close()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await server.wait_closed()
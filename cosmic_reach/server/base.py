@@ -1,9 +1,15 @@
 import io
 import socketserver
+import time
 import traceback
+from os import PathLike
 from typing import TYPE_CHECKING, Callable
 
-from ..protocol.generic import GamePacket
+from ..capture import CaptureWriter
+from ..common.batching import OutputBatcher, sendmsg_all
+from ..protocol import Direction
+from ..protocol.generic import GamePacket, GamePacketRegistry
+from ..protocol.packets.general import EndTickPacket
 
 if TYPE_CHECKING:
     from .general import Server
@@ -22,6 +28,12 @@ class ConnectionReadBuffer:
 
 class BaseClientConnection(socketserver.StreamRequestHandler):
     server: "Server"
+    packet_registry: GamePacketRegistry
+    "The registry packets of this connection are encoded and decoded with"
+    batcher: OutputBatcher | None = None
+    "Coalesces outgoing packets if batching is enabled"
+    capture: CaptureWriter | None = None
+    "Records the frames sent and received if capturing is enabled"
 
     def __init__(self, *args, **kwargs):
         self.packet_handlers = []
@@ -38,9 +50,23 @@ class BaseClientConnection(socketserver.StreamRequestHandler):
     def setup(self):
         super().setup()
         self.buffer = ConnectionReadBuffer(self)
+        self.packet_registry = self.server.packet_registry
+        self.server.connections.add(self)
+
+    def finish(self):
+        self.server.connections.discard(self)
+        if self.batcher is not None:
+            self.batcher.flush()
+        if self.capture is not None:
+            self.capture.close()
+        super().finish()
 
     def receive_packet(self) -> tuple[int, GamePacket]:
-        return self.server.packet_registry.deserialize_packet(self.buffer)
+        if self.capture is None:
+            return self.packet_registry.deserialize_packet(self.buffer)
+        payload = self.buffer.read(int.from_bytes(self.buffer.read(4), "big"))
+        self.capture.write_payload(Direction.SERVERBOUND, payload)
+        return self.packet_registry.deserialize_frame(payload)
 
     def handle(self):
         while True:
@@ -51,9 +77,58 @@ class BaseClientConnection(socketserver.StreamRequestHandler):
                 traceback.print_exception(e)
                 print("-----------------")
             else:
+                if (metrics := self.server.metrics) is not None:
+                    start = time.perf_counter_ns()
                 for packet_class, handler in self.packet_handlers:
                     if packet_class is None or isinstance(packet, packet_class):
                         handler(self, packet)
+                if metrics is not None:
+                    metrics.record(
+                        "dispatch",
+                        Direction.SERVERBOUND,
+                        packet.PACKET_NAME,
+                        0,
+                        time.perf_counter_ns() - start,
+                    )
 
     def send_packet(self, packet: GamePacket):
-        self.buffer.write(self.server.packet_registry.serialize_packet(packet))
+        self.send_frame(self.packet_registry.serialize_packet(packet), packet)
+
+    def send_frame(self, frame: bytes | bytearray, packet: GamePacket | None = None):
+        """Send an already serialized frame
+
+        :param packet: The packet the frame was serialized from, if batching
+            should be able to flush on it
+        """
+        if self.capture is not None:
+            self.capture.write_frame(Direction.CLIENTBOUND, frame)
+        if self.batcher is None:
+            self.buffer.write(frame)
+        else:
+            self.batcher.add(frame, packet)
+
+    def enable_batching(
+        self, max_bytes: int = 65536, max_delay: float | None = 0.005
+    ) -> OutputBatcher:
+        """Coalesce outgoing packets into fewer writes, see :class:`OutputBatcher`
+
+        :param max_bytes: Flush once this many bytes are buffered
+        :param max_delay: Flush once a packet waited this many seconds
+        """
+        self.batcher = OutputBatcher(
+            lambda frames: sendmsg_all(self.request, frames),
+            max_bytes,
+            max_delay,
+            (EndTickPacket,),
+        )
+        return self.batcher
+
+    def enable_capture(self, path: str | PathLike) -> CaptureWriter:
+        """Record all frames sent and received to a capture file
+
+        The file is completed when the connection is finished, read it with
+        :class:`cosmic_reach.capture.CaptureReader`.
+        """
+        self.capture = CaptureWriter(path)
+        self.capture.write_table(self.packet_registry)
+        return self.capture
@@ -1,14 +1,72 @@
 import socketserver
+import traceback
+from typing import Any, Iterable
 
-from ..protocol import get_packet_registry
+from ..common.metrics import Metrics
+from ..protocol import Direction, GamePacket, GamePacketRegistry, get_packet_registry
 from .base import BaseClientConnection
 
 
-class Server(socketserver.TCPServer):
+class BroadcastMixin:
+    connections: set[Any]
+
+    def broadcast(
+        self,
+        packet: GamePacket,
+        connections: Iterable[Any] | None = None,
+        exclude: Any | None = None,
+    ) -> int:
+        """Send a packet to many connections, serializing it only once per registry
+
+        A connection failing to send is reported and skipped, the others still
+        get the packet.
+
+        :param connections: The connections to send to, defaults to all of them
+        :param exclude: A connection not to send to, e.g. the packet's origin
+        :return: The number of connections the packet was sent to
+        """
+        frames: dict[GamePacketRegistry, bytes] = {}
+        sent = 0
+        for connection in list(
+            self.connections if connections is None else connections
+        ):
+            if connection is exclude:
+                continue
+            registry = connection.packet_registry
+            frame = frames.get(registry)
+            if frame is None:
+                frame = frames[registry] = registry.serialize_packet(packet)
+            try:
+                connection.send_frame(frame, packet)
+            except Exception as e:
+                print("----- ERROR -----")
+                traceback.print_exception(e)
+                print("-----------------")
+            else:
+                sent += 1
+        return sent
+
+
+class Server(BroadcastMixin, socketserver.TCPServer):
+    connections: set[BaseClientConnection]
+    metrics: Metrics | None
+    "Records packet counts, sizes and timings of all connections if enabled"
+
     def __init__(self, handler: BaseClientConnection):
         self.packet_registry = get_packet_registry()
+        self.connections = set()
+        self.metrics = None
         super().__init__(("localhost", 47137), handler, bind_and_activate=False)
 
+    def enable_metrics(self, metrics: Metrics | None = None) -> Metrics:
+        """Record the packets of all connections, see :class:`Metrics`
+
+        :param metrics: Where to record, e.g. to share it between servers
+        """
+        self.metrics = Metrics() if metrics is None else metrics
+        self.packet_registry.enable_metrics(self.metrics, Direction.CLIENTBOUND)
+        return self.metrics
+
     def serve(self, host: str = "localhost", port: int = 47137):
         self.server_address = (host, port)
         self.server_bind()
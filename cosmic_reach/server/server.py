@@ -1,8 +1,11 @@
 from ..protocol.packets.meta import ProtocolSyncPacket
+from .aio import AsyncBaseClientConnection
 from .base import BaseClientConnection
 
 
-class ClientConnection(BaseClientConnection):
+class ProtocolSyncMixin:
+    "Protocol sync shared by the threaded and the asyncio connection"
+
     VERSION = "0.4.1"
 
     def setup(self):
@@ -22,11 +25,20 @@ class ClientConnection(BaseClientConnection):
                     "[Protocol Sync] Packet with id 1 must be ProtocolSyncPacket"
                 )
 
-            if packet_name not in self.server.packet_registry._packet_ids:
+            if packet_name not in self.packet_registry._packet_ids:
                 raise ValueError(f"[Protocol Sync] Unknown packet: {packet_name}")
 
+    def _send_protocol_sync(self):
+        self.send_packet(ProtocolSyncPacket.create(self.packet_registry, self.VERSION))
+
+
+class ClientConnection(ProtocolSyncMixin, BaseClientConnection):
     def handle(self):
-        self.send_packet(
-            ProtocolSyncPacket.create(self.server.packet_registry, self.VERSION)
-        )
+        self._send_protocol_sync()
         super().handle()
+
+
+class AsyncClientConnection(ProtocolSyncMixin, AsyncBaseClientConnection):
+    async def handle(self):
+        self._send_protocol_sync()
+        await super().handle()
@@ -1,3 +1,3 @@
-from . import entities, java
+from . import chunks, entities, java
 
-__all__ = ["entities", "java"]
+__all__ = ["chunks", "entities", "java"]
@@ -0,0 +1,72 @@
+"""NumPy storage for the blocks of a chunk
+
+Blocks are kept as NumPy arrays of palette indices, so NumPy is only needed
+once chunks are actually built (``pip install cosmic-reach[numpy]``).
+
+The layout of the blobs in a :class:`ChunkColumnPacket` has not been checked
+against the game yet, so there is no decoder for them here, only the storage
+and the vectorized index (un)packing one would build on.
+"""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SIZE = 16
+"The edge length of a chunk in blocks"
+BLOCKS = SIZE**3
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("Chunks need numpy, install cosmic-reach[numpy]") from e
+    return numpy
+
+
+@dataclass(slots=True)
+class Chunk:
+    x: int
+    y: int
+    z: int
+    palette: list[str]
+    "The block state ids, interned so chunks share them"
+    blocks: "np.ndarray"
+    "Indices into the palette as ``uint16``, indexed ``[y, z, x]``"
+
+    def block_at(self, x: int, y: int, z: int) -> str:
+        "The block state id at a position inside the chunk"
+        return self.palette[self.blocks[y, z, x]]
+
+    def counts(self) -> dict[str, int]:
+        "How often every block state occurs in the chunk"
+        counts = _numpy().bincount(self.blocks.ravel(), minlength=len(self.palette))
+        return {
+            state: int(count) for state, count in zip(self.palette, counts) if count
+        }
+
+
+def unpack_indices(packed: bytes | memoryview, bits: int) -> "np.ndarray":
+    "Unpack :data:`BLOCKS` big endian, bit packed indices into a ``uint16`` array"
+    np = _numpy()
+    if bits == 8:
+        return np.frombuffer(packed, np.uint8, BLOCKS).astype(np.uint16)
+    if bits == 16:
+        return np.frombuffer(packed, ">u2", BLOCKS).astype(np.uint16)
+    bitstream = np.unpackbits(np.frombuffer(packed, np.uint8), count=BLOCKS * bits)
+    weights = (1 << np.arange(bits - 1, -1, -1)).astype(np.uint16)
+    return bitstream.reshape(BLOCKS, bits).astype(np.uint16) @ weights
+
+
+def pack_indices(indices: "np.ndarray", bits: int) -> bytes:
+    "The inverse of :func:`unpack_indices`"
+    np = _numpy()
+    indices = np.asarray(indices, np.uint16).ravel()
+    if bits == 16:
+        return indices.astype(">u2").tobytes()
+    shifts = np.arange(bits - 1, -1, -1, dtype=np.uint16)
+    bitstream = ((indices[:, None] >> shifts) & 1).astype(np.uint8)
+    return np.packbits(bitstream.ravel()).tobytes()
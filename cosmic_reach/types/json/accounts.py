@@ -1,3 +1,4 @@
+import asyncio
 import random
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING
@@ -80,7 +81,8 @@ class ItchAccount(Account):
     async def login_to(self, client: "Client"):
         @client.events.packet.only(packets.meta.ChallengeLoginPacket)
         async def on_challenge(packet: packets.meta.ChallengeLoginPacket):
-            resp = requests.post(
+            resp = await asyncio.to_thread(
+                requests.post,
                 self.ITCH_AUTH_ROOT_URL_STR + "/verify-itch",
                 json={
                     "itchApiKey": self._api_key,
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+from cosmic_reach.common.batching import OutputBatcher
+from cosmic_reach.protocol import packets
+
+
+def test_flush_on_tick_and_size():
+    written = []
+    batcher = OutputBatcher(
+        written.append,
+        max_bytes=8,
+        max_delay=None,
+        flush_on=(packets.general.EndTickPacket,),
+    )
+    assert not batcher.add(b"ab")
+    assert batcher.add(b"cd", packets.general.EndTickPacket(1))
+    assert not batcher.add(b"12345")
+    assert batcher.add(b"678")
+    assert written == [[b"ab", b"cd"], [b"12345", b"678"]]
+    assert batcher.flushes["tick"] == 1 and batcher.flushes["size"] == 1
+    assert batcher.pending() == 0
+
+
+def test_deadline_on_loop():
+    async def main():
+        written = asyncio.Queue()
+        batcher = OutputBatcher(written.put_nowait, max_delay=0.01)
+        batcher.add(b"a")
+        batcher.add(b"b")
+        return await asyncio.wait_for(written.get(), 5), batcher
+
+    frames, batcher = asyncio.run(main())
+    assert frames == [b"a", b"b"]
+    assert batcher.flushes["deadline"] == 1
+
+
+def test_deadline_without_loop():
+    written = []
+    flushed = threading.Event()
+    batcher = OutputBatcher(
+        lambda frames: (written.append(frames), flushed.set()), max_delay=0.01
+    )
+    batcher.add(b"a")
+    assert flushed.wait(5)
+    assert written == [[b"a"]]
+
+
+def test_writes_stay_on_the_bound_loop():
+    async def main():
+        loop_thread = threading.get_ident()
+        written = asyncio.Queue()
+
+        def write(frames):
+            written.put_nowait((threading.get_ident(), frames))
+
+        batcher = OutputBatcher(write, max_delay=0.01)
+        batcher.add(b"on loop")
+        first = await asyncio.wait_for(written.get(), 5)
+        # the deadline is kept by a timer thread when added from elsewhere
+        await asyncio.to_thread(batcher.add, b"timer")
+        second = await asyncio.wait_for(written.get(), 5)
+        await asyncio.to_thread(batcher.add, b"manual")
+        await asyncio.to_thread(batcher.flush)
+        third = await asyncio.wait_for(written.get(), 5)
+        return loop_thread, [first, second, third]
+
+    loop_thread, writes = asyncio.run(main())
+    assert writes == [
+        (loop_thread, [b"on loop"]),
+        (loop_thread, [b"timer"]),
+        (loop_thread, [b"manual"]),
+    ]
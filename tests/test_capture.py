@@ -0,0 +1,240 @@
+import asyncio
+import types
+
+import pytest
+
+from cosmic_reach.capture import CaptureReader, CaptureWriter, writer
+from cosmic_reach.client import BaseClient
+from cosmic_reach.protocol import (
+    Direction,
+    GamePacketRegistry,
+    PacketDecoder,
+    get_packet_registry,
+    packets,
+)
+from cosmic_reach.server.aio import AsyncBaseClientConnection, AsyncServer
+
+SERVERBOUND = Direction.SERVERBOUND
+CLIENTBOUND = Direction.CLIENTBOUND
+MESSAGE = packets.general.MessagePacket.PACKET_NAME
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    "Makes the writer record the time the test sets"
+    now = [0.0]
+    fake = types.SimpleNamespace(perf_counter=lambda: now[0], time=lambda: 1e9)
+    monkeypatch.setattr(writer, "time", fake)
+    return now
+
+
+def message(idx: int) -> packets.general.MessagePacket:
+    return packets.general.MessagePacket(f"m{idx}", "player")
+
+
+def record(path, clock, registry=None, close=True) -> CaptureWriter:
+    "Record a message every 0.1s, alternating with end ticks sent back"
+    registry = registry or get_packet_registry()
+    capture = CaptureWriter(path)
+    capture.write_table(registry)
+    for idx in range(10):
+        clock[0] = idx / 10
+        capture.write_frame(SERVERBOUND, registry.serialize_packet(message(idx)))
+        capture.write_frame(
+            CLIENTBOUND,
+            registry.serialize_packet(packets.general.EndTickPacket(idx)),
+        )
+    if close:
+        capture.close()
+    else:
+        capture.flush()
+    return capture
+
+
+def shifted(registry: GamePacketRegistry, by: int) -> GamePacketRegistry:
+    other = GamePacketRegistry()
+    for packet_id, packet in registry._packets.items():
+        other.register(packet, packet_id + by)
+    return other
+
+
+def test_read(tmp_path, clock):
+    path = tmp_path / "session.crcap"
+    record(path, clock)
+    with CaptureReader(path) as capture:
+        assert capture.complete
+        assert capture.start_time == 1e9
+        assert len(capture) == 20
+        assert capture.duration == pytest.approx(0.9)
+        first, last = capture[0], capture[-1]
+        assert (first.index, first.direction, first.packet_name) == (
+            0,
+            SERVERBOUND,
+            MESSAGE,
+        )
+        assert last.index == 19 and last.direction is CLIENTBOUND
+        assert capture.decode(first) == message(0)
+        assert capture.decode(19).world_tick == 9
+        assert first.frame() == get_packet_registry().serialize_packet(message(0))
+        with pytest.raises(IndexError):
+            capture[20]
+        del first, last
+
+
+def test_unclosed_and_truncated(tmp_path, clock):
+    path = tmp_path / "session.crcap"
+    capture = record(path, clock, close=False)
+    with CaptureReader(path) as reader:
+        assert not reader.complete
+        assert len(reader) == 20
+        assert reader.decode(5).world_tick == 2
+
+    data = path.read_bytes()
+    capture.close()
+    cut = tmp_path / "cut.crcap"
+    cut.write_bytes(data[:-3])
+    with CaptureReader(cut) as reader:
+        assert not reader.complete
+        assert len(reader) == 19
+        assert reader.decode(18) == message(9)
+
+
+def test_not_a_capture(tmp_path):
+    path = tmp_path / "empty.crcap"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        CaptureReader(path)
+    path.write_bytes(b"NOTACAPTUREFILE!")
+    with pytest.raises(ValueError):
+        CaptureReader(path)
+
+
+def test_lookup(tmp_path, clock):
+    path = tmp_path / "session.crcap"
+    record(path, clock)
+    with CaptureReader(path) as capture:
+        assert capture.seek_time(0.5) == 10
+        assert capture.seek_time(0.45) == 10
+        assert capture.seek_time(10) == 20
+        messages = capture.indices_of(packets.general.MessagePacket)
+        assert messages == list(range(0, 20, 2))
+        assert capture.indices_of(MESSAGE) == messages
+        assert capture.indices_of(packets.general.CommandPacket) == []
+
+
+def test_select(tmp_path, clock):
+    path = tmp_path / "session.crcap"
+    record(path, clock)
+    with CaptureReader(path) as capture:
+        frames = list(capture.select(0.2, 0.5))
+        assert [frame.index for frame in frames] == list(range(4, 10))
+        frames = list(capture.select(start=0.5, direction=CLIENTBOUND))
+        assert [frame.index for frame in frames] == list(range(11, 20, 2))
+        frames = list(
+            capture.select(
+                end=0.3,
+                types=[packets.general.EndTickPacket, MESSAGE],
+            )
+        )
+        assert [frame.index for frame in frames] == list(range(6))
+        decoded = [
+            packet.message
+            for _, packet in capture.packets(
+                types=[packets.general.MessagePacket], direction=SERVERBOUND
+            )
+        ]
+        assert decoded == [f"m{idx}" for idx in range(10)]
+        del frames
+
+
+def test_table_switch(tmp_path, clock):
+    registry = get_packet_registry()
+    other = shifted(registry, 100)
+    path = tmp_path / "session.crcap"
+    with CaptureWriter(path) as capture:
+        capture.write_table(registry)
+        capture.write_frame(SERVERBOUND, registry.serialize_packet(message(0)))
+        capture.write_table(other, SERVERBOUND)
+        capture.write_frame(SERVERBOUND, other.serialize_packet(message(1)))
+        capture.write_frame(CLIENTBOUND, registry.serialize_packet(message(2)))
+
+    with CaptureReader(path) as reader:
+        assert len(reader) == 3
+        assert reader[1].packet_id == registry.get_id_by_packet(message(1)) + 100
+        assert [frame.packet_name for frame in reader] == [MESSAGE] * 3
+        assert [reader.decode(idx).message for idx in range(3)] == [
+            "m0",
+            "m1",
+            "m2",
+        ]
+        assert reader.indices_of(MESSAGE) == [0, 1, 2]
+
+
+def test_replay(tmp_path, clock):
+    path = tmp_path / "session.crcap"
+    record(path, clock)
+    sent = []
+
+    async def send(frame: bytes) -> None:
+        sent.append(frame)
+
+    async def main():
+        with CaptureReader(path) as capture:
+            fast = await capture.replay(sent.append, None, direction=SERVERBOUND)
+            paced = await capture.replay(send, 10.0, start=0.5)
+        return fast, paced
+
+    assert asyncio.run(main()) == (10, 10)
+    decoder = PacketDecoder(get_packet_registry())
+    decoder.feed(b"".join(sent))
+    decoded = list(decoder)
+    assert decoded[:10] == [message(idx) for idx in range(10)]
+    assert [
+        packet.world_tick
+        for packet in decoded[10:]
+        if isinstance(packet, packets.general.EndTickPacket)
+    ] == [5, 6, 7, 8, 9]
+
+
+class EchoConnection(AsyncBaseClientConnection):
+    def setup(self):
+        self.on_packet(
+            packets.general.MessagePacket,
+            lambda connection, packet: connection.send_packet(
+                packets.general.MessagePacket("echo " + packet.message, "")
+            ),
+        )
+
+
+def test_client_capture(tmp_path):
+    path = tmp_path / "client.crcap"
+
+    async def main():
+        server = AsyncServer(EchoConnection)
+        task = asyncio.create_task(server.serve("127.0.0.1", 0))
+        while server._server is None:
+            await asyncio.sleep(0.01)
+        port = server._server.sockets[0].getsockname()[1]
+        client = BaseClient()
+        await client.connect("127.0.0.1", port)
+        client.enable_capture(path)
+        for idx in range(3):
+            await client.send_packet(message(idx))
+            await asyncio.wait_for(client.receive_packet(), 5)
+        await client.close()
+        await server.close()
+        await task
+
+    asyncio.run(main())
+    with CaptureReader(path) as capture:
+        assert capture.complete
+        assert [
+            (frame.direction, packet.message) for frame, packet in capture.packets()
+        ] == [
+            (direction, text)
+            for idx in range(3)
+            for direction, text in (
+                (SERVERBOUND, f"m{idx}"),
+                (CLIENTBOUND, f"echo m{idx}"),
+            )
+        ]
@@ -0,0 +1,45 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from cosmic_reach.types.bin.chunks import (  # noqa: E402
+    BLOCKS,
+    SIZE,
+    Chunk,
+    pack_indices,
+    unpack_indices,
+)
+
+
+def test_indices_are_packed_most_significant_bit_first():
+    indices = np.zeros(BLOCKS, np.uint16)
+    indices[:4] = [1, 0, 3, 2]
+    packed = pack_indices(indices, 2)
+    assert packed[:1] == bytes([0b01001110])
+    assert len(packed) == BLOCKS * 2 // 8
+
+
+@pytest.mark.parametrize("bits", [1, 3, 5, 8, 16])
+def test_indices_roundtrip(bits):
+    rng = np.random.default_rng(bits)
+    indices = rng.integers(0, 1 << bits, BLOCKS, dtype=np.uint16)
+    assert (unpack_indices(pack_indices(indices, bits), bits) == indices).all()
+
+
+def test_chunk():
+    blocks = np.zeros((SIZE, SIZE, SIZE), np.uint16)
+    blocks[0] = 1
+    blocks[1, 2, 3] = 2
+    chunk = Chunk(1, 2, 3, ["base:air", "base:stone", "base:dirt"], blocks)
+    assert chunk.block_at(3, 1, 2) == "base:dirt"
+    assert chunk.block_at(0, 0, 0) == "base:stone"
+    assert chunk.counts() == {
+        "base:air": BLOCKS - SIZE * SIZE - 1,
+        "base:stone": SIZE * SIZE,
+        "base:dirt": 1,
+    }
+
+
+def test_counts_skip_unused_states():
+    chunk = Chunk(0, 0, 0, ["a", "b"], np.zeros((SIZE, SIZE, SIZE), np.uint16))
+    assert chunk.counts() == {"a": BLOCKS}
@@ -0,0 +1,281 @@
+import gc
+import io
+import struct
+
+import pytest
+
+from cosmic_reach.io.buffer import BufferReader
+from cosmic_reach.io.codegen import compile_codec
+from cosmic_reach.protocol import get_packet_registry
+from cosmic_reach.protocol import packets as P
+from cosmic_reach.protocol.enums import SetMusicTagsType, SlotInteractionType
+from cosmic_reach.types.bin.entities import UniqueID
+from cosmic_reach.types.bin.java import Vec3
+from cosmic_reach.types.json import entities as JE
+from cosmic_reach.types.json import java as JJ
+from cosmic_reach.types.json.accounts import OfflineAccount
+
+uid = UniqueID(123456789012, -5, 7)
+vec = Vec3(1, -2, 3)
+account = OfflineAccount("offline:bob", "offline_id:1", "bob")
+player = JE.Player(
+    JE.PlayerGamemode.CREATIVE,
+    "base:earth",
+    False,
+    JE.Entity(
+        JE.UniqueID(1, 2, 3),
+        JJ.Vec3(1.5, 2.0, 3.0),
+        JJ.Vec3(0.0, 0.0, 0.0),
+        JJ.Vec3(0.0, 0.0, 0.0),
+        {"a": 1},
+    ),
+    JE.SlotContainer("x", 3),
+)
+
+SAMPLES = [
+    P.meta.ProtocolSyncPacket([["a", 1], ["b", 2]], "0.4.4"),
+    P.meta.TransactionPacket(99),
+    P.meta.LoginPacket(account),
+    P.meta.RemovedPlayerPacket("acc"),
+    P.meta.SetNetworkSetting("key", 5),
+    P.general.EndTickPacket(123456789),
+    P.meta.WorldRecievedGamePacket(),
+    P.meta.ChallengeLoginPacket("ch"),
+    P.meta.ItchSessionTokenPacket("tok"),
+    P.entities.PlayerSkinPacket("pid", b"\x89PNG" * 100),
+    P.entities.PlayerPacket("offline", account, player, True),
+    P.general.MessagePacket("hello ünïcode", "pid"),
+    P.entities.PlayerPositionPacket(
+        "pid", vec, Vec3(4, 5, 6), Vec3(7, 8, 9), 3, "zone"
+    ),
+    P.entities.EntityPositionPacket(uid, vec, vec, vec),
+    P.entities.NoClipPacket(True),
+    P.general.ZonePacket(True, {"zoneId": "base:earth", "n": 5}),
+    P.general.ChunkColumnPacket("zone", [b"abc", b"", b"x" * 1000], 1, 2, 3),
+    P.general.CommandPacket(["tp", "1", "2"]),
+    P.meta.DisconnectPacket("bye"),
+    P.blocks.PlaceBlockPacket(vec, "base:stone", 2),
+    P.blocks.BreakBlockPacket("z", vec, "base:air"),
+    P.blocks.InteractBlockPacket("b", 3, 1, vec),
+    P.blocks.BlockReplacePacket("z", "s", vec),
+    P.sounds.PlaySound2DPacket("s", 0.5, 1.0, -0.25),
+    P.sounds.PlaySound3DPacket("s", vec, 0.5, 1.5),
+    P.items.DropItemPacket(1, 2, 3),
+    P.items.SlotInteractPacket(SlotInteractionType.CURSOR_RIGHT, 1, 2),
+    P.items.ContainerSyncPacket(4),
+    P.blockentities.BlockEntityScreenPacket("id", 1, 2, 3, 4),
+    P.blockentities.BlockEntityDataPacket(1, 2, 3),
+    P.blockentities.SignsEntityPacket(1, 2, 3, ["a", "b"], 12.0, -1),
+    P.items.RequestGiveItemPacket(1, 2),
+    P.items.SlotSyncPacket(1),
+    P.items.SlotMergePacket(1, 2, 3),
+    P.items.SlotSwapPacket(1, 2, 3, 4),
+    P.entities.SpawnEntityPacket("e"),
+    P.entities.DespawnEntityPacket(uid),
+    P.entities.AttackEntityPacket(uid),
+    P.entities.InteractEntityPacket(uid, -3),
+    P.entities.HitEntityPacket(uid, 2.5),
+    P.entities.MaxHPEntityPacket(uid, 20.0),
+    P.entities.RespawnPacket(),
+    P.general.ParticleSystemPacket("p"),
+    P.sounds.SetMusicTagsPacket(["a"], SetMusicTagsType.SET),
+    P.sounds.ForceSongChangePacket(),
+]
+
+REGISTRIES = {
+    "generic": {"codegen": False},
+    "codegen": {"codegen": True},
+    "zero_copy": {"zero_copy": True},
+    "codegen-zero_copy": {"codegen": True, "zero_copy": True},
+    "lazy_json": {"lazy_json": True},
+    "lazy": {"lazy": True},
+    "codegen-lazy": {"codegen": True, "lazy": True},
+}
+
+
+def sample_id(packet):
+    return type(packet).__name__
+
+
+def test_every_packet_has_a_sample():
+    sampled = {type(packet) for packet in SAMPLES}
+    missing = [
+        packet.__name__
+        for packet in get_packet_registry()._packets.values()
+        if packet not in sampled
+    ]
+    assert missing == []
+
+
+def test_every_packet_compiles():
+    registry = get_packet_registry(codegen=True)
+    assert set(registry._compiled) == set(registry._packets.values())
+
+
+@pytest.mark.parametrize("packet", SAMPLES, ids=sample_id)
+def test_generated_encoder_matches_generic(packet):
+    generic = get_packet_registry(codegen=False).serialize_packet(packet)
+    generated = get_packet_registry(codegen=True).serialize_packet(packet)
+    assert generated == generic
+
+
+@pytest.mark.parametrize("options", REGISTRIES.values(), ids=REGISTRIES.keys())
+@pytest.mark.parametrize("packet", SAMPLES, ids=sample_id)
+def test_roundtrip(packet, options):
+    reference = get_packet_registry(codegen=False).serialize_packet(packet)
+    registry = get_packet_registry(**options)
+    decoded = registry.deserialize_packet(io.BytesIO(reference))
+    assert type(decoded) is type(packet)
+    assert decoded == packet
+    assert registry.serialize_packet(decoded) == reference
+
+
+def test_json_dataclass_fields_are_encoded_as_json():
+    packet = P.entities.PlayerPacket("offline", account, player, True)
+    decoded = get_packet_registry().deserialize_packet(
+        io.BytesIO(get_packet_registry().serialize_packet(packet))
+    )
+    assert decoded.player.gamemode is JE.PlayerGamemode.CREATIVE
+    assert decoded.player.entity.position == JJ.Vec3(1.5, 2.0, 3.0)
+
+
+def test_generated_encoder_errors_propagate():
+    codec = compile_codec(P.general.MessagePacket)
+    out = bytearray(b"head")
+    with pytest.raises(AttributeError) as info:
+        codec.write(P.general.MessagePacket(42, "pid"), out)
+    assert any("While serializing" in note for note in info.value.__notes__)
+    assert out == b"head"
+
+
+@pytest.mark.parametrize("codegen", [False, True], ids=["generic", "codegen"])
+def test_serialize_packet_returns_bytes(codegen):
+    registry = get_packet_registry(codegen=codegen)
+    frame = registry.serialize_packet(P.general.MessagePacket("hi", "pid"))
+    assert type(frame) is bytes
+    assert int.from_bytes(frame[:4], "big") == len(frame) - 4
+
+
+@pytest.mark.parametrize("codegen", [False, True], ids=["generic", "codegen"])
+def test_generated_decoder_errors_propagate(codegen):
+    frame = get_packet_registry().serialize_packet(P.general.MessagePacket("a", "bcd"))
+    with pytest.raises(struct.error) as info:
+        # cut off within the length of the second string
+        get_packet_registry(codegen=codegen).deserialize_cr_packet(
+            io.BytesIO(frame[4:-5])
+        )
+    assert any("While deserializing" in note for note in info.value.__notes__)
+
+
+@pytest.mark.parametrize("codegen", [False, True], ids=["generic", "codegen"])
+@pytest.mark.parametrize(
+    "body, error",
+    [
+        # the second string claims more bytes than are left
+        (b"\x00\x00\x00\x01a\x00\x00\x00\x09bcd", EOFError),
+        (b"\x00\x00\x00\x01a\xff\xff\xff\xfe", ValueError),
+    ],
+    ids=["truncated", "negative"],
+)
+def test_bad_string_lengths(codegen, body, error):
+    registry = get_packet_registry(codegen=codegen)
+    packet_id = registry.get_id_by_packet(P.general.MessagePacket)
+    with pytest.raises(error):
+        registry.deserialize_cr_packet(io.BytesIO(packet_id.to_bytes(2, "big") + body))
+
+
+@pytest.mark.parametrize("codegen", [False, True], ids=["generic", "codegen"])
+def test_bad_bytes_length(codegen):
+    registry = get_packet_registry(codegen=codegen)
+    frame = registry.serialize_packet(P.entities.PlayerSkinPacket("pid", b"png"))
+    with pytest.raises(EOFError):
+        registry.deserialize_cr_packet(io.BytesIO(frame[4:-1]))
+
+
+@pytest.mark.parametrize("codegen", [False, True], ids=["generic", "codegen"])
+def test_zero_copy_views_outlive_the_buffer(codegen):
+    packet = P.general.ChunkColumnPacket("zone", [b"abc", b"x" * 100], 1, 2, 3)
+    registry = get_packet_registry(codegen=codegen, zero_copy=True)
+    data = bytearray(registry.serialize_packet(packet))
+    decoded = registry.deserialize_packet(BufferReader(data))
+    skin = registry.deserialize_packet(
+        BufferReader(
+            registry.serialize_packet(P.entities.PlayerSkinPacket("p", b"png"))
+        )
+    )
+    assert all(isinstance(col, memoryview) for col in decoded.chunk_cols)
+    assert isinstance(skin.texture_bytes, memoryview)
+
+    # the views pin the receive buffer, it can't be resized under them
+    with pytest.raises(BufferError):
+        data.clear()
+    del data
+    gc.collect()
+    assert [col.tobytes() for col in decoded.chunk_cols] == [b"abc", b"x" * 100]
+    assert skin.texture_bytes == b"png"
+
+
+@pytest.mark.parametrize("codegen", [False, True], ids=["generic", "codegen"])
+def test_copying_reads_do_not_pin_the_buffer(codegen):
+    packet = P.entities.PlayerSkinPacket("p", b"png")
+    registry = get_packet_registry(codegen=codegen)
+    data = bytearray(registry.serialize_packet(packet))
+    decoded = registry.deserialize_packet(BufferReader(data))
+    data[-3:] = b"xxx"
+    data.clear()
+    assert decoded.texture_bytes == b"png"
+    assert type(decoded.texture_bytes) is bytes
+
+
+@pytest.mark.parametrize("codegen", [False, True], ids=["generic", "codegen"])
+def test_lazy_decode_on_first_access(codegen, monkeypatch):
+    registry = get_packet_registry(codegen=codegen, lazy=True)
+    frame = registry.serialize_packet(P.general.MessagePacket("hi", "pid"))
+    decodes = []
+    decode_body = registry._decode_body
+    monkeypatch.setattr(
+        registry,
+        "_decode_body",
+        lambda *args: decodes.append(args) or decode_body(*args),
+    )
+
+    packet = registry.deserialize_frame(frame[4:])
+    assert type(packet) is P.general.MessagePacket
+    assert packet.lazy_body() == frame[6:]
+    assert decodes == []
+
+    assert packet.message == "hi"
+    assert packet.player_unique_id == "pid"
+    assert len(decodes) == 1
+    assert packet.lazy_body() is None
+    with pytest.raises(AttributeError):
+        packet.missing
+
+
+def test_lazy_untouched_body_is_resent_as_is(monkeypatch):
+    lazy = get_packet_registry(lazy=True)
+    remapped = type(lazy)()
+    for packet_id, packet_class in lazy._packets.items():
+        remapped.register(packet_class, packet_id + 100)
+    frame = lazy.serialize_packet(P.general.ChunkColumnPacket("z", [b"abc"], 1, 2, 3))
+    packet = lazy.deserialize_frame(frame[4:])
+
+    def fail(*args):
+        raise AssertionError("the body was encoded again")
+
+    monkeypatch.setattr(P.general.ChunkColumnPacket, "write", fail, raising=False)
+    monkeypatch.setattr("cosmic_reach.protocol.generic.serialize_into", fail)
+    assert lazy.serialize_packet(packet) == frame
+    # forwarded under another id, the body stays the same
+    resent = remapped.serialize_packet(packet)
+    assert resent[6:] == frame[6:] and resent[4:6] != frame[4:6]
+
+
+def test_lazy_modified_packet_is_encoded_again():
+    registry = get_packet_registry(lazy=True)
+    frame = registry.serialize_packet(P.general.MessagePacket("hi", "pid"))
+    packet = registry.deserialize_frame(frame[4:])
+    packet.message = "changed"
+    assert registry.serialize_packet(packet) == registry.serialize_packet(
+        P.general.MessagePacket("changed", "pid")
+    )
@@ -0,0 +1,143 @@
+import copy
+import io
+import pickle
+
+import pytest
+
+from cosmic_reach.io.types import Complex
+from cosmic_reach.protocol import GamePacketRegistry, packets
+from cosmic_reach.types.bin.entities import UniqueID
+from cosmic_reach.types.bin.java import Vec3
+
+
+class Point(Complex):
+    x: int
+    y: int
+
+
+class Point3(Point):
+    z: int
+
+
+class Defaulted(Complex):
+    x: int
+    flags: int = 0
+
+
+class Named(Complex):
+    name: str
+
+    def __init__(self, name: str = "unnamed"):
+        self.name = name.lower()
+
+
+class SubNamed(Named):
+    tag: str
+
+
+class Keyed(Complex):
+    key: int
+
+    def __eq__(self, other):
+        return isinstance(other, Keyed) and other.key == self.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+
+class SubKeyed(Keyed):
+    extra: int
+
+
+def test_slots():
+    assert Point.__slots__ == ("x", "y")
+    assert Point3.__slots__ == ("z",)
+    point = Point(1, 2)
+    point.w = 3
+    assert point.w == 3
+    assert vars(point) == {"w": 3}
+
+
+def test_defaults():
+    assert Defaulted.__slots__ == ("x",)
+    assert Defaulted(1).flags == 0
+    assert Defaulted(1, 2).flags == 2
+    assert Defaulted(1) == Defaulted(1, 0)
+    assert Defaulted(1) != Defaulted(1, 2)
+    assert repr(Defaulted(1)) == "Defaulted(x=1, flags=0)"
+
+
+def test_init():
+    assert Point3(1, 2, 3) == Point3(1, 2, 3)
+    assert Point3(1, 2, 3) != Point3(1, 2, 4)
+    partial = Point(y=2)
+    assert not hasattr(partial, "x")
+    assert partial.y == 2
+    assert set(Point3._fields) == {"x", "y", "z"}
+
+
+def test_eq_and_repr():
+    assert Point(1, 2) == Point(1, 2)
+    assert Point(1, 2) != Point(2, 1)
+    assert Point(1, 2) != Point3(1, 2, 0)
+    assert repr(Point(1, 2)) == "Point(x=1, y=2)"
+    assert repr(Point(y=2)) == "Point(y=2)"
+    assert Point(y=2) == Point(y=2)
+
+
+def test_generated_hash():
+    assert hash(Point(1, 2)) == hash(Point(1, 2))
+    assert len({Point(1, 2), Point(1, 2), Point(2, 1), Point3(1, 2, 3)}) == 3
+    assert hash(Point(y=2)) == hash(Point(y=2))
+
+
+def test_values_as_keys():
+    seen = {UniqueID(1, 2, 3): "a", Vec3(1, 2, 3): "b"}
+    assert seen[UniqueID(1, 2, 3)] == "a"
+    assert seen[Vec3(1, 2, 3)] == "b"
+    assert UniqueID(1, 2, 4) not in seen
+    assert {Vec3(0, 0, 0), Vec3(0, 0, 0), Vec3(0, 0, 1)} == {
+        Vec3(0, 0, 0),
+        Vec3(0, 0, 1),
+    }
+
+
+def test_custom_init_is_kept():
+    assert Named("ABC").name == "abc"
+    assert Named().name == "unnamed"
+    assert SubNamed("ABC").name == "abc"
+    assert SubNamed("ABC") == SubNamed(name="abc")
+
+
+def test_custom_eq_and_hash_are_kept():
+    assert Keyed(1) == SubKeyed(key=1, extra=2)
+    assert hash(Keyed(1)) == hash(SubKeyed(key=1, extra=5))
+    assert len({Keyed(1), Keyed(1), SubKeyed(key=2, extra=0)}) == 2
+
+
+def test_copy_and_pickle():
+    packet = packets.general.MessagePacket("hi", "player")
+    assert copy.copy(packet) == packet
+    assert copy.deepcopy(packet) == packet
+    assert pickle.loads(pickle.dumps(packet)) == packet
+
+
+def test_lazy_packet_copy_stays_lazy():
+    registry = GamePacketRegistry(lazy=True)
+    registry.register(packets.general.MessagePacket)
+    packet = packets.general.MessagePacket("hi", "player")
+    decoded = registry.deserialize_packet(io.BytesIO(registry.serialize_packet(packet)))
+    clone = copy.copy(decoded)
+    assert clone.lazy_body() is not None
+    assert clone == packet
+
+
+def test_lazy_packet_fields_set_before_decoding_win():
+    registry = GamePacketRegistry(lazy=True)
+    registry.register(packets.general.MessagePacket)
+    packet = packets.general.MessagePacket("hi", "player")
+    decoded = registry.deserialize_packet(io.BytesIO(registry.serialize_packet(packet)))
+    decoded.message = "changed"
+    assert decoded.lazy_body() is None
+    assert decoded.player_unique_id == "player"
+    assert decoded == packets.general.MessagePacket("changed", "player")
@@ -0,0 +1,83 @@
+import pytest
+
+from cosmic_reach.protocol import PacketDecoder, get_packet_registry
+from cosmic_reach.protocol import packets as P
+
+PACKETS = [
+    P.general.MessagePacket("hello", "pid"),
+    P.general.EndTickPacket(42),
+    P.entities.PlayerSkinPacket("pid", b"\x89PNG" * 64),
+]
+
+
+def frames(registry, packets) -> list[bytes]:
+    "Packets don't compare equal, so compare their encodings"
+    return [registry.serialize_packet(packet) for packet in packets]
+
+
+def stream(registry) -> bytes:
+    return b"".join(frames(registry, PACKETS))
+
+
+@pytest.mark.parametrize("chunk", [1, 3, 7, 64, 100000])
+def test_frames_split_across_chunks(chunk):
+    registry = get_packet_registry()
+    data = stream(registry)
+    decoder = PacketDecoder(registry)
+    decoded = []
+    for pos in range(0, len(data), chunk):
+        decoder.feed(data[pos : pos + chunk])
+        decoded.extend(decoder)
+    assert frames(registry, decoded) == frames(registry, PACKETS)
+    assert decoded == PACKETS
+    assert decoder.pending() == 0
+
+
+def test_incomplete_frame_waits():
+    registry = get_packet_registry()
+    frame = registry.serialize_packet(PACKETS[0])
+    decoder = PacketDecoder(registry)
+    decoder.feed(frame[:2])
+    assert decoder.next_packet() is None
+    decoder.feed(frame[2:-1])
+    assert decoder.next_packet() is None
+    assert decoder.pending() == len(frame) - 1
+    decoder.feed(frame[-1:])
+    assert registry.serialize_packet(decoder.next_packet()) == frame
+    assert decoder.next_packet() is None
+
+
+def test_bad_frame_is_dropped():
+    registry = get_packet_registry()
+    decoder = PacketDecoder(registry)
+    # a frame with an unknown packet id
+    decoder.feed(b"\x00\x00\x00\x02\xff\xff")
+    decoder.feed(registry.serialize_packet(PACKETS[1]))
+    with pytest.raises(KeyError):
+        decoder.next_packet()
+    assert decoder.next_packet().world_tick == 42
+
+
+def test_zero_copy_views_outlive_the_buffer():
+    registry = get_packet_registry(zero_copy=True)
+    decoder = PacketDecoder(registry)
+    decoder.feed(registry.serialize_packet(PACKETS[2]))
+    skin = decoder.next_packet()
+    assert isinstance(skin.texture_bytes, memoryview)
+    # feeding more must not invalidate or change the view
+    decoder.feed(registry.serialize_packet(PACKETS[2]))
+    decoder.feed(bytes(100000))
+    assert skin.texture_bytes == PACKETS[2].texture_bytes
+
+
+def test_registry_can_be_replaced():
+    registry = get_packet_registry()
+    remapped = type(registry)()
+    for packet_id, packet in registry._packets.items():
+        remapped.register(packet, packet_id + 100)
+    decoder = PacketDecoder(registry)
+    decoder.feed(registry.serialize_packet(PACKETS[0]))
+    decoder.feed(remapped.serialize_packet(PACKETS[1]))
+    assert decoder.next_packet().message == "hello"
+    decoder.registry = remapped
+    assert decoder.next_packet().world_tick == 42
@@ -0,0 +1,164 @@
+import asyncio
+import math
+import random
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from cosmic_reach.client import Client  # noqa: E402
+from cosmic_reach.client.entities import EntityTracker, entity_key  # noqa: E402
+from cosmic_reach.protocol import packets  # noqa: E402
+from cosmic_reach.types.bin.entities import UniqueID  # noqa: E402
+from cosmic_reach.types.bin.java import Vec3  # noqa: E402
+
+
+def brute_within(points: dict, point, radius: float) -> set:
+    return {key for key, pos in points.items() if math.dist(pos, point) <= radius}
+
+
+def scattered(tracker: EntityTracker, count: int, spread: float = 200.0) -> dict:
+    rng = random.Random(count)
+    points = {}
+    for idx in range(count):
+        pos = tuple(rng.uniform(-spread, spread) for _ in range(3))
+        tracker.update(idx, pos, player=idx % 3 == 0)
+        points[idx] = pos
+    return points
+
+
+def test_within():
+    tracker = EntityTracker(cell_size=8.0)
+    points = scattered(tracker, 300)
+    rng = random.Random(0)
+    for _ in range(50):
+        point = tuple(rng.uniform(-200, 200) for _ in range(3))
+        radius = rng.uniform(0, 60)
+        assert set(tracker.within(point, radius)) == brute_within(points, point, radius)
+    players = {key: pos for key, pos in points.items() if key % 3 == 0}
+    assert set(tracker.within((0, 0, 0), 100, players_only=True)) == brute_within(
+        players, (0, 0, 0), 100
+    )
+
+
+def test_within_large_radius():
+    # more cells in range than in use, so the occupied cells are scanned instead
+    tracker = EntityTracker(cell_size=1.0)
+    points = scattered(tracker, 20, spread=10)
+    assert set(tracker.within((0, 0, 0), 1000)) == set(points)
+
+
+def test_nearest_player():
+    tracker = EntityTracker(cell_size=8.0)
+    points = scattered(tracker, 300)
+    players = {key: pos for key, pos in points.items() if key % 3 == 0}
+    rng = random.Random(1)
+    for _ in range(50):
+        point = tuple(rng.uniform(-250, 250) for _ in range(3))
+        key, distance = tracker.nearest_player(point)
+        expected = min(players, key=lambda key: math.dist(players[key], point))
+        assert key == expected
+        assert distance == pytest.approx(math.dist(players[expected], point))
+
+
+def test_nearest_player_options():
+    tracker = EntityTracker()
+    assert tracker.nearest_player((0, 0, 0)) is None
+    tracker.update("entity", (1, 0, 0))
+    assert tracker.nearest_player((0, 0, 0)) is None
+    tracker.update("me", (0, 0, 0), player=True)
+    tracker.update("other", (30, 0, 0), player=True)
+    assert tracker.nearest_player((0, 0, 0))[0] == "me"
+    assert tracker.nearest_player((0, 0, 0), exclude="me") == ("other", 30)
+    assert tracker.nearest_player((0, 0, 0), max_distance=10, exclude="me") is None
+
+
+def test_moving_updates_the_grid():
+    tracker = EntityTracker(cell_size=8.0)
+    tracker.update("a", (0, 0, 0))
+    tracker.update("a", (100, 0, 0))
+    assert tracker.within((0, 0, 0), 10) == []
+    assert tracker.within((100, 0, 0), 10) == ["a"]
+    assert len(tracker._grid) == 1
+
+
+def test_grid_grows():
+    tracker = EntityTracker(capacity=2)
+    points = scattered(tracker, 10)
+    assert len(tracker) == 10
+    assert len(tracker.positions) >= 10
+    for key, pos in points.items():
+        assert tuple(tracker.position(key)) == pytest.approx(pos)
+    assert set(tracker.within((0, 0, 0), 1000)) == set(points)
+
+
+def test_remove():
+    tracker = EntityTracker(capacity=2)
+    tracker.update("a", (0, 0, 0), player=True)
+    tracker.update("b", (1, 0, 0))
+    assert tracker.remove("a")
+    assert not tracker.remove("a")
+    assert "a" not in tracker
+    assert tracker.position("a") is None
+    assert tracker.within((0, 0, 0), 5) == ["b"]
+    assert tracker.nearest_player((0, 0, 0)) is None
+    # the freed slot is reused instead of growing
+    tracker.update("c", (2, 0, 0))
+    assert len(tracker.positions) == 2
+    tracker.clear()
+    assert len(tracker) == 0
+    assert tracker._grid == {}
+
+
+def test_prune(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("cosmic_reach.client.entities.time.monotonic", lambda: now[0])
+    tracker = EntityTracker()
+    tracker.update("old", (0, 0, 0))
+    now[0] = 105.0
+    tracker.update("new", (1, 0, 0))
+    now[0] = 108.0
+    assert tracker.prune(5) == 1
+    assert "old" not in tracker
+    assert tracker.within((0, 0, 0), 5) == ["new"]
+
+
+def test_packets():
+    tracker = EntityTracker()
+    unique_id = UniqueID(1, 2, 3)
+    tracker.handle_entity_position(
+        packets.entities.EntityPositionPacket(
+            unique_id, Vec3(1, 2, 3), Vec3(0, 0, 1), Vec3(0, 0, 0)
+        )
+    )
+    tracker.handle_player_position(
+        packets.entities.PlayerPositionPacket(
+            "pid", Vec3(4, 5, 6), Vec3(1, 0, 0), Vec3(0, 0, 0), 0, "zone"
+        )
+    )
+    key = entity_key(unique_id)
+    assert tuple(tracker.position(key)) == (1, 2, 3)
+    assert tuple(tracker.view_dirs[tracker._slots[key]]) == (0, 0, 1)
+    assert tracker.nearest_player((0, 0, 0))[0] == "pid"
+    tracker.handle_despawn(packets.entities.DespawnEntityPacket(unique_id))
+    assert key not in tracker
+
+
+def test_client_clears_on_zone_change():
+    client = Client(None)
+    tracker = client.enable_entity_tracker()
+    tracker.update("a", (0, 0, 0))
+
+    async def send_packet(packet):
+        pass
+
+    client.send_packet = send_packet
+    asyncio.run(client._handle_zone_packet(packets.general.ZonePacket(True, {})))
+    assert len(tracker) == 0
+
+
+def test_needs_numpy(monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    with pytest.raises(ImportError, match="numpy"):
+        EntityTracker()
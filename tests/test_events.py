@@ -0,0 +1,157 @@
+import asyncio
+
+from cosmic_reach.common.events import (
+    ExecutionMode,
+    FilterableListenableEvent,
+    ListenableEvent,
+)
+
+
+class Base:
+    pass
+
+
+class Derived(Base):
+    pass
+
+
+def test_handlers_run_in_order():
+    calls = []
+    event = ListenableEvent()
+    event.add_handler(lambda value: calls.append(("sync", value)))
+
+    @event
+    async def handler(value):
+        calls.append(("async", value))
+
+    asyncio.run(event.emit(1))
+    assert calls == [("sync", 1), ("async", 1)]
+
+
+def test_filtered_handlers():
+    calls = []
+    event = FilterableListenableEvent()
+    event.add_handler(lambda value: calls.append(("base", value)), Base)
+    event.add_handler(lambda value: calls.append(("all", value)))
+    event.add_handler(lambda value: calls.append(("derived", value)), Derived)
+
+    async def main():
+        await event.emit(Base, 1)
+        await event.emit(Derived, 2)
+        await event.emit(int, 3)
+        await event.emit(None, 4)
+
+    asyncio.run(main())
+    assert calls == [
+        ("base", 1),
+        ("all", 1),
+        ("all", 2),
+        ("derived", 2),
+        ("all", 3),
+        ("base", 4),
+        ("all", 4),
+        ("derived", 4),
+    ]
+
+
+def test_match_subclasses():
+    calls = []
+    event = FilterableListenableEvent(match_subclasses=True)
+    event.add_handler(lambda value: calls.append(("base", value)), Base)
+    event.add_handler(lambda value: calls.append(("derived", value)), Derived)
+
+    async def main():
+        await event.emit(Derived, 1)
+        await event.emit(Base, 2)
+
+    asyncio.run(main())
+    assert calls == [("base", 1), ("derived", 1), ("base", 2)]
+
+
+def test_handlers_added_later_are_found():
+    calls = []
+    event = FilterableListenableEvent()
+
+    async def main():
+        await event.emit(Base, 1)
+        event.add_handler(calls.append, Base)
+        await event.emit(Base, 2)
+
+    asyncio.run(main())
+    assert calls == [2]
+
+
+def test_wait_for_filter():
+    event = FilterableListenableEvent()
+
+    async def main():
+        waiter = asyncio.create_task(event.wait_for(Derived))
+        await asyncio.sleep(0)
+        await event.emit(Base)
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        await event.emit(Derived)
+        await asyncio.wait_for(waiter, 5)
+        assert event._events == {}
+
+    asyncio.run(main())
+
+
+def test_errors_are_collected():
+    calls = []
+    event = ListenableEvent()
+
+    def fail(value):
+        raise ValueError(value)
+
+    event.add_handler(fail)
+    event.add_handler(calls.append)
+    asyncio.run(event.emit(1))
+    assert calls == [1]
+    assert [str(error) for error in event.errors] == ["1"]
+
+
+def test_concurrent_mode_limits_handlers_in_flight():
+    running = 0
+    most = 0
+
+    async def handler(value):
+        nonlocal running, most
+        running += 1
+        most = max(most, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    event = ListenableEvent(ExecutionMode.CONCURRENT, max_concurrency=3)
+    event.add_handler(handler)
+
+    async def main():
+        for value in range(10):
+            await event.emit(value)
+        await event.drain()
+
+    asyncio.run(main())
+    assert most == 3 and running == 0
+
+
+def test_ordered_mode_keeps_order_per_key():
+    calls = []
+
+    async def handler(key, value):
+        # later values of a key would overtake earlier ones if run in parallel
+        await asyncio.sleep(0.001 * (5 - value))
+        calls.append((key, value))
+
+    event = ListenableEvent(ExecutionMode.ORDERED, key=lambda key, value: key)
+    event.add_handler(handler)
+
+    async def main():
+        for value in range(5):
+            for key in "ab":
+                await event.emit(key, value)
+        await event.drain()
+
+    asyncio.run(main())
+    for key in "ab":
+        assert [value for k, value in calls if k == key] == list(range(5))
+    assert event._ordered == {}
@@ -0,0 +1,122 @@
+import io
+import struct
+
+import pytest
+
+from cosmic_reach.io.serializer import deserialize, serialize, store
+from cosmic_reach.io.types import Complex, Short, get_layout
+from cosmic_reach.protocol import packets as P
+from cosmic_reach.types.bin.entities import UniqueID
+from cosmic_reach.types.bin.java import Vec3
+
+
+def entity_position() -> P.entities.EntityPositionPacket:
+    return P.entities.EntityPositionPacket(
+        UniqueID(1 << 40, -2, 3), Vec3(4, 5, 6), Vec3(-7, 8, 9), Vec3(0, 1, -1)
+    )
+
+
+def player_position() -> P.entities.PlayerPositionPacket:
+    return P.entities.PlayerPositionPacket(
+        "player", Vec3(1, 2, 3), Vec3(4, 5, 6), Vec3(7, 8, 9), 5, "base:earth"
+    )
+
+
+def fields(obj) -> dict:
+    "The fields of a complex object, nested ones included"
+    return {
+        attr: fields(value) if isinstance(value, Complex) else value
+        for attr, value in zip(type(obj)._fields, values(obj))
+    }
+
+
+def values(obj) -> list:
+    return [getattr(obj, attr) for attr in type(obj)._fields]
+
+
+def field_by_field(obj) -> bytes:
+    "The wire format, written one field at a time"
+    return b"".join(
+        field_by_field(value) if isinstance(value, Complex) else serialize(value, typ)
+        for (attr, typ), value in zip(type(obj).__annotations__.items(), values(obj))
+    )
+
+
+def test_fixed_width_fields_are_fused():
+    layout = get_layout(P.entities.EntityPositionPacket)
+    (run,) = layout.steps
+    assert run.struct.format == ">qii" + "i" * 9
+    assert run.paths[:4] == (
+        "entity_unique_id.time",
+        "entity_unique_id.rand",
+        "entity_unique_id.number",
+        "position.x",
+    )
+
+    steps = get_layout(P.entities.PlayerPositionPacket).steps
+    assert [getattr(step, "path", None) for step in steps] == [
+        "player_unique_id",
+        None,
+        "zone_id",
+    ]
+    assert steps[1].struct.format == ">" + "i" * 10
+
+
+@pytest.mark.parametrize("make", [entity_position, player_position])
+def test_roundtrip(make):
+    packet = make()
+    data = serialize(packet)
+    assert data == field_by_field(packet)
+    decoded = deserialize(type(packet), io.BytesIO(data))
+    assert type(decoded) is type(packet)
+    assert fields(decoded) == fields(packet)
+    assert decoded == packet
+
+
+class Mixed(Complex):
+    flag: bool
+    small: Short
+    name: str
+    position: Vec3
+    scale: float
+
+
+def test_runs_around_codec_fields():
+    obj = Mixed(True, Short(-2), "ab", Vec3(1, 2, 3), 0.5)
+    steps = get_layout(Mixed).steps
+    assert [type(step).__name__ for step in steps] == [
+        "_FixedRun",
+        "_CodecField",
+        "_FixedRun",
+    ]
+    data = serialize(obj)
+    assert data == struct.pack(">bh", 1, -2) + b"\x00\x00\x00\x02ab" + struct.pack(
+        ">iiif", 1, 2, 3, 0.5
+    )
+    assert fields(deserialize(Mixed, io.BytesIO(data))) == fields(obj)
+
+
+def test_layouts_are_cached_until_invalidated():
+    layout = get_layout(Vec3)
+    assert get_layout(Vec3) is layout
+    store.invalidate()
+    assert get_layout(Vec3) is not layout
+
+
+def test_annotations_are_not_mutated():
+    before = dict(P.entities.EntityPositionPacket.__annotations__)
+    serialize(entity_position())
+    assert P.entities.EntityPositionPacket.__annotations__ == before
+
+
+def test_truncated_run():
+    data = serialize(entity_position())
+    with pytest.raises(struct.error):
+        deserialize(P.entities.EntityPositionPacket, io.BytesIO(data[:-1]))
+
+
+def test_missing_field():
+    packet = entity_position()
+    del packet.position.y
+    with pytest.raises(ValueError, match="position.y"):
+        serialize(packet)
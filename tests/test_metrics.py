@@ -0,0 +1,150 @@
+import io
+import json
+import random
+import urllib.error
+import urllib.request
+
+import pytest
+
+from cosmic_reach.common.metrics import Histogram, Metrics, _bucket, _bucket_end
+from cosmic_reach.protocol import Direction, get_packet_registry, packets
+
+
+def test_buckets_cover_their_values():
+    rng = random.Random(0)
+    values = list(range(100_000)) + [rng.randrange(1 << 40) for _ in range(10_000)]
+    for value in values:
+        idx = _bucket(value)
+        assert (_bucket_end(idx - 1) if idx else 0) <= value < _bucket_end(idx)
+
+
+def test_empty_histogram():
+    histogram = Histogram()
+    assert histogram.percentile(50) == 0
+    assert histogram.to_dict() == {
+        "count": 0,
+        "sum": 0,
+        "min": 0,
+        "max": 0,
+        "p50": 0,
+        "p90": 0,
+        "p99": 0,
+        "p999": 0,
+    }
+
+
+def test_percentiles_are_within_the_bucket_error():
+    rng = random.Random(1)
+    values = sorted(int(rng.lognormvariate(12, 2)) for _ in range(20_000))
+    histogram = Histogram()
+    for value in values:
+        histogram.record(value)
+    assert histogram.count == len(values)
+    assert histogram.total == sum(values)
+    assert (histogram.min, histogram.max) == (values[0], values[-1])
+    for percent in (1, 50, 90, 99, 99.9):
+        exact = values[round(len(values) * percent / 100) - 1]
+        assert exact <= histogram.percentile(percent) <= exact * 1.07
+    assert histogram.percentile(100) == values[-1]
+
+
+def test_small_values_are_exact():
+    histogram = Histogram()
+    for value in (3, 1, 2, 2):
+        histogram.record(value)
+    assert [histogram.percentile(percent) for percent in (25, 50, 75, 100)] == [
+        1,
+        2,
+        2,
+        3,
+    ]
+    assert histogram.cumulative([1, 2, 3, 4]) == [0, 1, 3, 4]
+
+
+def sample() -> Metrics:
+    metrics = Metrics()
+    metrics.record("serialize", Direction.CLIENTBOUND, "Tick", 10, 1500)
+    metrics.record("serialize", Direction.CLIENTBOUND, "Tick", 30, 2500)
+    metrics.record("dispatch", Direction.SERVERBOUND, "Chat", 0, 1 << 20)
+    return metrics
+
+
+def test_to_dict():
+    snapshot = sample().to_dict()
+    tick = snapshot["serialize"]["clientbound"]["Tick"]
+    assert (tick["count"], tick["bytes"]) == (2, 40)
+    assert tick["latency_ns"]["min"] == 1500
+    assert tick["latency_ns"]["max"] == 2500
+    assert tick["latency_ns"]["sum"] == 4000
+    assert snapshot["dispatch"]["serverbound"]["Chat"]["count"] == 1
+    assert json.loads(json.dumps(snapshot)) == snapshot
+
+
+def test_to_prometheus():
+    lines = sample().to_prometheus("test").splitlines()
+    tick = 'operation="serialize",direction="clientbound",packet="Tick"'
+    chat = 'operation="dispatch",direction="serverbound",packet="Chat"'
+    assert "# TYPE test_packets_total counter" in lines
+    assert "# TYPE test_packet_seconds histogram" in lines
+    assert f"test_packets_total{{{tick}}} 2" in lines
+    assert f"test_packet_bytes_total{{{tick}}} 40" in lines
+    # dispatching has no bytes
+    assert not any(
+        line.startswith(f"test_packet_bytes_total{{{chat}") for line in lines
+    )
+    assert f'test_packet_seconds_bucket{{{tick},le="1.024e-06"}} 0' in lines
+    assert f'test_packet_seconds_bucket{{{tick},le="2.048e-06"}} 1' in lines
+    assert f'test_packet_seconds_bucket{{{tick},le="4.096e-06"}} 2' in lines
+    assert f'test_packet_seconds_bucket{{{tick},le="+Inf"}} 2' in lines
+    assert f"test_packet_seconds_sum{{{tick}}} 4e-06" in lines
+    assert f"test_packet_seconds_count{{{chat}}} 1" in lines
+
+    buckets = [
+        int(line.rsplit(" ", 1)[1])
+        for line in lines
+        if line.startswith(f"test_packet_seconds_bucket{{{chat}")
+    ]
+    assert buckets == sorted(buckets)
+    assert buckets[-1] == 1
+
+
+def test_prometheus_labels_are_escaped():
+    metrics = Metrics()
+    metrics.record("serialize", Direction.SERVERBOUND, 'a"b\\c\nd', 1, 1)
+    text = metrics.to_prometheus()
+    assert 'packet="a\\"b\\\\c\\nd"' in text
+    # the newline does not split the sample line
+    assert all(line.startswith(("#", "cosmic_reach_")) for line in text.splitlines())
+
+
+def test_registry_records():
+    registry = get_packet_registry()
+    metrics = Metrics()
+    registry.enable_metrics(metrics, Direction.SERVERBOUND)
+    frame = registry.serialize_packet(packets.general.EndTickPacket(1))
+    registry.deserialize_packet(io.BytesIO(frame))
+    snapshot = metrics.to_dict()
+    name = packets.general.EndTickPacket.PACKET_NAME
+    assert snapshot["serialize"]["serverbound"][name]["bytes"] == len(frame)
+    assert snapshot["deserialize"]["clientbound"][name]["bytes"] == len(frame)
+    metrics.reset()
+    assert metrics.to_dict() == {}
+
+
+def test_serve():
+    metrics = sample()
+    server = metrics.serve(port=0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert response.read().decode() == metrics.to_prometheus()
+        with urllib.request.urlopen(f"{base}/metrics.json", timeout=5) as response:
+            assert json.load(response) == metrics.to_dict()
+        with pytest.raises(urllib.error.HTTPError) as info:
+            urllib.request.urlopen(f"{base}/other", timeout=5)
+        assert info.value.code == 404
+        info.value.close()
+    finally:
+        server.shutdown()
+        server.server_close()
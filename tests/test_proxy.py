@@ -0,0 +1,162 @@
+import asyncio
+
+from cosmic_reach.client import BaseClient
+from cosmic_reach.protocol import GamePacketRegistry, get_packet_registry, packets
+from cosmic_reach.proxy import DROP, Direction, Proxy
+from cosmic_reach.server.aio import AsyncBaseClientConnection, AsyncServer
+
+
+class Upstream(AsyncBaseClientConnection):
+    "Hands every packet it receives to the test"
+
+    def setup(self):
+        self.server.upstream_connection.set_result(self)
+        self.received = asyncio.Queue()
+        self.on_packet(
+            None, lambda connection, packet: self.received.put_nowait(packet)
+        )
+
+
+async def serving(server: AsyncServer) -> tuple[asyncio.Task, int]:
+    task = asyncio.create_task(server.serve("127.0.0.1", 0))
+    while server._server is None:
+        await asyncio.sleep(0.01)
+    return task, server._server.sockets[0].getsockname()[1]
+
+
+def remapped(offset: int) -> GamePacketRegistry:
+    "The known packets under other ids, the protocol sync keeps id 1"
+    base = get_packet_registry()
+    registry = GamePacketRegistry()
+    for packet_id, packet in base._packets.items():
+        registry.register(packet, packet_id if packet_id == 1 else packet_id + offset)
+    return registry
+
+
+def sync(registry: GamePacketRegistry) -> packets.meta.ProtocolSyncPacket:
+    return packets.meta.ProtocolSyncPacket(
+        [
+            [packet.PACKET_NAME, packet_id]
+            for packet_id, packet in registry._packets.items()
+        ],
+        "0.4.4",
+    )
+
+
+async def received(queue: asyncio.Queue):
+    return await asyncio.wait_for(queue.get(), 5)
+
+
+def relay(test, setup=None):
+    "Run a test against a client connected through a proxy to an upstream"
+
+    async def main():
+        upstream_server = AsyncServer(Upstream)
+        upstream_server.upstream_connection = asyncio.get_running_loop().create_future()
+        upstream_task, upstream_port = await serving(upstream_server)
+        proxy = Proxy("127.0.0.1", upstream_port)
+        if setup is not None:
+            setup(proxy)
+        proxy_task, proxy_port = await serving(proxy)
+        client = BaseClient()
+        await client.connect("127.0.0.1", proxy_port)
+        upstream = await asyncio.wait_for(upstream_server.upstream_connection, 5)
+        try:
+            return await test(client, upstream, proxy)
+        finally:
+            await client.close()
+            await proxy.close()
+            await upstream_server.close()
+            await proxy_task
+            await upstream_task
+
+    return asyncio.run(main())
+
+
+def test_relays_both_ways():
+    async def test(client, upstream, proxy):
+        await client.send_packet(packets.general.MessagePacket("up", "pid"))
+        upstream.send_packet(packets.general.MessagePacket("down", ""))
+        return (await received(upstream.received)), (await client.receive_packet())
+
+    up, down = relay(test)
+    assert (up.message, up.player_unique_id) == ("up", "pid")
+    assert down.message == "down"
+
+
+def test_intercept_and_drop():
+    seen = []
+
+    def setup(proxy):
+        @proxy.on_packet(packets.general.MessagePacket, direction=Direction.SERVERBOUND)
+        def censor(connection, packet, direction):
+            seen.append((packet.message, direction))
+            if packet.message == "drop me":
+                return DROP
+            if packet.message == "rewrite me":
+                return packets.general.MessagePacket(
+                    "rewritten", packet.player_unique_id
+                )
+
+        @proxy.on_packet(packets.general.EndTickPacket)
+        async def tick(connection, packet, direction):
+            seen.append((packet.world_tick, direction))
+
+    async def test(client, upstream, proxy):
+        for message in ("drop me", "rewrite me", "keep me"):
+            await client.send_packet(packets.general.MessagePacket(message, "pid"))
+        upstream.send_packet(packets.general.MessagePacket("drop me", ""))
+        upstream.send_packet(packets.general.EndTickPacket(7))
+        return (
+            [(await received(upstream.received)).message for _ in range(2)],
+            (await client.receive_packet()).message,
+            (await client.receive_packet()).world_tick,
+        )
+
+    upstream_got, client_message, tick = relay(test, setup)
+    assert upstream_got == ["rewritten", "keep me"]
+    # only serverbound messages are intercepted
+    assert client_message == "drop me"
+    assert tick == 7
+    # the two directions are relayed independently
+    assert [item for item, direction in seen if direction is Direction.SERVERBOUND] == [
+        "drop me",
+        "rewrite me",
+        "keep me",
+    ]
+    assert [item for item, direction in seen if direction is Direction.CLIENTBOUND] == [
+        7
+    ]
+
+
+def test_rewrites_ids_both_ways():
+    server_ids, client_ids = remapped(100), remapped(200)
+
+    async def test(client, upstream, proxy):
+        upstream.packet_registry = server_ids
+        upstream.send_packet(sync(server_ids))
+        assert isinstance(
+            await client.receive_packet(), packets.meta.ProtocolSyncPacket
+        )
+
+        # the client announces ids of its own, the proxy translates between them
+        client.packet_registry = client_ids
+        await client.send_packet(sync(client_ids))
+        await received(upstream.received)
+        await client.send_packet(packets.general.MessagePacket("up", "pid"))
+        up = await received(upstream.received)
+
+        upstream.send_packet(packets.general.EndTickPacket(9))
+        down = await client.receive_packet()
+
+        # and packets the proxy sends itself use the client's ids
+        (connection,) = proxy.connections
+        connection.send_packet(packets.general.EndTickPacket(10))
+        proxy.broadcast(packets.general.EndTickPacket(11))
+        injected = [await client.receive_packet() for _ in range(2)]
+        return up, down, injected
+
+    up, down, injected = relay(test)
+    assert up.message == "up"
+    assert down.world_tick == 9
+    assert [packet.world_tick for packet in injected] == [10, 11]
@@ -0,0 +1,125 @@
+import io
+import struct
+
+import pytest
+
+from cosmic_reach.io.types import Byte, Long, Short
+from cosmic_reach.records import (
+    RecordArchive,
+    RecordReader,
+    RecordWriter,
+    decode,
+    encode,
+)
+
+DOCUMENTS = [
+    {},
+    {"name": "zone", "seed": Long(1 << 40), "spawn": [1.5, 64.0, -2.25]},
+    {
+        "flags": [True, False],
+        "small": Byte(-3),
+        "mid": Short(300),
+        "blob": b"\x00\x01\x02",
+        "nested": {"id": 7, "tags": ["a", "b"], "parent": None},
+        "children": [{"id": 1}, {"id": 2}],
+    },
+]
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_roundtrip(document):
+    decoded = decode(encode(document))
+    assert decoded == document
+
+
+def test_zero_copy_bytes_are_views():
+    data = encode({"blob": b"abc"})
+    blob = decode(data, zero_copy=True)["blob"]
+    assert isinstance(blob, memoryview)
+    assert bytes(blob) == b"abc"
+
+
+def write_file(documents=DOCUMENTS) -> bytes:
+    out = io.BytesIO()
+    writer = RecordWriter(out)
+    writer.write_all(documents)
+    assert writer.records == len(documents)
+    return out.getvalue()
+
+
+def test_stream_roundtrip():
+    assert list(RecordReader(io.BytesIO(write_file()))) == DOCUMENTS
+
+
+def test_stream_skip():
+    reader = RecordReader(io.BytesIO(write_file()))
+    assert reader.skip()
+    assert reader.read() == DOCUMENTS[1]
+    assert reader.skip()
+    assert not reader.skip()
+    assert reader.read() is None
+
+
+def test_stream_truncated():
+    data = write_file()
+    with pytest.raises(EOFError):
+        list(RecordReader(io.BytesIO(data[:-1])))
+    with pytest.raises(EOFError):
+        list(RecordReader(io.BytesIO(data + b"\x00")))
+
+
+def test_stream_negative_length():
+    reader = RecordReader(io.BytesIO(struct.pack(">i", -1)))
+    with pytest.raises(ValueError):
+        reader.read_raw()
+    reader = RecordReader(io.BytesIO(struct.pack(">i", -1)))
+    with pytest.raises(ValueError):
+        reader.skip()
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    def make(data: bytes):
+        path = tmp_path / "records.bin"
+        path.write_bytes(data)
+        return path
+
+    return make
+
+
+def test_archive(archive_path):
+    with RecordArchive(archive_path(write_file())) as archive:
+        assert archive[1] == DOCUMENTS[1]
+        assert archive[-1] == DOCUMENTS[-1]
+        assert len(archive) == len(DOCUMENTS)
+        assert list(archive) == DOCUMENTS
+        with pytest.raises(IndexError):
+            archive[len(DOCUMENTS)]
+
+
+def test_archive_empty(archive_path):
+    with RecordArchive(archive_path(b"")) as archive:
+        assert len(archive) == 0
+        assert list(archive) == []
+
+
+def test_archive_zero_copy(archive_path):
+    with RecordArchive(archive_path(write_file()), zero_copy=True) as archive:
+        blob = archive[2]["blob"]
+        assert bytes(blob) == DOCUMENTS[2]["blob"]
+        blob.release()
+
+
+def test_archive_truncated(archive_path):
+    with RecordArchive(archive_path(write_file()[:-1])) as archive:
+        assert archive[0] == DOCUMENTS[0]
+        with pytest.raises(EOFError):
+            len(archive)
+
+
+def test_archive_negative_length(archive_path):
+    data = write_file(DOCUMENTS[:1]) + struct.pack(">i", -4)
+    with RecordArchive(archive_path(data)) as archive:
+        assert archive[0] == DOCUMENTS[0]
+        with pytest.raises(ValueError):
+            len(archive)
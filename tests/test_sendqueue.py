@@ -0,0 +1,158 @@
+import asyncio
+
+import pytest
+
+from cosmic_reach.client.base import BaseClient
+from cosmic_reach.common.sendqueue import OverflowPolicy, SendQueue
+from cosmic_reach.common.transport import StreamTransport
+from cosmic_reach.protocol import packets
+
+
+class RecordingTransport:
+    "Stands in for a :class:`StreamTransport` whose peer never reads"
+
+    def __init__(self):
+        self.written = []
+        self.drained = asyncio.Event()
+
+    def write(self, frame):
+        self.written.append(bytes(frame))
+
+    def writelines(self, frames):
+        self.written.extend(map(bytes, frames))
+
+    async def drain(self):
+        await self.drained.wait()
+
+
+def test_block_policy_waits_for_room():
+    async def main():
+        transport = RecordingTransport()
+        queue = SendQueue(transport, max_frames=2)
+        queue.put_nowait(b"a")
+        queue.put_nowait(b"b")
+        put = asyncio.create_task(queue.put(b"c"))
+        await asyncio.sleep(0)
+        assert not put.done()
+        queue.start()
+        transport.drained.set()
+        assert await put
+        await queue.close()
+        return transport.written
+
+    assert asyncio.run(main()) == [b"a", b"b", b"c"]
+
+
+def test_drop_oldest_policy():
+    async def main():
+        queue = SendQueue(
+            RecordingTransport(), max_frames=2, policy=OverflowPolicy.DROP_OLDEST
+        )
+        for frame in (b"a", b"b", b"c"):
+            assert queue.put_nowait(frame)
+        return queue
+
+    queue = asyncio.run(main())
+    assert queue.dropped == 1
+    assert [item for item, _ in queue._items] == [b"b", b"c"]
+
+
+def test_disconnect_policy():
+    overflows = []
+
+    async def main():
+        queue = SendQueue(
+            RecordingTransport(),
+            max_frames=1,
+            policy=OverflowPolicy.DISCONNECT,
+            on_overflow=lambda: overflows.append(True),
+        )
+        assert queue.put_nowait(b"a")
+        assert not queue.put_nowait(b"b")
+        assert not queue.put_nowait(b"c")
+        return queue
+
+    queue = asyncio.run(main())
+    assert queue.overflowed and overflows == [True]
+    assert queue.depth == 0 and queue.bytes_queued == 0
+
+
+def test_peer_disconnect_releases_blocked_producer():
+    async def main():
+        accepted = asyncio.get_running_loop().create_future()
+
+        async def on_connect(reader, writer):
+            # never read, so the sender's buffers fill up
+            accepted.set_result(writer)
+
+        server = await asyncio.start_server(on_connect, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        transport = await StreamTransport.open("127.0.0.1", port)
+        peer = await accepted
+
+        queue = SendQueue(transport, max_frames=2)
+        queue.start()
+        frame = bytes(1024 * 1024)
+
+        async def produce():
+            while await queue.put(frame):
+                pass
+
+        producer = asyncio.create_task(produce())
+        while not (queue.full() and not queue._room.is_set()):
+            await asyncio.sleep(0.01)
+
+        peer.transport.abort()
+        await asyncio.wait_for(producer, 5)
+        await asyncio.wait_for(queue.close(), 5)
+        await transport.close()
+        server.close()
+        await server.wait_closed()
+        return queue
+
+    queue = asyncio.run(main())
+    assert queue.depth == 0 and queue.bytes_queued == 0
+    assert not queue.put_nowait(b"late")
+
+
+def test_client_send_raises_once_closed():
+    async def main():
+        server = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = BaseClient()
+        client.send_policy = OverflowPolicy.DISCONNECT
+        client.send_max_frames = 1
+        packet = packets.general.EndTickPacket(1)
+        with pytest.raises(ConnectionError):
+            await client.send_packet(packet)
+
+        await client.connect("127.0.0.1", port)
+        await client.send_packet(packet)
+        # the writer task has not run yet, so this one overflows the queue
+        with pytest.raises(ConnectionError):
+            await client.send_packet(packet)
+        assert client.queue.overflowed
+        with pytest.raises(ConnectionError):
+            await client.send_packet(packet)
+
+        await client.close()
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
+
+
+def test_client_send_after_close():
+    async def main():
+        server = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        client = BaseClient()
+        await client.connect("127.0.0.1", port)
+        await client.send_packet(packets.general.EndTickPacket(1))
+        await client.close()
+        with pytest.raises(ConnectionError):
+            await client.send_packet(packets.general.EndTickPacket(2))
+        server.close()
+        await server.wait_closed()
+
+    asyncio.run(main())
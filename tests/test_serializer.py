@@ -0,0 +1,167 @@
+import io
+
+import pytest
+
+from cosmic_reach.io import serializer, types
+from cosmic_reach.io.htypes import KeyedUnion
+from cosmic_reach.io.serializer import (
+    deserialize,
+    deserializer_for,
+    resolve_deserializer,
+    resolve_serializer,
+    resolve_writer,
+    serialize,
+    serialize_into,
+    serializer_for,
+    store,
+)
+from cosmic_reach.io.types import Repeat
+from cosmic_reach.protocol import packets as P
+
+
+class Base:
+    pass
+
+
+class Derived(Base):
+    pass
+
+
+class Tagged:
+    pass
+
+
+class Unhashable:
+    def __eq__(self, other):
+        return self is other
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    "Counts how often a codec is looked up in the store instead of the cache"
+    found = []
+    lookup = serializer._lookup
+
+    def counting(typ, registered):
+        found.append(typ)
+        return lookup(typ, registered)
+
+    monkeypatch.setattr(serializer, "_lookup", counting)
+    store.invalidate()
+    return found
+
+
+@pytest.fixture
+def registered():
+    "Removes the codecs a test registers"
+    yield
+    for cls in (Base, Derived, Tagged, Unhashable):
+        store.serializers.pop(cls, None)
+        store.deserializers.pop(cls, None)
+    store.invalidate()
+
+
+def test_resolved_once(lookups):
+    assert resolve_writer(int) is resolve_writer(int)
+    assert resolve_deserializer(int) is resolve_deserializer(int)
+    assert lookups == [int, int]
+    assert int in store.writer_cache
+    assert int in store.deserializer_cache
+
+
+def test_repeat_resolves_items_once(lookups):
+    data = serialize([1, 2, 3, 4], Repeat[int])
+    assert data == b"\x00\x00\x00\x04" + b"".join(
+        i.to_bytes(4, "big") for i in range(1, 5)
+    )
+    assert deserialize(Repeat[int], io.BytesIO(data)) == [1, 2, 3, 4]
+    assert lookups.count(int) == 2
+
+
+def test_unknown_type():
+    with pytest.raises(TypeError):
+        resolve_serializer(Base)
+    with pytest.raises(TypeError):
+        resolve_deserializer(Base)
+
+
+def test_registering_invalidates(registered):
+    with pytest.raises(TypeError):
+        serialize(Derived())
+    assert store.writer_cache[Derived] is None
+
+    @serializer_for(Base)
+    def serialize_base(typ, obj) -> bytes:
+        return b"base"
+
+    assert serialize(Derived()) == b"base"
+    assert store.writer_cache[Derived].__wrapped__ is serialize_base
+
+    @serializer_for(Base)
+    def serialize_base_again(typ, obj) -> bytes:
+        return b"again"
+
+    assert Derived not in store.writer_cache
+    assert serialize(Derived()) == b"again"
+
+    @deserializer_for(Base)
+    def deserialize_base(typ, buf):
+        return typ()
+
+    assert not store.writer_cache
+    assert isinstance(deserialize(Derived, io.BytesIO()), Derived)
+
+
+def test_unhashable_annotation(registered):
+    @serializer_for(Unhashable)
+    def serialize_unhashable(typ, obj) -> bytes:
+        return b"x"
+
+    annotation = Unhashable()
+    assert resolve_serializer(annotation) is serialize_unhashable
+    assert serialize(None, annotation) == b"x"
+
+
+def test_union():
+    data = serialize("ab", int | str)
+    assert data == b"\x01\x00\x00\x00\x02ab"
+    assert deserialize(int | str, io.BytesIO(data)) == "ab"
+    assert deserialize(int | str, io.BytesIO(serialize(5, int | str))) == 5
+
+
+def test_keyed_union():
+    annotation = KeyedUnion(number=int, text=str)
+    data = serialize("ab", annotation)
+    assert data == b"\x00\x00\x00\x04text\x00\x00\x00\x02ab"
+    assert deserialize(annotation, io.BytesIO(data)) == "ab"
+
+
+def test_serialize_into_appends():
+    out = bytearray(b"head")
+    serialize_into(out, "ab")
+    assert out == b"head\x00\x00\x00\x02ab"
+    assert serialize("ab") == b"\x00\x00\x00\x02ab"
+
+
+def test_old_serializer_names():
+    assert types.serialize_str(str, "ab") == serialize("ab")
+    assert types.serialize_short(types.Short, 3) == b"\x00\x03"
+    packet = P.general.EndTickPacket(7)
+    assert types.serialize_complex(type(packet), packet) == serialize(packet)
+    assert resolve_serializer(int)(int, 5) == b"\x00\x00\x00\x05"
+    assert store.serializers[int](int, 5) == b"\x00\x00\x00\x05"
+
+
+def test_serializer_for_registers_bytes_returning_functions():
+    @serializer_for(Tagged)
+    def serialize_tagged(typ, obj) -> bytes:
+        return b"tag"
+
+    try:
+        assert serialize(Tagged()) == b"tag"
+        assert store.serializers[Tagged] is serialize_tagged
+        store.serializers[Tagged] = lambda typ, obj: b"new"
+        assert serialize(Tagged()) == b"new"
+    finally:
+        del store.serializers[Tagged]
+    assert Tagged not in store.serializers
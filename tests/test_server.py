@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from cosmic_reach.client import BaseClient
+from cosmic_reach.protocol import get_packet_registry, packets
+from cosmic_reach.server.aio import AsyncBaseClientConnection, AsyncServer
+from cosmic_reach.server.general import BroadcastMixin
+
+
+class EchoConnection(AsyncBaseClientConnection):
+    def setup(self):
+        self.on_packet(
+            packets.general.MessagePacket,
+            lambda connection, packet: connection.send_packet(
+                packets.general.MessagePacket("echo " + packet.message, "")
+            ),
+        )
+
+
+async def serving(server: AsyncServer) -> tuple[asyncio.Task, int]:
+    task = asyncio.create_task(server.serve("127.0.0.1", 0))
+    while server._server is None:
+        await asyncio.sleep(0.01)
+    return task, server._server.sockets[0].getsockname()[1]
+
+
+def test_echo():
+    async def main():
+        server = AsyncServer(EchoConnection)
+        task, port = await serving(server)
+        client = BaseClient()
+        await client.connect("127.0.0.1", port)
+        await client.send_packet(packets.general.MessagePacket("hi", "pid"))
+        reply = await asyncio.wait_for(client.receive_packet(), 5)
+        await client.close()
+        await server.close()
+        await task
+        return reply
+
+    assert asyncio.run(main()).message == "echo hi"
+
+
+def test_close_ends_serve():
+    async def main():
+        server = AsyncServer(EchoConnection)
+        task, _ = await serving(server)
+        await server.close()
+        await asyncio.wait_for(task, 5)
+        return task
+
+    task = asyncio.run(main())
+    assert not task.cancelled()
+
+
+def test_cancelling_serve_propagates():
+    async def main():
+        server = AsyncServer(EchoConnection)
+        task, port = await serving(server)
+        client = BaseClient()
+        await client.connect("127.0.0.1", port)
+        while not server.connections:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await client.close()
+        return server
+
+    server = asyncio.run(main())
+    assert server._server is None and not server.connections
+
+
+class FakeConnection:
+    def __init__(self, registry, fail=False):
+        self.packet_registry = registry
+        self.fail = fail
+        self.frames = []
+
+    def send_frame(self, frame, packet=None):
+        if self.fail:
+            raise BrokenPipeError("gone")
+        self.frames.append(frame)
+
+
+def test_broadcast_serializes_once_per_registry(monkeypatch, capsys):
+    registry, remapped = get_packet_registry(), get_packet_registry()
+    for packet_id, packet in list(remapped._packets.items()):
+        remapped.register(packet, packet_id + 100)
+    encoded = []
+    for reg in (registry, remapped):
+        serialize = reg.serialize_packet
+        monkeypatch.setattr(
+            reg, "serialize_packet", lambda p, s=serialize: encoded.append(p) or s(p)
+        )
+
+    hub = BroadcastMixin()
+    origin = FakeConnection(registry)
+    failing = FakeConnection(registry, fail=True)
+    same = [FakeConnection(registry) for _ in range(3)]
+    other = FakeConnection(remapped)
+    hub.connections = {origin, failing, *same, other}
+
+    packet = packets.general.MessagePacket("hi", "pid")
+    assert hub.broadcast(packet, exclude=origin) == 4
+    assert len(encoded) == 2
+    assert "BrokenPipeError" in capsys.readouterr().err
+
+    assert origin.frames == []
+    frame = registry.serialize_packet(packet)
+    assert all(connection.frames == [frame] for connection in same)
+    assert other.frames == [remapped.serialize_packet(packet)]
+    assert other.frames != [frame]
+
+    assert hub.broadcast(packet, connections=same[:1]) == 1
+    assert len(same[0].frames) == 2
+
+
+def test_broadcast_to_served_clients():
+    async def main():
+        server = AsyncServer(EchoConnection)
+        task, port = await serving(server)
+        clients = [BaseClient() for _ in range(3)]
+        for client in clients:
+            await client.connect("127.0.0.1", port)
+        while len(server.connections) < len(clients):
+            await asyncio.sleep(0.01)
+        server.broadcast(packets.general.MessagePacket("all", ""))
+        replies = [
+            await asyncio.wait_for(client.receive_packet(), 5) for client in clients
+        ]
+        for client in clients:
+            await client.close()
+        await server.close()
+        await task
+        return replies
+
+    assert [reply.message for reply in asyncio.run(main())] == ["all"] * 3
@@ -0,0 +1,128 @@
+import asyncio
+import contextlib
+
+import pytest
+
+from cosmic_reach.client.base import BaseClient
+from cosmic_reach.common.transport import StreamTransport
+from cosmic_reach.protocol import PacketDecoder, get_packet_registry
+from cosmic_reach.protocol import packets as P
+
+
+@contextlib.asynccontextmanager
+async def peer():
+    "A local server handing out the transport of its first connection"
+    accepted = asyncio.get_running_loop().create_future()
+
+    async def on_connect(reader, writer):
+        accepted.set_result(StreamTransport(reader, writer))
+
+    server = await asyncio.start_server(on_connect, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        yield port, accepted
+    finally:
+        server.close()
+        if accepted.done():
+            await accepted.result().close()
+        await server.wait_closed()
+
+
+async def receive(transport, decoder):
+    while (packet := decoder.next_packet()) is None:
+        decoder.feed(await transport.read_chunk())
+    return packet
+
+
+def test_frames_roundtrip():
+    async def main():
+        async with peer() as (port, accepted):
+            client = await StreamTransport.open("127.0.0.1", port)
+            remote = await accepted
+            registry = get_packet_registry()
+            client.write(registry.serialize_packet(P.general.MessagePacket("hi", "p")))
+            client.write(registry.serialize_packet(P.general.EndTickPacket(5)))
+            await client.drain()
+            decoder = PacketDecoder(registry)
+            first = await receive(remote, decoder)
+            second = await receive(remote, decoder)
+            await client.close()
+            return first, second
+
+    first, second = asyncio.run(main())
+    assert (first.message, first.player_unique_id) == ("hi", "p")
+    assert second.world_tick == 5
+
+
+def test_remote_close():
+    async def main():
+        async with peer() as (port, accepted):
+            client = await StreamTransport.open("127.0.0.1", port)
+            remote = await accepted
+            # half a frame, then hang up
+            client.write(b"\x00\x00\x00\x10\x00")
+            await client.close()
+            assert client.closed
+            decoder = PacketDecoder(get_packet_registry())
+            with pytest.raises(ConnectionResetError):
+                await receive(remote, decoder)
+            assert decoder.pending() == 5
+            assert remote.closed
+            # closing twice is fine
+            await client.close()
+            await remote.close()
+
+    asyncio.run(main())
+
+
+def test_drain_waits_for_the_peer():
+    async def main():
+        async with peer() as (port, accepted):
+            client = await StreamTransport.open("127.0.0.1", port)
+            remote = await accepted
+            client.writer.transport.set_write_buffer_limits(high=1024)
+            size = 64 * 1024 * 1024
+            client.write(size.to_bytes(4, "big") + bytes(size))
+
+            # nobody reads, so the kernel buffers fill up and drain() blocks
+            drain = asyncio.ensure_future(client.drain())
+            done, _ = await asyncio.wait([drain], timeout=0.2)
+            assert not done
+
+            received = 0
+            while received < size + 4:
+                received += len(await remote.read_chunk())
+            await asyncio.wait_for(drain, 5)
+            await client.close()
+
+    asyncio.run(main())
+
+
+def test_base_client():
+    async def main():
+        async with peer() as (port, accepted):
+            client = BaseClient()
+            assert not client.connected
+            connected = []
+
+            @client.events.connect
+            async def on_connect():
+                connected.append(True)
+
+            await client.connect("127.0.0.1", port)
+            remote = await accepted
+            assert client.connected and connected
+
+            registry = get_packet_registry()
+            await client.send_packet(P.general.EndTickPacket(3))
+            packet = await receive(remote, PacketDecoder(registry))
+            assert packet.world_tick == 3
+            remote.write(registry.serialize_packet(P.meta.DisconnectPacket("bye")))
+            await remote.drain()
+            packet = await client.receive_packet()
+            assert packet.reason == "bye"
+
+            await client.close()
+            assert not client.connected
+
+    asyncio.run(main())
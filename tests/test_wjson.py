@@ -0,0 +1,124 @@
+import json
+
+import pytest
+
+from cosmic_reach.io import wjson
+from cosmic_reach.protocol import get_packet_registry, packets
+
+DOCUMENTS = [
+    "{}",
+    "[]",
+    '{"a": 1, "b": -2.5, "c": "text", "d": null, "e": true, "f": false}',
+    '{"nested": {"list": [1, [2, 3], {"x": []}], "empty": {}}}',
+    '{"escapes": "quote \\" slash \\\\ tab \\t unicode \\u00e9"}',
+    '  {"spaced"  :  [ 1 , 2 ]  }  ',
+    '"top-level string"',
+    "[1e3, -0.5, 12]",
+]
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_standard_json(document):
+    assert wjson.loads(document) == json.loads(document)
+
+
+def test_lenient_json():
+    document = (
+        "{zoneId: base:earth, 'quoted': 'single', n: 5, f: 1.5, flag: true, x: null}"
+    )
+    assert wjson.loads(document) == {
+        "zoneId": "base:earth",
+        "quoted": "single",
+        "n": 5,
+        "f": 1.5,
+        "flag": True,
+        "x": None,
+    }
+
+
+def test_bare_values():
+    assert wjson.loads("12") == 12
+    assert wjson.loads("word") == "word"
+    assert wjson.loads("null") is None
+
+
+@pytest.mark.parametrize(
+    "document", ['{"a": 1', '{"a": [1, 2}', '{"a": "open}', '{"a" 1}', '{"a": 1} x']
+)
+def test_malformed(document):
+    with pytest.raises(json.JSONDecodeError):
+        wjson.loads(document)
+
+
+ZONE = '{"zoneId": "base:earth", "spawnPoint": {"x": 1, "y": 2.5}, "blocks": [1, 2, 3]}'
+
+
+def test_iter_items():
+    assert list(wjson.iter_items(ZONE)) == list(json.loads(ZONE).items())
+
+
+def test_select():
+    assert wjson.select(ZONE, "zoneId", ("spawnPoint", "y"), "missing") == {
+        "zoneId": "base:earth",
+        ("spawnPoint", "y"): 2.5,
+    }
+
+
+def test_events():
+    assert list(wjson.events('{"a": [1, {"b": null}]}')) == [
+        ("start_map", None),
+        ("key", "a"),
+        ("start_array", None),
+        ("value", 1),
+        ("start_map", None),
+        ("key", "b"),
+        ("value", None),
+        ("end_map", None),
+        ("end_array", None),
+        ("end_map", None),
+    ]
+
+
+def test_lazy_json():
+    zone = wjson.LazyJson(ZONE)
+    assert zone["zoneId"] == "base:earth"
+    # only the value looked up is parsed
+    assert list(zone._values) == ["zoneId"]
+    assert zone == json.loads(ZONE)
+    assert zone.loads() == json.loads(ZONE)
+    with pytest.raises(KeyError):
+        zone["missing"]
+
+
+def test_duplicate_keys_keep_the_last():
+    document = '{"a": 1, "b": {"x": 1}, "a": 2, "b": {"y": 2}}'
+    assert wjson.loads(document) == {"a": 2, "b": {"y": 2}}
+    lazy = wjson.LazyJson(document)
+    assert lazy["a"] == 2 and lazy["b"] == {"y": 2}
+    assert lazy == wjson.loads(document) and len(lazy) == 2
+    assert wjson.select(document, "a", ("b", "x"), ("b", "y")) == {
+        "a": 2,
+        ("b", "y"): 2,
+    }
+
+
+@pytest.mark.parametrize("document", ['{"a": [1, 2}, "b": 1}'])
+def test_scanning_malformed(document):
+    with pytest.raises(json.JSONDecodeError):
+        wjson.select(document, "b")
+    with pytest.raises(json.JSONDecodeError):
+        list(wjson.events(document))
+
+
+def test_zone_packet_is_a_dict_unless_lazy_json():
+    packet = packets.general.ZonePacket(True, json.loads(ZONE))
+    frame = get_packet_registry().serialize_packet(packet)
+
+    zone = get_packet_registry().deserialize_frame(frame[4:]).zone
+    assert type(zone) is dict and zone == json.loads(ZONE)
+
+    lazy = get_packet_registry(lazy_json=True).deserialize_frame(frame[4:])
+    assert isinstance(lazy.zone, wjson.LazyJson)
+    assert lazy.zone["zoneId"] == "base:earth"
+    # a lazy zone is written back out unchanged
+    assert get_packet_registry().serialize_packet(lazy) == frame
@@ -0,0 +1,128 @@
+import sys
+
+import pytest
+
+from cosmic_reach.client.world import WorldCache
+from cosmic_reach.protocol import packets
+from cosmic_reach.types.bin.chunks import SIZE, Chunk
+from cosmic_reach.types.bin.java import Vec3
+
+AIR = "base:air[default]"
+
+
+def decode(data: bytes, x: int, y: int, z: int) -> Chunk:
+    "A stand-in decoder, every blob is the state of a chunk full of it"
+    np = pytest.importorskip("numpy")
+    return Chunk(x, y, z, [data.decode()], np.zeros((SIZE, SIZE, SIZE), np.uint16))
+
+
+def test_unknown_eviction():
+    with pytest.raises(ValueError):
+        WorldCache(eviction="random")
+
+
+def test_blocks():
+    world = WorldCache(decoder=decode)
+    world.put_chunk("zone", 1, 0, 0, b"base:stone")
+    assert world.get_raw("zone", 1, 0, 0) == b"base:stone"
+    assert world.block_at("zone", SIZE + 3, 4, 5) == "base:stone"
+    assert world.get_raw("zone", 1, 0, 0) is None
+    assert world.block_at("zone", 3, 4, 5) is None
+    assert world.block_at("other", SIZE + 3, 4, 5) is None
+
+    assert world.set_block("zone", SIZE + 3, 4, 5, "base:dirt")
+    assert world.block_at("zone", SIZE + 3, 4, 5) == "base:dirt"
+    assert world.block_at("zone", SIZE + 3, 4, 6) == "base:stone"
+    assert not world.set_block("zone", 3, 4, 5, "base:dirt")
+
+
+def test_decoding_updates_the_size():
+    world = WorldCache(decoder=decode)
+    world.put_chunk("zone", 0, 0, 0, b"base:stone")
+    raw = world.size
+    world.get_chunk("zone", 0, 0, 0)
+    assert world.size == raw - len(b"base:stone") + SIZE**3 * 2 + 8
+
+
+def test_without_a_decoder():
+    world = WorldCache()
+    world.put_chunk("zone", 0, 0, 0, b"base:stone")
+    assert world.get_raw("zone", 0, 0, 0) == b"base:stone"
+    with pytest.raises(RuntimeError):
+        world.block_at("zone", 1, 2, 3)
+    # the chunk cannot be kept up to date, so it is dropped
+    assert not world.set_block("zone", 1, 2, 3, "base:dirt")
+    assert ("zone", 0, 0, 0) not in world
+    assert world.size == 0
+
+
+def test_break_without_air_drops_the_chunk():
+    world = WorldCache(decoder=decode)
+    world.put_chunk("zone", 0, 0, 0, b"base:stone")
+    world.handle_break_block(
+        packets.blocks.BreakBlockPacket("zone", Vec3(1, 2, 3), "base:stone")
+    )
+    assert ("zone", 0, 0, 0) not in world
+
+
+def fill(world: WorldCache, count: int) -> None:
+    for x in range(count):
+        world.put_chunk("zone", x, 0, 0, b"base:stone")
+
+
+def test_lru_eviction_counts_block_access():
+    one = WorldCache._chunk_size(decode(b"base:stone", 0, 0, 0))
+    world = WorldCache(max_bytes=4 * one, decoder=decode)
+    for x in range(4):
+        world.put_chunk("zone", x, 0, 0, decode(b"base:stone", x, 0, 0))
+    assert world.block_at("zone", 0, 0, 0) == "base:stone"
+    assert world.set_block("zone", SIZE, 0, 0, AIR)
+    world.put_chunk("zone", 4, 0, 0, decode(b"base:stone", 4, 0, 0))
+    assert world.evicted == 2
+    assert [key[1] for key in world._chunks] == [0, 1, 4]
+
+
+def test_lru_eviction():
+    one = WorldCache._chunk_size(b"base:stone")
+    world = WorldCache(max_bytes=4 * one)
+    fill(world, 4)
+    world.get_raw("zone", 0, 0, 0)
+    world.put_chunk("zone", 4, 0, 0, b"base:stone")
+    assert ("zone", 0, 0, 0) in world
+    assert ("zone", 1, 0, 0) not in world
+    assert world.size <= world.max_bytes
+
+
+def test_distance_eviction():
+    one = WorldCache._chunk_size(b"base:stone")
+    world = WorldCache(max_bytes=4 * one, eviction="distance")
+    world.set_focus("zone", 0, 0, 0)
+    fill(world, 5)
+    assert ("zone", 0, 0, 0) in world
+    assert ("zone", 4, 0, 0) not in world
+
+
+def test_packets():
+    world = WorldCache(decoder=decode, air=AIR)
+    data = AIR.encode()
+    world.handle_chunk_column(
+        packets.general.ChunkColumnPacket("zone", [data, memoryview(data)], 0, 0, 0)
+    )
+    assert len(world) == 2
+    assert type(world.get_raw("zone", 0, 1, 0)) is bytes
+    assert world.block_at("zone", 1, SIZE + 1, 1) == AIR
+
+    pos = Vec3(1, 2, 3)
+    world.handle_block_replace(
+        packets.blocks.BlockReplacePacket("zone", "base:stone", pos)
+    )
+    assert world.block_at("zone", 1, 2, 3) == "base:stone"
+    world.handle_break_block(packets.blocks.BreakBlockPacket("zone", pos, "base:stone"))
+    assert world.block_at("zone", 1, 2, 3) == AIR
+
+
+def test_decoder_needs_numpy(monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    WorldCache()
+    with pytest.raises(ImportError, match="numpy"):
+        WorldCache(decoder=decode)